@@ -0,0 +1,170 @@
+"""pytest plugin for the SITL harness: the scenarios as parametrised tests
+(test_scenarios.py), the rig as fixtures.
+
+  pytest src/test/sitl --sitl-binary obj/main/betaflight_SITL.elf
+  pytest src/test/sitl --sitl-binary ... -n 4 -k mission      # pytest-xdist
+  pytest src/test/sitl --sitl-binary ... --sitl-chain --lf
+  pytest src/test/sitl --sitl-binary ... --sitl-binary-b ... --sitl-repeat 8 -k rescue_ab
+
+SITL binds fixed ports (9002-9004, MSP 5761), so two legs cannot share a
+network namespace. Each pytest process - every xdist worker - moves into a
+private one at session start (sitl_dist.enter_netns) and runs its legs
+there in parallel with the others; where the host does not permit that,
+legs are serialised across processes through the same host lock the
+distributed workers use.
+
+Fixtures:
+  sitl_binary, sitl_binary_b   the firmware under test (--sitl-binary, or
+                               SITL_BINARY in the environment; without one
+                               every SITL test is skipped)
+  sitl_workdir                 this process's leg directories
+  sitl_isolation               "netns" or "lock", decided once per process
+  sitl_chain                   a harness Chain reused across this process's
+                               tests with --sitl-chain (network namespaces
+                               only: a chained instance outlives the lock)
+  sitl_leg                     a running harness Leg, configured by the
+                               test's sitl_config marker
+  sitl, rc, fdm                the leg's Sitl, RcFeed and recorder
+                               (FdmFeed): the arguments a scenario body takes
+
+  @pytest.mark.sitl_config(["set ap_yaw_mode = FIXED"], initial_yaw_deg=90.0)
+  def test_something(sitl, rc, fdm):
+      sitl_harness.boot_and_engage(sitl, rc, fdm)
+"""
+
+import fcntl
+import os
+import re
+import shutil
+
+import pytest
+
+import sitl_dist
+import sitl_harness as harness
+
+
+class LegFailed(Exception):
+    """Marks a fixture-driven leg failed when its test did."""
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sitl", "SITL harness")
+    group.addoption("--sitl-binary", default=os.environ.get("SITL_BINARY"),
+                    help="betaflight_SITL.elf under test (default $SITL_BINARY); SITL tests skip without one")
+    group.addoption("--sitl-binary-b", default=os.environ.get("SITL_BINARY_B"),
+                    help="B binary for the A/B scenarios (default $SITL_BINARY_B)")
+    group.addoption("--sitl-repeat", type=int, default=1, metavar="N",
+                    help="fly every scenario leg N times (the harness's --repeat); A/B significance checks need 2+")
+    group.addoption("--sitl-workdir", help="leg directories (per xdist worker below it; default a pytest tmpdir)")
+    group.addoption("--sitl-isolate", choices=["auto", "netns", "lock"], default="auto",
+                    help="private network namespace per pytest process, or legs serialised by a host lock")
+    group.addoption("--sitl-chain", action="store_true",
+                    help="reuse one SITL instance per pytest process, reconfigured between tests")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "sitl_config(cli_lines, **opts): extra CLI lines and scenario options "
+                            "(initial_yaw_deg, ...) for the sitl_leg fixture")
+    harness.VERBOSE = config.getoption("verbose") > 1
+    harness.TELEMETRY_PORT = 0
+    harness.REPEAT = max(1, config.getoption("sitl_repeat"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = yield
+    if report.when == "call":
+        item.sitl_report = report   # read back by sitl_leg's teardown
+    return report
+
+
+@pytest.fixture(scope="session")
+def sitl_binary(request):
+    path = request.config.getoption("sitl_binary")
+    if not path:
+        pytest.skip("no SITL binary (--sitl-binary or SITL_BINARY)")
+    if not os.path.exists(path):
+        pytest.fail(f"SITL binary not found: {path}")
+    return os.path.abspath(path)
+
+
+@pytest.fixture(scope="session")
+def sitl_binary_b(request):
+    path = request.config.getoption("sitl_binary_b")
+    return os.path.abspath(path) if path else None
+
+
+@pytest.fixture(scope="session")
+def sitl_workdir(request, tmp_path_factory):
+    base = request.config.getoption("sitl_workdir")
+    if base is None:
+        return str(tmp_path_factory.mktemp("sitl"))
+    path = os.path.join(os.path.abspath(base), os.environ.get("PYTEST_XDIST_WORKER", "main"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@pytest.fixture(scope="session")
+def sitl_isolation(request):
+    mode = request.config.getoption("sitl_isolate")
+    if mode != "lock" and sitl_dist.enter_netns():
+        return "netns"
+    if mode == "netns":
+        pytest.fail("no private network namespace on this host (try --sitl-isolate lock)")
+    return "lock"
+
+
+@pytest.fixture
+def sitl_host_lock(sitl_isolation):
+    """Held for a test's legs when this process shares the host's ports."""
+    if sitl_isolation == "netns":
+        yield
+        return
+    with open(sitl_dist.LOCK_PATH, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+@pytest.fixture(scope="session")
+def sitl_chain(request, sitl_isolation):
+    if not request.config.getoption("sitl_chain") or sitl_isolation != "netns":
+        yield None
+        return
+    chain = harness.Chain()
+    yield chain
+    chain.close()
+
+
+@pytest.fixture
+def sitl_leg(request, sitl_binary, sitl_workdir, sitl_chain, sitl_host_lock):
+    marker = request.node.get_closest_marker("sitl_config")
+    cli_lines = list(marker.args[0]) if marker is not None and marker.args else []
+    opts = dict(marker.kwargs) if marker is not None else {}
+    leg_dir = os.path.join(sitl_workdir, re.sub(r"[^\w.-]+", "_", request.node.name))
+    shutil.rmtree(leg_dir, ignore_errors=True)
+    try:
+        with harness.open_leg(request.node.name, None, cli_lines, opts, sitl_binary, leg_dir, sitl_chain) as leg:
+            yield leg
+            report = getattr(request.node, "sitl_report", None)
+            if report is not None and report.failed:
+                # the test's own failure: recorded in the leg's metrics.json,
+                # already reported by pytest
+                crash = getattr(report.longrepr, "reprcrash", None)
+                raise LegFailed(crash.message if crash is not None else "test failed")
+    except LegFailed:
+        pass
+
+
+@pytest.fixture
+def sitl(sitl_leg):
+    return sitl_leg.sitl
+
+
+@pytest.fixture
+def rc(sitl_leg):
+    return sitl_leg.rc
+
+
+@pytest.fixture
+def fdm(sitl_leg):
+    return sitl_leg.fdm
@@ -0,0 +1,143 @@
+"""Seeded link impairment between the harness feeds and SITL.
+
+RcFeed and FdmFeed normally hand every datagram straight to the loopback
+interface, so SITL sees an ideal radio and an ideal sensor bus. With
+--impair-rc / --impair-fdm each feed sends through an ImpairedLink instead,
+which models the link:
+
+  delay=MS       fixed one-way delay
+  jitter=MS      extra delay drawn uniformly from [0, MS) per datagram
+  loss=P         independent loss probability per datagram
+  burst=P        probability per datagram of entering a loss burst
+  burst_len=N    mean burst length in datagrams (default 5)
+  reorder=0|1    let jittered datagrams overtake each other; by default the
+                 link stays FIFO, like a serial radio, and jitter only
+                 bunches datagrams up
+  seed=N         random seed (default 0): the same spec drops and delays
+                 the same datagrams on every run
+
+e.g. --impair-rc delay=40,jitter=20,burst=0.01,burst_len=25. Burst loss is
+a Gilbert-Elliott channel: a good state with the independent `loss`, a bad
+state that drops everything and is left with probability 1 / burst_len.
+"""
+
+import heapq
+import random
+import threading
+import time
+
+FIELDS = {"delay": float, "jitter": float, "loss": float, "burst": float,
+          "burst_len": float, "reorder": int, "seed": int}
+
+
+def parse_spec(spec):
+    """{field: value} from a comma-separated key=value spec; ValueError on
+    an unknown key or a value out of range."""
+    out = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, sep, value = item.partition("=")
+        if not sep or key not in FIELDS:
+            raise ValueError(f"bad impairment term {item!r} (known: {', '.join(FIELDS)})")
+        out[key] = FIELDS[key](value)
+    for key in ("loss", "burst"):
+        if not 0.0 <= out.get(key, 0.0) <= 1.0:
+            raise ValueError(f"{key} is a probability: {out[key]}")
+    if out.get("delay", 0.0) < 0.0 or out.get("jitter", 0.0) < 0.0:
+        raise ValueError("delay and jitter cannot be negative")
+    if out.get("burst_len", 1.0) < 1.0:
+        raise ValueError("burst_len is at least one datagram")
+    return out
+
+
+class ImpairedLink:
+    """sendto() stand-in for a feed's UDP socket.
+
+    Loss is decided as each datagram is sent; delayed datagrams wait in a
+    heap for a delivery thread, which is only started when the spec delays
+    anything at all."""
+
+    def __init__(self, sock, spec):
+        params = parse_spec(spec) if isinstance(spec, str) else dict(spec)
+        self.sock = sock
+        self.delay = params.get("delay", 0.0) / 1000.0
+        self.jitter = params.get("jitter", 0.0) / 1000.0
+        self.loss = params.get("loss", 0.0)
+        self.burst = params.get("burst", 0.0)
+        self.burst_exit = 1.0 / params.get("burst_len", 5.0)
+        self.reorder = bool(params.get("reorder", 0))
+        self.rng = random.Random(params.get("seed", 0))
+        self.bad = False
+        self.sent = 0
+        self.lost = 0
+        self.delivered = 0
+        self.reordered = 0
+        self._seq = 0
+        self._last_due = 0.0
+        self._last_seq = 0
+        self._queue = []
+        self._cond = threading.Condition()
+        self.running = True
+        self._thread = None
+        if self.delay or self.jitter:
+            self._thread = threading.Thread(target=self._deliver, daemon=True)
+            self._thread.start()
+
+    def _dropped(self):
+        if self.bad:
+            if self.rng.random() < self.burst_exit:
+                self.bad = False
+        elif self.burst and self.rng.random() < self.burst:
+            self.bad = True
+        return self.bad or (self.loss and self.rng.random() < self.loss)
+
+    def sendto(self, payload, addr):
+        self.sent += 1
+        if self._dropped():
+            self.lost += 1
+            return
+        if self._thread is None:
+            self.sock.sendto(payload, addr)
+            self.delivered += 1
+            return
+        due = time.monotonic() + self.delay + self.rng.random() * self.jitter
+        with self._cond:
+            if not self.reorder:
+                due = max(due, self._last_due)
+                self._last_due = due
+            self._seq += 1
+            # the feeds rewrite their packet buffer in place: queue a copy
+            heapq.heappush(self._queue, (due, self._seq, bytes(payload), addr))
+            self._cond.notify()
+
+    def _deliver(self):
+        while True:
+            with self._cond:
+                while self.running and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    self._cond.wait(None if not self._queue else self._queue[0][0] - time.monotonic())
+                if not self.running:
+                    return
+                _due, seq, payload, addr = heapq.heappop(self._queue)
+            if seq < self._last_seq:
+                self.reordered += 1
+            self._last_seq = max(self._last_seq, seq)
+            try:
+                self.sock.sendto(payload, addr)
+                self.delivered += 1
+            except OSError:
+                pass
+
+    def stats(self, reset=False):
+        """Datagram counters since construction or the last reset."""
+        out = {"sent": self.sent, "lost": self.lost, "delivered": self.delivered,
+               "reordered": self.reordered}
+        if reset:
+            self.sent = self.lost = self.delivered = self.reordered = 0
+        return out
+
+    def close(self):
+        """Stop delivering; datagrams still in flight are dropped."""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
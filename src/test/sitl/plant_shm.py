@@ -0,0 +1,198 @@
+"""Shared-memory block between the harness and an out-of-process plant.
+
+With --plant-process the motion model, the FDM sender and the servo-packet
+listener run in a child process (sitl_harness.py --plant <file>), so
+scenario predicates, MSP polling and trajectory analytics in the harness
+interpreter never hold the GIL the plant loop is waiting for. The two sides
+share one mmap'd file, <leg>/plant.shm:
+
+  control  harness -> plant: stop, FDM streaming on/off, GPS validity, the
+           FC's arm/mode status (for the telemetry fan-out), plant resets
+           and position nudges
+  model    plant -> harness: latest model state, under a sequence lock
+  motors   plant -> harness: servo frame count and motor outputs, under its
+           own sequence lock (the plant's motor listener is its own thread)
+  trace    plant -> harness: the control-loop latency tracer's counters and
+           histograms (sitl_harness.LatencyTracer), kept in place
+  history  plant -> harness: the ~10 Hz recorder samples as a ring, each
+           tagged with the reset generation it was recorded under
+
+Every field has one writer. Sequence words sit at 8-byte aligned offsets
+and are accessed in native layout, as in telemetry_ring.py, so a reader
+never sees a half-written number. A sequence word left odd for longer
+than STALE_WRITE_S means the plant died mid-update: the read raises.
+"""
+
+import mmap
+import struct
+import time
+
+PLANT_MAGIC = b"SITLPLNT"
+PLANT_VERSION = 3
+HISTORY_CAPACITY = 1024   # ~100 s of 10 Hz samples; the harness drains at 20 Hz
+STALE_WRITE_S = 1.0       # a publish takes microseconds
+
+U64 = struct.Struct("Q")
+I64 = struct.Struct("q")
+F64 = struct.Struct("d")
+U32 = struct.Struct("I")
+
+# control block
+MAGIC_OFFSET = 0
+VERSION_OFFSET = 8
+READY_OFFSET = 12     # set by the plant once its motor port is bound
+STOP_OFFSET = 16
+FDM_RUN_OFFSET = 24
+GPS_VALID_OFFSET = 32
+ARMED_OFFSET = 40     # -1 while no FC status is known
+MODE_MASK_OFFSET = 48
+RESET_GEN_OFFSET = 56
+RESET_YAW_OFFSET = 64
+T0_OFFSET = 72        # time.monotonic() of t = 0, shared by both sides
+NUDGE_SEQ_OFFSET = 80
+NUDGE_EAST_OFFSET = 88
+
+# t, pos ENU m, vel ENU m/s, roll, pitch, yaw (model conventions, rad),
+# body rates rad/s
+MODEL_SEQ_OFFSET = 128
+MODEL = struct.Struct("<d3d3d3d3d")
+MODEL_OFFSET = 136
+
+# servo frames received, motor outputs
+MOTORS_SEQ_OFFSET = 256
+MOTORS = struct.Struct("<Q4d")
+MOTORS_OFFSET = 264
+
+# LatencyTracer block: sitl_harness checks its layout against TRACE_SIZE
+# at import
+TRACE_OFFSET = 320
+TRACE_SIZE = 1192
+
+# sample number, reset generation, (t, east, north, up, ve, vn, vu, heading_deg)
+HISTORY_SEQ_OFFSET = TRACE_OFFSET + TRACE_SIZE
+HISTORY_OFFSET = HISTORY_SEQ_OFFSET + 64
+SLOT = struct.Struct("<QQ8d")
+
+
+class PlantShm:
+    """One plant.shm mapping; the harness creates it, the plant attaches."""
+
+    def __init__(self, path, create=False, capacity=HISTORY_CAPACITY):
+        self.path = path
+        if create:
+            size = HISTORY_OFFSET + capacity * SLOT.size
+            with open(path, "w+b") as f:
+                f.truncate(size)
+                self.mm = mmap.mmap(f.fileno(), size)
+            self.mm[MAGIC_OFFSET:MAGIC_OFFSET + 8] = PLANT_MAGIC
+            U32.pack_into(self.mm, VERSION_OFFSET, PLANT_VERSION)
+            I64.pack_into(self.mm, ARMED_OFFSET, -1)
+            U64.pack_into(self.mm, GPS_VALID_OFFSET, 1)
+        else:
+            with open(path, "r+b") as f:
+                self.mm = mmap.mmap(f.fileno(), 0)
+            if (self.mm[MAGIC_OFFSET:MAGIC_OFFSET + 8] != PLANT_MAGIC
+                    or U32.unpack_from(self.mm, VERSION_OFFSET)[0] != PLANT_VERSION):
+                self.mm.close()
+                raise ValueError(f"not a v{PLANT_VERSION} plant block: {path}")
+        self.capacity = (len(self.mm) - HISTORY_OFFSET) // SLOT.size
+        self._model_seq = 0
+        self._motors_seq = 0
+        self._history_seq = 0
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    # --- control ---------------------------------------------------------
+
+    def get(self, offset, fmt=U64):
+        return fmt.unpack_from(self.mm, offset)[0]
+
+    def set(self, offset, value, fmt=U64):
+        fmt.pack_into(self.mm, offset, value)
+
+    def reset(self, initial_yaw_deg, t0):
+        """Publish a plant reset: parameters first, then the generation."""
+        self.set(RESET_YAW_OFFSET, initial_yaw_deg, F64)
+        self.set(T0_OFFSET, t0, F64)
+        self.set(GPS_VALID_OFFSET, 1)
+        gen = self.get(RESET_GEN_OFFSET) + 1
+        self.set(RESET_GEN_OFFSET, gen)
+        return gen
+
+    def nudge_east(self, metres):
+        self.set(NUDGE_EAST_OFFSET, metres, F64)
+        self.set(NUDGE_SEQ_OFFSET, self.get(NUDGE_SEQ_OFFSET) + 1)
+
+    # --- model and motors (sequence-locked) ------------------------------
+
+    def _publish(self, seq_offset, seq, st, offset, values):
+        U64.pack_into(self.mm, seq_offset, seq + 1)   # odd: being written
+        st.pack_into(self.mm, offset, *values)
+        U64.pack_into(self.mm, seq_offset, seq + 2)
+        return seq + 2
+
+    def _read(self, seq_offset, st, offset):
+        deadline = None
+        while True:
+            before = U64.unpack_from(self.mm, seq_offset)[0]
+            if not before & 1:
+                values = st.unpack_from(self.mm, offset)
+                if U64.unpack_from(self.mm, seq_offset)[0] == before:
+                    return values
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + STALE_WRITE_S
+            elif time.monotonic() > deadline:
+                raise RuntimeError(f"{self.path}: plant stopped mid-update (seq {before} at {seq_offset})")
+
+    def publish_model(self, t, model):
+        pos, vel, rates = model.pos, model.vel, model.rates
+        self._model_seq = self._publish(
+            MODEL_SEQ_OFFSET, self._model_seq, MODEL, MODEL_OFFSET,
+            (t, pos[0], pos[1], pos[2], vel[0], vel[1], vel[2],
+             model.roll, model.pitch, model.yaw, rates[0], rates[1], rates[2]))
+
+    def read_model(self):
+        return self._read(MODEL_SEQ_OFFSET, MODEL, MODEL_OFFSET)
+
+    def publish_motors(self, frames, motors):
+        self._motors_seq = self._publish(MOTORS_SEQ_OFFSET, self._motors_seq, MOTORS, MOTORS_OFFSET,
+                                         (frames, motors[0], motors[1], motors[2], motors[3]))
+
+    def read_motors(self):
+        """(frames, (m1, m2, m3, m4))."""
+        v = self._read(MOTORS_SEQ_OFFSET, MOTORS, MOTORS_OFFSET)
+        return v[0], v[1:]
+
+    # --- history ring ----------------------------------------------------
+
+    def append_history(self, sample, gen):
+        self._history_seq += 1
+        off = HISTORY_OFFSET + ((self._history_seq - 1) % self.capacity) * SLOT.size
+        U64.pack_into(self.mm, off, 0)   # invalidate while the slot is rewritten
+        SLOT.pack_into(self.mm, off, 0, gen, *sample)
+        U64.pack_into(self.mm, off, self._history_seq)
+        U64.pack_into(self.mm, HISTORY_SEQ_OFFSET, self._history_seq)
+
+    def read_history(self, next_seq):
+        """([(gen, sample), ...], next_seq, lost) for every slot published
+        from next_seq on; slots already overwritten count as lost."""
+        written = U64.unpack_from(self.mm, HISTORY_SEQ_OFFSET)[0]
+        lost = 0
+        if written - next_seq + 1 > self.capacity:
+            skip = written - self.capacity + 1
+            lost += skip - next_seq
+            next_seq = skip
+        out = []
+        while next_seq <= written:
+            off = HISTORY_OFFSET + ((next_seq - 1) % self.capacity) * SLOT.size
+            v = SLOT.unpack_from(self.mm, off)
+            if v[0] == next_seq and U64.unpack_from(self.mm, off)[0] == next_seq:
+                out.append((v[1], v[2:]))
+            else:
+                lost += 1
+            next_seq += 1
+        return out, next_seq, lost
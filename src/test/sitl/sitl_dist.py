@@ -0,0 +1,432 @@
+"""Coordinator/worker distribution of SITL scenarios across hosts.
+
+The coordinator (sitl_harness.py --serve PORT) owns the scenario queue and
+the firmware binaries. Workers (sitl_harness.py --worker HOST:PORT) connect
+over TCP, pull one scenario job at a time, run it through the ordinary
+single-scenario harness CLI in a child process, and send back the child's
+output line by line and the scenario directory as a gzipped tar, which the
+coordinator unpacks into its own workdir exactly where a local run would
+have left it. A worker that drops its connection mid-job has the job put
+back on the queue.
+
+The SITL binary binds fixed ports (9002-9004, MSP 5761), so two legs cannot
+share a network namespace. Each job's child runs in a private one
+(`unshare --user --map-root-user --net`, loopback brought up) when the host
+allows it; otherwise jobs on the host are serialised through a file lock.
+That makes several workers on one machine behave like separate nodes:
+  sitl_harness.py --binary ... --serve 0 --local-workers 4
+The pytest plugin (conftest.py) isolates its xdist workers the same way,
+entering the namespace in process (enter_netns) or taking the same lock.
+
+The coordinator listens on loopback unless told otherwise, and every
+worker must open with the coordinator's shared token (--token, or
+SITL_DIST_TOKEN in the environment): a connection that can take jobs can
+also read the binaries and write result files into the workdir. Result
+archives are unpacked only if every member is a plain file or directory
+inside the scenario directory.
+
+Protocol: one JSON object per line. A message with a "size" field is
+followed by exactly that many raw bytes (a binary or a result tarball).
+  worker -> coordinator: hello {worker, token}, next, fetch {sha256},
+                         log {id, line}, result {id, ok, wall_s, size}
+  coordinator -> worker: job {id, scenario, binary, binary_b, flags},
+                         blob {sha256, size}, done, refused {reason}
+"""
+
+import ctypes
+import fcntl
+import heapq
+import hmac
+import json
+import os
+import secrets
+import shutil
+import socket
+import sqlite3
+import struct
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+
+from sitl_metrics import binary_hash
+
+MAX_ATTEMPTS = 3          # dispatches of one job before it is failed for lost workers
+DEFAULT_ESTIMATE_S = 300.0  # scenario duration assumed with no history at all
+CHUNK = 1 << 16
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "sitl_harness.lock")
+TOKEN_ENV = "SITL_DIST_TOKEN"
+
+CLONE_NEWNET = 0x40000000
+CLONE_NEWUSER = 0x10000000
+SIOCGIFFLAGS = 0x8913
+SIOCSIFFLAGS = 0x8914
+IFF_UP = 0x1
+IFREQ = struct.Struct("16sH14x")
+
+
+def log(msg):
+    print(f"[dist] {msg}", flush=True)
+
+
+def send_msg(f, msg, blob_path=None):
+    """Write one message line, then the file at blob_path if given (its size
+    goes into the message), and flush."""
+    if blob_path is not None:
+        msg = dict(msg, size=os.path.getsize(blob_path))
+    f.write(json.dumps(msg).encode() + b"\n")
+    if blob_path is not None:
+        with open(blob_path, "rb") as src:
+            shutil.copyfileobj(src, f, CHUNK)
+    f.flush()
+
+
+def recv_msg(f):
+    """The next message, or None once the peer has closed the connection."""
+    line = f.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def recv_blob(f, size, path):
+    """Copy the `size` raw bytes following a message into path."""
+    with open(path, "wb") as dst:
+        while size > 0:
+            block = f.read(min(CHUNK, size))
+            if not block:
+                raise ConnectionError("connection closed mid-transfer")
+            dst.write(block)
+            size -= len(block)
+
+
+def pack_dir(src_dir, path):
+    with tarfile.open(path, "w:gz") as tar:
+        for entry in sorted(os.listdir(src_dir)):
+            tar.add(os.path.join(src_dir, entry), arcname=entry)
+
+
+def checked_members(tar):
+    """The archive's members; TarError for any that could land outside the
+    destination (an absolute path or `..`) or is not a plain file or
+    directory (links, devices)."""
+    members = tar.getmembers()
+    for member in members:
+        if os.path.isabs(member.name) or ".." in member.name.replace("\\", "/").split("/"):
+            raise tarfile.TarError(f"unsafe path in result archive: {member.name}")
+        if not (member.isfile() or member.isdir()):
+            raise tarfile.TarError(f"not a file or directory in result archive: {member.name}")
+    return members
+
+
+def unpack_dir(path, dst_dir):
+    with tarfile.open(path, "r:gz") as tar:
+        members = checked_members(tar)
+        shutil.rmtree(dst_dir, ignore_errors=True)
+        os.makedirs(dst_dir)
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(dst_dir, members, filter="data")
+        else:
+            tar.extractall(dst_dir, members)
+
+
+def lpt_order(jobs, estimates, default=None):
+    """Jobs longest-estimated first. Workers pull the next job as they free
+    up, so this order is LPT list scheduling: the long scenarios start
+    early instead of setting the makespan by starting last. A scenario
+    without history is estimated at `default`, by default the longest known
+    duration, so it is started early rather than risk running last."""
+    if default is None:
+        default = max(estimates.values(), default=DEFAULT_ESTIMATE_S)
+    return sorted(jobs, key=lambda job: -estimates.get(job["scenario"], default))
+
+
+def lpt_makespan(durations, workers):
+    """Makespan of list-scheduling `durations` in order onto `workers`."""
+    loads = [0.0] * max(1, workers)
+    for d in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + d)
+    return max(loads)
+
+
+class Coordinator:
+    """Serves `jobs` (dicts with scenario, binary, binary_b, flags) to workers.
+
+    `on_result(job, ok, scenario_dir)` runs once a job's artifacts are
+    unpacked into <workdir>/<scenario>, with the worker's measured run time
+    in job["wall_s"]; calls are serialised across the connection threads.
+    A job with a "part" number is one of several runs of its scenario: its
+    artifacts go to <workdir>/<scenario>/part.<n>, and the scenario passes
+    only if every part does. Jobs are handed out in list order (see
+    lpt_order). Workers authenticate with `token`, a fresh random one when
+    not given."""
+
+    def __init__(self, jobs, workdir, port=0, on_result=None, host="127.0.0.1", token=None):
+        self.workdir = workdir
+        self.on_result = on_result
+        self.token = token or secrets.token_hex(16)
+        self.queue = [dict(job, id=i, attempts=0) for i, job in enumerate(jobs)]
+        self.pending = len(self.queue)
+        self.results = {}
+        self.blobs = {}
+        for job in self.queue:
+            for key in ("binary", "binary_b"):
+                if job.get(key):
+                    path = os.path.abspath(job[key])
+                    sha = binary_hash(path)
+                    self.blobs[sha] = path
+                    job[key] = {"path": path, "sha256": sha}
+        self.cond = threading.Condition()
+        self.result_lock = threading.Lock()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self._accept, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        log(f"coordinator on port {self.port}: {self.pending} jobs")
+
+    def wait(self):
+        """Block until every job has a result; {scenario: ok}."""
+        with self.cond:
+            while self.pending:
+                self.cond.wait()
+        self.listener.close()
+        return self.results
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn, addr), daemon=True).start()
+
+    def _take(self):
+        """Next queued job; blocks while others are still out (they may be
+        requeued), None once nothing is left to hand out."""
+        with self.cond:
+            while not self.queue and self.pending:
+                self.cond.wait()
+            if not self.queue:
+                return None
+            job = self.queue.pop(0)
+            job["attempts"] += 1
+            return job
+
+    def _finish(self, job, ok):
+        with self.cond:
+            self.results[job["scenario"]] = self.results.get(job["scenario"], True) and ok
+            self.pending -= 1
+            self.cond.notify_all()
+
+    def _requeue(self, job, worker):
+        if job["attempts"] >= MAX_ATTEMPTS:
+            log(f"=== FAIL: {job['scenario']}: lost {MAX_ATTEMPTS} workers running it")
+            self._finish(job, False)
+            return
+        log(f"worker {worker} lost running {job['scenario']}; requeued")
+        with self.cond:
+            self.queue.insert(0, job)
+            self.cond.notify_all()
+
+    def _serve(self, conn, addr):
+        f = conn.makefile("rwb")
+        worker = f"{addr[0]}:{addr[1]}"
+        job = None
+        authenticated = False
+        try:
+            while True:
+                msg = recv_msg(f)
+                if msg is None:
+                    break
+                op = msg["op"]
+                if op == "hello":
+                    if not hmac.compare_digest(str(msg.get("token", "")).encode(), self.token.encode()):
+                        log(f"worker {worker}: refused, bad token")
+                        send_msg(f, {"op": "refused", "reason": "bad token"})
+                        break
+                    authenticated = True
+                    worker = msg.get("worker", worker)
+                    log(f"worker {worker} connected")
+                elif not authenticated:
+                    log(f"worker {worker}: refused, {op!r} before hello")
+                    break
+                elif op == "next":
+                    job = self._take()
+                    if job is None:
+                        send_msg(f, {"op": "done"})
+                        break
+                    send_msg(f, {"op": "job", **{k: job[k] for k in ("id", "scenario", "binary", "binary_b", "flags")}})
+                elif op == "fetch":
+                    send_msg(f, {"op": "blob", "sha256": msg["sha256"]}, self.blobs[msg["sha256"]])
+                elif op == "log":
+                    print(f"[{worker}] {msg['line']}", flush=True)
+                elif op == "result":
+                    if job is None:
+                        log(f"worker {worker}: refused, result without a job")
+                        break
+                    scenario_dir = os.path.join(self.workdir, job["scenario"])
+                    if job.get("part"):
+                        scenario_dir = os.path.join(scenario_dir, f"part.{job['part']}")
+                    with tempfile.NamedTemporaryFile(dir=self.workdir, suffix=".tar.gz") as tmp:
+                        recv_blob(f, msg["size"], tmp.name)
+                        unpack_dir(tmp.name, scenario_dir)
+                    job["wall_s"] = msg.get("wall_s")
+                    done, job = job, None
+                    if self.on_result is not None:
+                        # the artifacts are in: a failure to record them
+                        # must not put the job back on the queue
+                        try:
+                            with self.result_lock:
+                                self.on_result(done, msg["ok"], scenario_dir)
+                        except (sqlite3.Error, OSError) as e:
+                            log(f"recording {done['scenario']} failed: {e}")
+                    self._finish(done, msg["ok"])
+        except (OSError, ValueError, KeyError, tarfile.TarError) as e:
+            log(f"worker {worker}: {e}")
+        finally:
+            if job is not None:
+                self._requeue(job, worker)
+            f.close()
+            conn.close()
+
+
+def netns_available():
+    """Whether this host lets an unprivileged user own a network namespace."""
+    try:
+        res = subprocess.run(["unshare", "--user", "--map-root-user", "--net", "sh", "-c", "ip link set lo up"],
+                             capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return res.returncode == 0
+
+
+def enter_netns():
+    """In-process counterpart of the workers' `unshare` wrapper: move the
+    calling thread into a fresh network namespace with loopback up, so the
+    SITL instances, feeds and sockets it starts from then on get ports of
+    their own. Threads already running stay in the host's namespace.
+
+    Root gets a plain CLONE_NEWNET; anyone else needs a user namespace too,
+    which the kernel only grants a single-threaded process. False where
+    neither is permitted."""
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.unshare(CLONE_NEWNET) != 0:
+        uid, gid = os.getuid(), os.getgid()
+        if libc.unshare(CLONE_NEWUSER | CLONE_NEWNET) != 0:
+            return False
+        for path, text in (("/proc/self/setgroups", "deny"), ("/proc/self/uid_map", f"0 {uid} 1"),
+                           ("/proc/self/gid_map", f"0 {gid} 1")):
+            with open(path, "w") as f:
+                f.write(text)
+    # past the unshare the thread is already inside: a namespace without
+    # loopback is no fallback, so failures from here on propagate
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        flags = IFREQ.unpack(fcntl.ioctl(s, SIOCGIFFLAGS, IFREQ.pack(b"lo", 0)))[1]
+        fcntl.ioctl(s, SIOCSIFFLAGS, IFREQ.pack(b"lo", flags | IFF_UP))
+    return True
+
+
+class Worker:
+    """Pulls jobs from a coordinator and runs each through `harness` (the
+    sitl_harness.py path) in a child process under <workdir>/job<id>."""
+
+    def __init__(self, address, workdir, harness, isolate="auto", cpus=None, token=None):
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.workdir = os.path.abspath(workdir)
+        self.harness = harness
+        self.netns = netns_available() if isolate == "auto" else isolate == "netns"
+        self.cpus = cpus   # taskset list this worker's legs are pinned to, or None
+        self.name = f"{socket.gethostname()}/{os.getpid()}"
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV, "")
+        self.hashes = {}
+
+    def run(self):
+        os.makedirs(os.path.join(self.workdir, "binaries"), exist_ok=True)
+        log(f"worker {self.name}: isolation {'netns' if self.netns else 'host lock ' + LOCK_PATH}"
+            + (f", cpus {self.cpus}" if self.cpus else ""))
+        conn = socket.create_connection(self.address)
+        f = conn.makefile("rwb")
+        try:
+            send_msg(f, {"op": "hello", "worker": self.name, "token": self.token})
+            while True:
+                send_msg(f, {"op": "next"})
+                msg = recv_msg(f)
+                if msg is not None and msg["op"] == "refused":
+                    raise ConnectionError(f"coordinator refused this worker: {msg['reason']}")
+                if msg is None or msg["op"] == "done":
+                    return
+                self._run_job(f, msg)
+        finally:
+            f.close()
+            conn.close()
+
+    def _local_binary(self, f, ref):
+        """A local path holding the binary `ref` names: the coordinator's own
+        path when this host sees the same file, else a fetched copy."""
+        if ref is None:
+            return None
+        path, sha = ref["path"], ref["sha256"]
+        if os.path.exists(path):
+            st = os.stat(path)
+            key = (path, st.st_size, st.st_mtime)
+            if key not in self.hashes:
+                self.hashes[key] = binary_hash(path)
+            if self.hashes[key] == sha:
+                return path
+        cached = os.path.join(self.workdir, "binaries", sha[:16] + ".elf")
+        if not os.path.exists(cached):
+            send_msg(f, {"op": "fetch", "sha256": sha})
+            msg = recv_msg(f)
+            if msg is None or msg["op"] != "blob":
+                raise ConnectionError("coordinator did not send the binary")
+            recv_blob(f, msg["size"], cached + ".part")
+            os.chmod(cached + ".part", 0o755)
+            os.rename(cached + ".part", cached)
+        return cached
+
+    def _run_job(self, f, job):
+        scratch = os.path.join(self.workdir, f"job{job['id']}")
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(scratch)
+        cmd = [sys.executable, self.harness, "--binary", self._local_binary(f, job["binary"]),
+               "--scenario", job["scenario"], "--workdir", scratch,
+               "--metrics-db", "", "--telemetry-port", "0",
+               "--eeprom-cache", os.path.join(self.workdir, "eeprom_cache")] + job["flags"]
+        binary_b = self._local_binary(f, job["binary_b"])
+        if binary_b:
+            cmd += ["--binary-b", binary_b]
+        if self.cpus:
+            cmd += ["--cpus", self.cpus]
+        if self.netns:
+            cmd = ["unshare", "--user", "--map-root-user", "--net",
+                   "sh", "-c", 'ip link set lo up && exec "$@"', "sh"] + cmd
+
+        t_start = time.monotonic()
+        lines = []
+        with open(LOCK_PATH, "a") as lock:
+            if not self.netns:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in proc.stdout:
+                line = line.rstrip("\n")
+                lines.append(line)
+                send_msg(f, {"op": "log", "id": job["id"], "line": line})
+            proc.wait()
+        wall_s = time.monotonic() - t_start
+
+        scenario_dir = os.path.join(scratch, job["scenario"])
+        os.makedirs(scenario_dir, exist_ok=True)
+        with open(os.path.join(scenario_dir, "harness.log"), "w") as out:
+            out.write("\n".join(lines) + "\n")
+        tarball = os.path.join(scratch, "result.tar.gz")
+        pack_dir(scenario_dir, tarball)
+        send_msg(f, {"op": "result", "id": job["id"], "ok": proc.returncode == 0, "wall_s": wall_s}, tarball)
+        shutil.rmtree(scratch, ignore_errors=True)
@@ -6,7 +6,41 @@ Drives a betaflight_SITL binary the way a simulator and transmitter would:
   - FDM state over UDP :9003 (fdm_packet: 18 doubles; virtual-GPS mode puts
     lon/lat/alt in position_xyz and ENU velocity in velocity_xyz)
   - MSP over TCP :5761 for runtime state (modes, arming disable flags)
-  - one-shot `--config <file>` runs to provision eeprom.bin per scenario
+  - eeprom.bin provisioned per scenario by a one-shot `--config <file>` run,
+    or over a live CLI session on the MSP port (--provision cli); results
+    are cached per binary + config so repeat legs skip the extra launch
+  - optional ground-truth fan-out: JSON over UDP :9005 and/or a per-leg
+    shared-memory ring (telemetry_ring.py) for local zero-copy readers
+  - per-leg named metrics (<leg>/metrics.json), accumulated across runs in a
+    SQLite database that sitl_metrics.py queries for trends and drift
+  - per-leg FC scheduler statistics (CLI `tasks` over MSP2_CLI_COMMAND,
+    <leg>/tasks.jsonl) on the clock of the recorded <leg>/trajectory.csv
+  - per-leg control-loop latency: servo packets matched to the fdm_packet
+    the FC answered, with drops, duplicates and percentiles as leg metrics
+  - optional coordinator/worker distribution of scenarios over TCP
+    (sitl_dist.py), each worker leg in its own network namespace
+  - optional cpu pinning and priority for SITL and the feed threads
+    (--cpus/--priority); local workers get disjoint cpu slices automatically
+  - optional out-of-process plant (--plant-process): motion model and
+    FDM/motor I/O in a child sharing state through <leg>/plant.shm
+    (plant_shm.py), isolated from scenario-side GIL contention
+  - optional repeats (--repeat N): every leg flown N times, metrics reduced
+    to means, spreads and bootstrap confidence intervals (sitl_stats.py),
+    A/B differences checked for significance
+  - SITL output through a pipe into a size-capped streaming compressor
+    (<leg>/sitl.log.gz); --keep failed drops passing legs' artifacts
+  - optional link impairment (--impair-rc/--impair-fdm, link_impair.py):
+    seeded delay, jitter, loss, burst loss and reordering on the feeds
+  - optional harness profiling (--profile, stack_sampler.py): sampled
+    collapsed stacks and per-thread CPU time for every leg
+  - pytest integration (conftest.py, test_scenarios.py): the scenarios as
+    parametrised tests and the rig as fixtures, xdist workers isolated in
+    network namespaces of their own
+  - benchmark mode (--benchmark): the reference missions flown and their
+    controller-performance metrics written as a JSON scorecard per build
+  - optional soak mode (--soak) for hours-long legs: constant memory, the
+    recorder spilled to compressed chunks (soak_history.py) and per-minute
+    rollups of hold error in <leg>/rollups.jsonl
 
 Scenarios exercise the flight plan / AUTOPILOT safety behaviour end to end:
 mode wiring, rx-loss policies (DISABLE / CONTINUE / LAND) and geofence
@@ -15,25 +49,58 @@ mode wiring, rx-loss policies (DISABLE / CONTINUE / LAND) and geofence
 Usage:
   sitl_harness.py --binary obj/main/betaflight_SITL.elf --scenario all
   sitl_harness.py --binary ... --scenario rx_continue -v
+  sitl_harness.py --binary ... --scenario mission_flight --capture
+  sitl_harness.py --binary ... --scenario all --chain   # one SITL instance, reconfigured per leg
+  sitl_harness.py --binary ... --scenario all --cpus 2-3 --priority realtime
+  sitl_harness.py --binary ... --scenario mission_flight --soak
+  sitl_harness.py --binary ... --binary-b ... --scenario rescue_ab --repeat 8   # B - A with CIs
+  sitl_harness.py --binary ... --benchmark scorecard.json --repeat 3
+  sitl_harness.py --binary ... --benchmark lat80.json --impair-rc delay=80,jitter=20 --impair-fdm delay=10
+  sitl_harness.py --binary ... --replay /tmp/sitl_harness/mission_flight/run/packets.cap --replay-rate 4
+  sitl_harness.py --binary ... --serve 7700 --serve-host 0.0.0.0 --token ...  # then on each node:
+  sitl_harness.py --worker coordinator-host:7700 --token ... --workdir /tmp/sitl_worker
+  sitl_harness.py --binary ... --serve 0 --local-workers 4
+  pytest src/test/sitl --sitl-binary obj/main/betaflight_SITL.elf -n 4
 """
 
 import argparse
+import array
+import collections
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
 import json
 import math
 import os
+import re
 import shutil
 import socket
 import struct
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 import uuid
 
+import plant_shm
+import stack_sampler
+from link_impair import ImpairedLink, parse_spec
+import sitl_stats
+import soak_history
+import trajectory_analytics as analytics
+from sitl_dist import TOKEN_ENV, Coordinator, Worker, lpt_makespan, lpt_order
+from sitl_metrics import MetricsDb, binary_hash, git_revision
+from telemetry_ring import TelemetryRing
+
 MSP_STATUS = 101
 MSP_RAW_GPS = 106
 MSP_BOXIDS = 119
 MSP_ACC_CALIBRATION = 205
+MSP_EEPROM_WRITE = 250
+MSP2_CLI_COMMAND = 0x3012
+MSP2_CLI_COMMAND_FLAG_REFUSED = 1 << 1
 
 TCP_PORT = 5761
 RC_PORT = 9004
@@ -59,6 +126,21 @@ RC_HIGH = 2000
 
 VERBOSE = False
 TELEMETRY_PORT = 9005  # ground-truth JSON fan-out for external visualisers, 0 disables
+CAPTURE = False        # --capture: per-leg binary log of every packet and MSP frame
+TELEMETRY_RING = False  # --telemetry-ring: per-leg shared-memory sample ring (telemetry_ring.py)
+PROVISION = "config"    # --provision: how eeprom.bin is produced ("config" process or live "cli" session)
+EEPROM_CACHE = None     # --eeprom-cache: directory of provisioned eeprom.bin images, None disables
+PLACEMENT = None        # --cpus: (SITL cpus, feed-thread cpus), None leaves both unpinned
+PRIORITY = "normal"     # --priority: "normal", "high" (nice) or "realtime" (SCHED_FIFO)
+PLANT_PROCESS = False   # --plant-process: motion model and FDM/motor I/O in a child process
+IMPAIR_RC = None        # --impair-rc: link_impair.py spec for the rc_packet link, None sends direct
+IMPAIR_FDM = None       # --impair-fdm: the same for the fdm_packet link
+LOG_CAP = 16 << 20      # --log-cap: bytes kept per streamed leg log (sitl.log.gz per launch, packets.cap, tasks.jsonl), 0 for no cap
+KEEP = "all"            # --keep: leg artifacts kept for "all" legs, or for "failed" legs only
+PROFILE = False         # --profile: per-leg stack sampling of the harness threads
+PART = None             # --part: this process flies run N of a distributed --repeat, judged by the coordinator
+REPEAT = 1              # --repeat: legs flown per scenario variant, aggregated with bootstrap CIs
+SOAK = False            # --soak: bounded recorder spilled to <leg>/history, per-minute rollups
 
 
 def log(msg):
@@ -70,25 +152,201 @@ def debug(msg):
         log(msg)
 
 
+# CPU placement. SITL's scheduler loop and the feed threads are the timing-
+# critical parts of a leg; left to the kernel they migrate between cores and
+# get preempted by whatever else the host runs, which shows up as FDM jitter.
+NICE_HIGH = -10
+FIFO_SITL = 10          # SCHED_FIFO levels with --priority realtime: the feeds
+FIFO_FEEDS = 20         # sleep between ticks, so they preempt the busy SITL loop
+
+
+def parse_cpus(spec):
+    """taskset-style list ("0-3,6") -> sorted cpu numbers."""
+    cpus = set()
+    for part in spec.split(","):
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+
+def format_cpus(cpus):
+    return ",".join(str(c) for c in cpus)
+
+
+def cpu_slices(cpus, n):
+    """Disjoint equal slices of `cpus` for n parallel workers; when there are
+    fewer cpus than workers, workers share single cpus round-robin."""
+    k = max(1, len(cpus) // n)
+    return [cpus[(i * k) % len(cpus):(i * k) % len(cpus) + k] for i in range(n)]
+
+
+def split_placement(cpus):
+    """(SITL cpus, feed cpus): SITL gets the first half, the feeds the rest,
+    so the plant never competes with the loop it is feeding."""
+    if len(cpus) < 2:
+        return cpus, cpus
+    half = len(cpus) // 2
+    return cpus[:half], cpus[half:]
+
+
+def realtime_permitted():
+    try:
+        return subprocess.run(["chrt", "-f", str(FIFO_SITL), "true"], capture_output=True).returncode == 0
+    except OSError:
+        return False   # no chrt (util-linux) on this host
+
+
+def sitl_command_prefix():
+    """taskset/chrt/nice wrapper for the SITL launch under --cpus/--priority."""
+    prefix = []
+    if PLACEMENT is not None:
+        prefix += ["taskset", "-c", format_cpus(PLACEMENT[0])]
+    if PRIORITY == "realtime":
+        prefix += ["chrt", "-f", str(FIFO_SITL)]
+    elif PRIORITY == "high":
+        prefix += ["nice", "-n", str(NICE_HIGH)]   # runs unchanged where not permitted
+    return prefix
+
+
+def place_feed_thread():
+    """Pin and prioritise the calling feed thread (0 is the calling thread
+    for the Linux calls). Best effort: placement is never worth failing a
+    leg over."""
+    try:
+        if PLACEMENT is not None:
+            os.sched_setaffinity(0, PLACEMENT[1])
+        if PRIORITY == "realtime":
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(FIFO_FEEDS))
+        elif PRIORITY == "high":
+            os.setpriority(os.PRIO_PROCESS, 0, NICE_HIGH)
+    except OSError as e:
+        debug(f"feed thread placement: {e}")
+
+
+# Wire formats, precompiled once: the feeds pack into preallocated buffers
+# rather than building a fresh bytes object per tick.
+RC_PACKET = struct.Struct("<d16H")   # rc_packet: timestamp + 16 channels
+RC_STAMP = struct.Struct("<d")       # rc_packet timestamp alone (channels live in the buffer)
+FDM_PACKET = struct.Struct("<18d")   # fdm_packet
+SERVO_PACKET = struct.Struct("<4f")  # servo_packet motor block
+
+# Packet capture: a magic header, then one record per packet or MSP frame -
+# (monotonic time, kind, payload length) followed by the raw payload bytes.
+# The length is 32-bit: an MSP_TX record is a whole write, which a batch of
+# frames can take past 64 KiB. v1 captures, with a 16-bit length, still read.
+CAP_MAGIC = b"SITLCAP\x02"
+CAP_RECORD = struct.Struct("<dBI")
+CAP_RECORDS = {b"SITLCAP\x01": struct.Struct("<dBH"), CAP_MAGIC: CAP_RECORD}
+CAP_RC = 1         # rc_packet sent to :9004
+CAP_FDM = 2        # fdm_packet sent to :9003
+CAP_SERVO = 3      # servo_packet received on :9002
+CAP_MSP_TX = 4     # MSP request frame
+CAP_MSP_RX = 5     # MSP reply frame
+
+
+class PacketCapture:
+    """Append-only binary log of what the harness sent and received.
+
+    Shared by the feed threads and the MSP client; writes are serialised so
+    records never interleave. Recording after close() is a no-op, so a feed
+    thread still winding down cannot fail the leg. The file holds at most
+    `cap` bytes (0: no cap): the head of the leg, which is what a replay
+    needs; later records are only counted."""
+
+    def __init__(self, path, cap=None):
+        self.path = path
+        self.cap = LOG_CAP if cap is None else cap
+        self.f = open(path, "wb")
+        self.f.write(CAP_MAGIC)
+        self.written = len(CAP_MAGIC)
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def record(self, kind, payload):
+        t = time.monotonic()
+        size = CAP_RECORD.size + len(payload)
+        with self.lock:
+            if self.f is None:
+                return
+            if self.cap and self.written + size > self.cap:
+                self.dropped += 1
+                return
+            self.f.write(CAP_RECORD.pack(t, kind, len(payload)))
+            self.f.write(payload)
+            self.written += size
+
+    def close(self):
+        with self.lock:
+            if self.f is None:
+                return
+            self.f.close()
+            self.f = None
+        if self.dropped:
+            log(f"{os.path.basename(self.path)}: {self.dropped} records past the {self.cap}-byte cap dropped")
+
+
+def read_capture(path):
+    """Yield (monotonic t, kind, payload) records from a capture file."""
+    with open(path, "rb") as f:
+        record = CAP_RECORDS.get(f.read(len(CAP_MAGIC)))
+        if record is None:
+            raise RuntimeError(f"not a packet capture: {path}")
+        while True:
+            head = f.read(record.size)
+            if len(head) < record.size:
+                return  # clean end, or a record truncated by a killed run
+            t, kind, size = record.unpack(head)
+            payload = f.read(size)
+            if len(payload) < size:
+                return
+            yield t, kind, payload
+
+
 class RcFeed(threading.Thread):
-    """50 Hz rc_packet stream. Stop the stream to simulate RX loss."""
+    """50 Hz rc_packet stream. Stop the stream to simulate RX loss.
 
-    def __init__(self):
+    The channel values live in the packet buffer itself: set() writes the
+    next datagram in place and a tick only restamps and sends it. SITL reads
+    rc_packet in host byte order and always runs beside the harness."""
+
+    DEFAULTS = [RC_MID, RC_MID, RC_LOW, RC_MID] + [RC_LOW] * 12  # AERT + AUX
+
+    def __init__(self, capture=None):
         super().__init__(daemon=True)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.channels = [RC_MID, RC_MID, RC_LOW, RC_MID] + [RC_LOW] * 12  # AERT + AUX
+        self.link = ImpairedLink(self.sock, IMPAIR_RC) if IMPAIR_RC else self.sock
+        self.capture = capture
+        self.pkt = bytearray(RC_PACKET.size)
+        self.channels = memoryview(self.pkt)[RC_STAMP.size:].cast("H")
+        for i, v in enumerate(self.DEFAULTS):
+            self.channels[i] = v
         self.streaming = True
         self.running = True
         self.t0 = time.monotonic()
 
+    def start(self):
+        if not self.is_alive():   # a chained leg's feed is already running
+            super().start()
+
     def set(self, index, value):
         self.channels[index] = value
 
+    def reset(self):
+        """Sticks centred, throttle and every AUX low (disarmed), streaming."""
+        for i, v in enumerate(self.DEFAULTS):
+            self.channels[i] = v
+        self.streaming = True
+
     def run(self):
+        place_feed_thread()
+        addr = ("127.0.0.1", RC_PORT)
+        pkt = self.pkt
         while self.running:
             if self.streaming:
-                pkt = struct.pack("<d16H", time.monotonic() - self.t0, *self.channels)
-                self.sock.sendto(pkt, ("127.0.0.1", RC_PORT))
+                RC_STAMP.pack_into(pkt, 0, time.monotonic() - self.t0)
+                self.link.sendto(pkt, addr)
+                if self.capture:
+                    self.capture.record(CAP_RC, pkt)
             time.sleep(0.02)
 
     def stop_stream(self):
@@ -96,26 +354,176 @@ class RcFeed(threading.Thread):
 
     def shutdown(self):
         self.running = False
+        if self.link is not self.sock:
+            self.link.close()
+
+
+TRACE_COUNTERS = ("fdm_frames", "servo_frames", "dropped", "duplicated", "max_latency_us")
+TRACE_LAT_BUCKETS = 128   # latency histogram: bucket i ends at 10 us * 2^((i+1)/8), ~9 % wide, to ~0.65 s
+TRACE_LAG_BUCKETS = 16    # plant ticks from an fdm_packet to the tick that steps with its response
+TRACE_BASE_US = 10.0
+TRACE_WORD = struct.Struct("<Q")
+TRACE_SIZE = 8 * (len(TRACE_COUNTERS) + TRACE_LAT_BUCKETS + TRACE_LAG_BUCKETS)
+if TRACE_SIZE != plant_shm.TRACE_SIZE:   # plant.shm reserves the tracer's block by size
+    raise ImportError(f"LatencyTracer needs {TRACE_SIZE} bytes, plant_shm.TRACE_SIZE is {plant_shm.TRACE_SIZE}")
+
+
+class LatencyTracer:
+    """Correlates servo packets with the fdm_packet the FC acted on.
+
+    SITL answers in lockstep: updateState() releases one servo packet per
+    received fdm_packet, computed by the next PID loop from the newest state
+    the FC holds. Each servo packet is matched to the newest frame sent
+    before it arrived (known by the packet's timestamp field); frames
+    superseded without an answer count as dropped motor frames, a second
+    answer to the same frame as a duplicate. Beside the transport latency it
+    counts how many plant ticks pass between a frame going out and the tick
+    that first steps with its response: the harness's own loop delay, apart
+    from anything the controller does.
+
+    Counters and histograms live in `buf` at `offset` - a private bytearray,
+    or the plant.shm trace block with --plant-process, where the harness
+    reads what the plant child recorded. The feed threads call sent(),
+    received() and tick(); summary() can run anywhere."""
+
+    def __init__(self, buf=None, offset=0):
+        self.buf = bytearray(TRACE_SIZE) if buf is None else buf
+        self.offset = offset
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.buf[self.offset:self.offset + TRACE_SIZE] = bytes(TRACE_SIZE)
+            self.sent_seq = 0
+            self.sent_stamp = None   # timestamp field of the newest frame sent
+            self.sent_at = 0.0
+            self.answered = 0        # newest frame with a servo response
+            self.used = 0            # newest frame whose response the plant has stepped with
+
+    def _word(self, index):
+        return TRACE_WORD.unpack_from(self.buf, self.offset + 8 * index)[0]
+
+    def _add(self, index, n=1):
+        off = self.offset + 8 * index
+        TRACE_WORD.pack_into(self.buf, off, TRACE_WORD.unpack_from(self.buf, off)[0] + n)
+
+    def sent(self, stamp, now):
+        with self.lock:
+            self.sent_seq += 1
+            self.sent_stamp = stamp
+            self.sent_at = now
+            self._add(0)
+
+    def received(self, now):
+        with self.lock:
+            self._add(1)
+            if self.sent_seq == 0:
+                return   # answers to nothing we sent: SITL's start-up motor update
+            if self.answered == self.sent_seq:
+                self._add(3)
+                return
+            self._add(2, self.sent_seq - self.answered - 1)
+            self.answered = self.sent_seq
+            latency_us = (now - self.sent_at) * 1e6
+            bucket = int(8 * math.log2(max(latency_us, TRACE_BASE_US) / TRACE_BASE_US))
+            self._add(len(TRACE_COUNTERS) + min(bucket, TRACE_LAT_BUCKETS - 1))
+            if latency_us > self._word(4):
+                TRACE_WORD.pack_into(self.buf, self.offset + 32, int(latency_us))
+
+    def tick(self):
+        """Called by the plant before each step: counts the lag of a
+        response it is about to use for the first time."""
+        with self.lock:
+            if self.answered > self.used:
+                self.used = self.answered
+                lag = self.sent_seq + 1 - self.answered
+                self._add(len(TRACE_COUNTERS) + TRACE_LAT_BUCKETS + min(lag, TRACE_LAG_BUCKETS - 1))
+
+    @staticmethod
+    def _percentile(counts, q):
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return i
+        return len(counts) - 1
+
+    def summary(self):
+        """Leg metrics: latency percentiles (upper bucket edges, ms), drops,
+        duplicates and the loop delay in plant ticks."""
+        words = TRACE_WORD.size
+        values = struct.unpack_from(f"<{TRACE_SIZE // words}Q", self.buf, self.offset)
+        n = len(TRACE_COUNTERS)
+        lat = values[n:n + TRACE_LAT_BUCKETS]
+        lag = values[n + TRACE_LAT_BUCKETS:]
+        out = {"fdm_frames": values[0], "servo_frames": values[1],
+               "servo_dropped": values[2], "servo_duplicated": values[3]}
+        for q in (0.5, 0.9, 0.99):
+            i = self._percentile(lat, q)
+            if i is not None:
+                out[f"servo_latency_p{round(q * 100)}_ms"] = TRACE_BASE_US * 2.0 ** ((i + 1) / 8.0) / 1000.0
+        if values[4]:
+            out["servo_latency_max_ms"] = values[4] / 1000.0
+        if any(lag):
+            out["loop_ticks_p50"] = self._percentile(lag, 0.5)
+            out["loop_ticks_max"] = max(i for i, c in enumerate(lag) if c)
+        return out
+
+
+def report_latency(tracer):
+    summary = tracer.summary()
+    for name, value in summary.items():
+        metric(name, value)
+    if "servo_latency_p50_ms" in summary:
+        log(f"control loop: servo latency p50 {summary['servo_latency_p50_ms']:.2f} ms, "
+            f"p99 {summary['servo_latency_p99_ms']:.2f} ms, max {summary.get('servo_latency_max_ms', 0.0):.2f} ms; "
+            f"{summary['servo_dropped']} dropped, {summary['servo_duplicated']} duplicated of "
+            f"{summary['fdm_frames']} frames; plant uses a response {summary.get('loop_ticks_p50')} tick(s) on")
 
 
 class MotorFeed(threading.Thread):
-    """Listens for SITL's normalised motor outputs (servo_packet on UDP 9002)."""
+    """Listens for SITL's normalised motor outputs (servo_packet on UDP 9002).
 
-    def __init__(self):
+    Datagrams land in a fixed receive buffer and the motor block is copied
+    into `motors` in place; consumers hold the same array for the whole leg.
+    The copy is one memcpy under the GIL, so a reader never sees a frame
+    half-updated."""
+
+    def __init__(self, capture=None):
         super().__init__(daemon=True)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sock.bind(("127.0.0.1", PWM_PORT))
         self.sock.settimeout(0.2)
-        self.motors = [0.0, 0.0, 0.0, 0.0]
+        self.motors = array.array("f", [0.0, 0.0, 0.0, 0.0])
+        self.capture = capture
+        self.frames = 0
         self.running = True
+        self.shared = None   # PlantShm the out-of-process plant publishes frames into
+        self.tracer = None   # LatencyTracer of the running leg
+        self._buf = bytearray(64)
+        self._head = memoryview(self._buf)[:SERVO_PACKET.size]
+        self._motor_bytes = memoryview(self.motors).cast("B")
 
     def run(self):
+        place_feed_thread()
         while self.running:
             try:
-                data, _ = self.sock.recvfrom(64)
-                if len(data) >= 16:
-                    self.motors = list(struct.unpack("<4f", data[:16]))
+                n = self.sock.recv_into(self._buf)
+                if self.capture:
+                    self.capture.record(CAP_SERVO, self._buf[:n])
+                if n >= SERVO_PACKET.size:
+                    if self.tracer:
+                        self.tracer.received(time.monotonic())
+                    self.frames += 1
+                    self._motor_bytes[:] = self._head
+                    if self.shared:
+                        self.shared.publish_motors(self.frames, self.motors)
             except socket.timeout:
                 pass
             except OSError:
@@ -166,14 +574,17 @@ class MotionModel:
     def step(self, dt, m):
         thrust = sum(m) / 4.0
 
+        # State vectors are updated in place: the feed calls this every tick.
+        pos, vel, accel, rates = self.pos, self.vel, self.accel, self.rates
         if self.on_ground() and thrust < HOVER_THRUST * 0.8:
-            self.pos[2] = 0.0
-            self.vel = [0.0, 0.0, 0.0]
+            pos[2] = 0.0
+            vel[0] = vel[1] = vel[2] = 0.0
             # touchdown impact: a short accelerometer spike, as a real landing
             # produces, so the FC's jerk-based disarmOnImpact can trigger
-            self.accel = [0.0, 0.0, 60.0] if self.impact_ticks > 0 else [0.0, 0.0, 0.0]
+            accel[0] = accel[1] = 0.0
+            accel[2] = 60.0 if self.impact_ticks > 0 else 0.0
             self.impact_ticks = max(0, self.impact_ticks - 1)
-            self.rates = [0.0, 0.0, 0.0]
+            rates[0] = rates[1] = rates[2] = 0.0
             return
 
         right = m[0] + m[1]   # M1 RR + M2 FR
@@ -185,16 +596,13 @@ class MotionModel:
         ccw = m[1] + m[2]
         cw = m[0] + m[3]
 
-        target = [
-            RATE_GAIN * (left - right) / 2.0,   # roll right
-            RATE_GAIN * (rear - front) / 2.0,   # nose down (BF mixer: +pitch = rear up)
-            RATE_GAIN * (ccw - cw) / 2.0,       # yaw CW (compass positive)
-        ]
-        for i in range(3):
-            self.rates[i] += (target[i] - self.rates[i]) * min(1.0, dt / RATE_TAU)
-        self.roll += self.rates[0] * dt
-        self.pitch += self.rates[1] * dt
-        self.yaw += self.rates[2] * dt
+        alpha = min(1.0, dt / RATE_TAU)
+        rates[0] += (RATE_GAIN * (left - right) / 2.0 - rates[0]) * alpha   # roll right
+        rates[1] += (RATE_GAIN * (rear - front) / 2.0 - rates[1]) * alpha   # nose down (BF mixer: +pitch = rear up)
+        rates[2] += (RATE_GAIN * (ccw - cw) / 2.0 - rates[2]) * alpha       # yaw CW (compass positive)
+        self.roll += rates[0] * dt
+        self.pitch += rates[1] * dt
+        self.yaw += rates[2] * dt
         self.roll = max(-1.2, min(1.2, self.roll))
         self.pitch = max(-1.2, min(1.2, self.pitch))
 
@@ -207,73 +615,140 @@ class MotionModel:
         a_fwd = GRAVITY * math.tan(self.pitch)
         a_right = GRAVITY * math.tan(self.roll)
         sin_y, cos_y = math.sin(self.yaw), math.cos(self.yaw)
-        acc_h = [
-            a_fwd * sin_y + a_right * cos_y - K_DRAG * self.vel[0],  # east
-            a_fwd * cos_y - a_right * sin_y - K_DRAG * self.vel[1],  # north
-        ]
+        accel[0] = a_fwd * sin_y + a_right * cos_y - K_DRAG * vel[0]  # east
+        accel[1] = a_fwd * cos_y - a_right * sin_y - K_DRAG * vel[1]  # north
         for i in range(2):
-            self.accel[i] = acc_h[i]
-            self.vel[i] += acc_h[i] * dt
-            self.pos[i] += self.vel[i] * dt
+            vel[i] += accel[i] * dt
+            pos[i] += vel[i] * dt
 
         vt_z = VERT_V_GAIN * (thrust * math.cos(self.pitch) * math.cos(self.roll) - HOVER_THRUST)
-        new_vz = self.vel[2] + (vt_z - self.vel[2]) * min(1.0, dt / VEL_TAU_V)
-        self.accel[2] = (new_vz - self.vel[2]) / dt if dt > 0 else 0.0
-        self.vel[2] = new_vz
-        self.pos[2] += self.vel[2] * dt
-
-        if self.pos[2] < 0.0:
-            self.pos[2] = 0.0
-            self.vel = [0.0, 0.0, 0.0]
-            self.accel = [0.0, 0.0, 0.0]
-            self.rates = [0.0, 0.0, 0.0]
+        new_vz = vel[2] + (vt_z - vel[2]) * min(1.0, dt / VEL_TAU_V)
+        accel[2] = (new_vz - vel[2]) / dt if dt > 0 else 0.0
+        vel[2] = new_vz
+        pos[2] += vel[2] * dt
+
+        if pos[2] < 0.0:
+            pos[2] = 0.0
+            vel[0] = vel[1] = vel[2] = 0.0
+            accel[0] = accel[1] = accel[2] = 0.0
+            rates[0] = rates[1] = rates[2] = 0.0
             self.roll = self.pitch = 0.0
             self.impact_ticks = 4
 
 
-def quat_from_euler_bf(roll, pitch, yaw):
-    """Body->world quaternion in Betaflight's internal NWU frames from the
-    model conventions (roll right+, pitch nose-down+, yaw compass CW+):
-    NWU yaw is CCW-positive, pitch and roll map directly."""
-    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
-    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
-    cy, sy = math.cos(-yaw / 2), math.sin(-yaw / 2)
-    return (
-        cy * cp * cr + sy * sp * sr,
-        cy * cp * sr - sy * sp * cr,
-        cy * sp * cr + sy * cp * sr,
-        sy * cp * cr - cy * sp * sr,
+SQRT_HALF = math.sqrt(0.5)
+NO_MOTORS = (0.0, 0.0, 0.0, 0.0)
+
+
+def pack_fdm_packet(buf, t, model, lon_pkt, lat_pkt):
+    """Fill a preallocated fdm_packet buffer from the model state, in place.
+
+    The attitude and specific-force rotations are expanded into scalars so a
+    tick builds no intermediate quaternion tuples:
+      - q_nwu is the body->world quaternion in Betaflight's internal NWU
+        frames from the model conventions (roll right+, pitch nose-down+,
+        yaw compass CW+): NWU yaw is CCW-positive, pitch and roll map directly.
+      - The FC's bridge computes q = Rz(+90) * Rx(180) * q_packet * Rx(180),
+        so the packet carries q_nwu pre-rotated by Rz(-90) and pre-conjugated
+        by Rx(180) (the gazebo plugin's similarity transform): the FC
+        recovers exactly q_nwu.
+      - Specific force in the FC's earth frame (NWU) is rotated into the body
+        with R(q_nwu)^T, the same attitude the FC reconstructs, so the
+        estimator's tilt-compensation inverts this rotation exactly at any
+        heading. The packet carries the negated body vector - the SITL acc
+        driver negates all three axes on read.
+    """
+    cr, sr = math.cos(model.roll / 2), math.sin(model.roll / 2)
+    cp, sp = math.cos(model.pitch / 2), math.sin(model.pitch / 2)
+    cy, sy = math.cos(-model.yaw / 2), math.sin(-model.yaw / 2)
+    qw = cy * cp * cr + sy * sp * sr
+    qx = cy * cp * sr - sy * sp * cr
+    qy = cy * sp * cr + sy * cp * sr
+    qz = sy * cp * cr - cy * sp * sr
+
+    fn = model.accel[1]              # north
+    fw = -model.accel[0]             # west
+    fu = model.accel[2] + GRAVITY    # up
+    bx = ((1.0 - 2.0 * (qy * qy + qz * qz)) * fn + 2.0 * (qx * qy + qw * qz) * fw
+          + 2.0 * (qx * qz - qw * qy) * fu)
+    by = (2.0 * (qx * qy - qw * qz) * fn + (1.0 - 2.0 * (qx * qx + qz * qz)) * fw
+          + 2.0 * (qy * qz + qw * qx) * fu)
+    bz = (2.0 * (qx * qz + qw * qy) * fn + 2.0 * (qy * qz - qw * qx) * fw
+          + (1.0 - 2.0 * (qx * qx + qy * qy)) * fu)
+
+    rates, vel = model.rates, model.vel
+    FDM_PACKET.pack_into(
+        buf, 0,
+        t,
+        # Gazebo-plugin gyro frame: roll right +, pitch nose-up +,
+        # yaw CCW +. The model keeps nose-down/CW positive (compass
+        # conventions), so pitch and yaw are negated on emit.
+        rates[0], -rates[1], -rates[2],
+        -bx, -by, -bz,                                       # negated NWU-body specific force
+        SQRT_HALF * (qw + qz), SQRT_HALF * (qx + qy),        # Rx(180) * Rz(-90) * q_nwu * Rx(180)
+        SQRT_HALF * (qx - qy), SQRT_HALF * (qw - qz),
+        vel[0], vel[1], vel[2],                              # ENU m/s
+        lon_pkt,                                             # mirrored for the bridge
+        lat_pkt,
+        HOME_ALT_M + model.pos[2],
+        101325.0,
     )
 
 
-def quat_conj_x180(q):
-    """Similarity transform by 180 deg about x: what the gazebo plugin applies
-    to its quaternion, and what the FC's bridge undoes on receive."""
-    return (q[0], q[1], -q[2], -q[3])
+class PlantQueries:
+    """Recorder and model queries shared by FdmFeed and its --plant-process
+    stand-in: both hold `model`, `history` (under `_hist_lock`), `monitors`
+    and `t0`."""
 
+    def distance_from_home(self):
+        return math.hypot(self.model.pos[0], self.model.pos[1])
 
-def quat_mul(a, b):
-    aw, ax, ay, az = a
-    bw, bx, by, bz = b
-    return (
-        aw * bw - ax * bx - ay * by - az * bz,
-        aw * bx + ax * bw + ay * bz - az * by,
-        aw * by - ax * bz + ay * bw + az * bx,
-        aw * bz + ax * by - ay * bx + az * bw,
-    )
+    def distance_to_wp(self, east_m, north_m):
+        return math.hypot(self.model.pos[0] - east_m, self.model.pos[1] - north_m)
+
+    def heading_deg(self):
+        return math.degrees(self.model.yaw) % 360.0
+
+    def monitor(self, mon):
+        """Register a streaming check; it sees every sample recorded from now on."""
+        with self._hist_lock:
+            self.monitors.append(mon)
+        return mon
+
+    def check_monitors(self):
+        """Raise the first error a registered monitor stopped on."""
+        with self._hist_lock:
+            monitors = list(self.monitors)
+        for mon in monitors:
+            mon.check()
+
+    def snapshot_history(self):
+        with self._hist_lock:
+            return list(self.history)
 
+    def trajectory(self, t0=None, t1=None):
+        """Columnar copy of the recorder, optionally windowed to [t0, t1]."""
+        return analytics.Trajectory(self.snapshot_history()).window(t0, t1)
 
-def quat_rotate_inv(q, v):
-    """Rotate world vector v into the body frame (q is body->world)."""
-    qc = (q[0], -q[1], -q[2], -q[3])
-    p = quat_mul(quat_mul(qc, (0.0, *v)), q)
-    return (p[1], p[2], p[3])
+    def max_altitude(self):
+        return analytics.peak(self.trajectory().up)
 
+    def time_to_home(self, radius_m=10.0, after_t=0.0):
+        """First recorded time the craft is within radius_m of home, after after_t."""
+        return analytics.first_time_within(self.trajectory(t0=after_t), radius_m)
 
-K_RZ_NEG90 = (math.sqrt(0.5), 0.0, 0.0, -math.sqrt(0.5))
+    def touchdown(self, after_t=0.0):
+        """(t, east, north) of the first on-ground sample following airborne flight."""
+        return analytics.touchdown(self.trajectory(t0=after_t))
 
+    def max_distance_from_home(self, after_t=0.0):
+        return analytics.peak(analytics.distance_from(self.trajectory(t0=after_t)))
 
-class FdmFeed(threading.Thread):
+    def now_t(self):
+        return time.monotonic() - self.t0
+
+
+class FdmFeed(PlantQueries, threading.Thread):
     """50 Hz fdm_packet stream driven by the motion model.
 
     Emits in the Gazebo-bridge conventions the default SITL build expects:
@@ -283,82 +758,87 @@ class FdmFeed(threading.Thread):
     first packet's origin (the FC un-mirrors).
     """
 
-    def __init__(self, motors=None, initial_yaw_deg=0.0, status=None):
+    def __init__(self, motors=None, initial_yaw_deg=0.0, status=None, capture=None, ring_path=None):
         super().__init__(daemon=True)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # fdm_packets only: the telemetry fan-out stays on the bare socket
+        self.link = ImpairedLink(self.sock, IMPAIR_FDM) if IMPAIR_FDM else self.sock
+        self.capture = capture
+        self.pkt = bytearray(FDM_PACKET.size)
         self.model = MotionModel()
         self.model.yaw = math.radians(initial_yaw_deg)
         self.motors = motors
         self.status = status
         self.sid = uuid.uuid4().hex[:8]  # telemetry session id: lets visualisers detect restarts
+        self.ring = TelemetryRing(ring_path, self.sid) if ring_path else None
         self.running = True
         self.gps_valid = True     # False emits out-of-range lat/lon: the FC's GPS goes dark
         self.history = []         # (t, east, north, up, ve, vn, vu, heading_deg) at ~10 Hz
+        self.monitors = []        # streaming checks fed each recorded sample (Monitor)
         self._hist_lock = threading.Lock()
         self._hist_decim = 0
         self.t0 = time.monotonic()
+        self.shared = None        # PlantShm when this feed runs in a --plant child
+        self.gen = 0              # reset generation the shared history is tagged with
+        self.tracer = None        # LatencyTracer of the running leg
 
-    def move_east(self, metres):
-        self.model.pos[0] += metres
-
-    def distance_from_home(self):
-        return math.hypot(self.model.pos[0], self.model.pos[1])
-
-    def distance_to_wp(self, east_m, north_m):
-        return math.hypot(self.model.pos[0] - east_m, self.model.pos[1] - north_m)
-
-    def heading_deg(self):
-        return math.degrees(self.model.yaw) % 360.0
-
-    def snapshot_history(self):
+    def start(self):
+        if not self.is_alive():   # a chained leg's feed is already running
+            super().start()
+
+    def reset(self, initial_yaw_deg=0.0, t0=None):
+        """Fresh plant, recorder, clock and session id for a chained leg;
+        the feed itself keeps running."""
+        model = MotionModel()
+        model.yaw = math.radians(initial_yaw_deg)
         with self._hist_lock:
-            return list(self.history)
-
-    def max_altitude(self):
-        return max((s[3] for s in self.snapshot_history()), default=0.0)
-
-    def time_to_home(self, radius_m=10.0, after_t=0.0):
-        """First recorded time the craft is within radius_m of home, after after_t."""
-        for s in self.snapshot_history():
-            if s[0] > after_t and math.hypot(s[1], s[2]) < radius_m:
-                return s[0]
-        return None
-
-    def touchdown(self, after_t=0.0):
-        """(t, east, north) of the first on-ground sample following airborne flight."""
-        airborne = False
-        for s in self.snapshot_history():
-            if s[0] < after_t:
-                continue
-            if s[3] > 1.0:
-                airborne = True
-            elif airborne and s[3] <= 0.01:
-                return (s[0], s[1], s[2])
-        return None
+            self.model = model
+            self.history.clear()   # in place: a --soak SpillHistory stays bounded
+            self.monitors = []
+            self._hist_decim = 0
+            self.gps_valid = True
+            self.sid = uuid.uuid4().hex[:8]
+            self.t0 = time.monotonic() if t0 is None else t0
 
-    def max_distance_from_home(self, after_t=0.0):
-        return max((math.hypot(s[1], s[2]) for s in self.snapshot_history() if s[0] >= after_t), default=0.0)
-
-    def now_t(self):
-        return time.monotonic() - self.t0
+    def move_east(self, metres):
+        self.model.pos[0] += metres
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            if self.ring:
+                self.ring.close()   # here rather than in shutdown(): only the loop knows it is done writing
+
+    def _run(self):
+        place_feed_thread()
+        addr = ("127.0.0.1", FDM_PORT)
+        pkt = self.pkt
         last = time.monotonic()
         while self.running:
             now = time.monotonic()
             dt = min(0.1, now - last)
             last = now
-            m = self.motors.motors if self.motors else [0.0] * 4
+            if self.tracer:
+                self.tracer.tick()
+            m = self.motors.motors if self.motors else NO_MOTORS
             self.model.step(dt, m)
+            if self.shared:
+                self.shared.publish_model(now - self.t0, self.model)
 
             self._hist_decim += 1
             if self._hist_decim >= 5:  # ~10 Hz of the 50 Hz loop
                 self._hist_decim = 0
+                sample = (now - self.t0,
+                          self.model.pos[0], self.model.pos[1], self.model.pos[2],
+                          self.model.vel[0], self.model.vel[1], self.model.vel[2],
+                          self.heading_deg())
                 with self._hist_lock:
-                    self.history.append((now - self.t0,
-                                         self.model.pos[0], self.model.pos[1], self.model.pos[2],
-                                         self.model.vel[0], self.model.vel[1], self.model.vel[2],
-                                         self.heading_deg()))
+                    self.history.append(sample)
+                    for mon in self.monitors:
+                        mon.feed(sample)
+                if self.shared:
+                    self.shared.append_history(sample, self.gen)
 
             lat_true = HOME_LAT + self.model.pos[1] / M_PER_DEG
             lon_true = HOME_LON + self.model.pos[0] / (M_PER_DEG * math.cos(math.radians(HOME_LAT)))
@@ -391,117 +871,654 @@ class FdmFeed(threading.Thread):
                 except OSError:
                     pass  # fire-and-forget; a visualiser must never affect a scenario
 
-            # The FC's bridge computes q = Rz(+90) * Rx(180) * q_packet * Rx(180),
-            # so emit the true NWU attitude pre-rotated by Rz(-90) and
-            # pre-conjugated: the FC recovers exactly q_nwu.
-            q_nwu = quat_from_euler_bf(self.model.roll, self.model.pitch, self.model.yaw)
-            q = quat_conj_x180(quat_mul(K_RZ_NEG90, q_nwu))
-
-            # Specific force in the FC's earth frame (NWU), rotated into the
-            # body with the same attitude the FC reconstructs, so the
-            # estimator's tilt-compensation inverts this rotation exactly at
-            # any heading. The packet carries the negated body vector - the
-            # SITL acc driver negates all three axes on read.
-            f_world_nwu = (
-                self.model.accel[1],                     # north
-                -self.model.accel[0],                    # west
-                self.model.accel[2] + GRAVITY,           # up
-            )
-            f_body = quat_rotate_inv(q_nwu, f_world_nwu)
+            if self.ring:
+                self.ring.write(now - self.t0, self.model, m, lat_true, lon_true,
+                                HOME_ALT_M + self.model.pos[2], self.gps_valid,
+                                self.status.armed if self.status else None,
+                                self.status.mode_mask if self.status else 0)
 
             # Out-of-range lat/lon = GPS-loss sentinel; the FC skips the
             # virtual GPS update and its receive timeout trips, while IMU
             # feeds stay live. (NaN would be folded away by -ffast-math.)
             lon_pkt = 2.0 * HOME_LON - lon_true if self.gps_valid else 999.0
             lat_pkt = 2.0 * HOME_LAT - lat_true if self.gps_valid else 999.0
-            pkt = struct.pack(
-                "<18d",
-                now - self.t0,
-                # Gazebo-plugin gyro frame: roll right +, pitch nose-up +,
-                # yaw CCW +. The model keeps nose-down/CW positive (compass
-                # conventions), so pitch and yaw are negated on emit.
-                self.model.rates[0], -self.model.rates[1], -self.model.rates[2],
-                -f_body[0], -f_body[1], -f_body[2],                              # negated NWU-body specific force
-                q[0], q[1], q[2], q[3],
-                self.model.vel[0], self.model.vel[1], self.model.vel[2],         # ENU m/s
-                lon_pkt,                                                         # mirrored for the bridge
-                lat_pkt,
-                HOME_ALT_M + self.model.pos[2],
-                101325.0,
-            )
-            self.sock.sendto(pkt, ("127.0.0.1", FDM_PORT))
+            pack_fdm_packet(pkt, now - self.t0, self.model, lon_pkt, lat_pkt)
+            if self.tracer:
+                # before the send: sendto releases the GIL, and MotorFeed may
+                # take the FC's answer before this thread runs again
+                self.tracer.sent(now - self.t0, time.monotonic())
+            self.link.sendto(pkt, addr)
+            if self.capture:
+                self.capture.record(CAP_FDM, pkt)
             time.sleep(0.02)
 
     def shutdown(self):
         self.running = False
+        if self.link is not self.sock:
+            self.link.close()
+        if self.ring:
+            if self.ident is None:
+                self.ring.close()   # never started
+            else:
+                self.join(timeout=1.0)
 
 
-class Msp:
-    """Minimal MSP v1 client over the SITL TCP port."""
+class SharedModel:
+    """Read-only MotionModel view over the plant's published state, for
+    scenario predicates and the watchdog in the harness process."""
+
+    def __init__(self, shm):
+        self.shm = shm
+
+    @property
+    def pos(self):
+        return list(self.shm.read_model()[1:4])
+
+    @property
+    def vel(self):
+        return list(self.shm.read_model()[4:7])
+
+    @property
+    def roll(self):
+        return self.shm.read_model()[7]
+
+    @property
+    def pitch(self):
+        return self.shm.read_model()[8]
+
+    @property
+    def yaw(self):
+        return self.shm.read_model()[9]
+
+    @property
+    def rates(self):
+        return list(self.shm.read_model()[10:13])
+
+    def on_ground(self):
+        return self.pos[2] <= 0.001
+
+
+class SharedStatus:
+    """The FC status as the plant child sees it: what the harness's
+    StatusPoller last copied into the control block."""
+
+    def __init__(self, shm):
+        self.shm = shm
+
+    @property
+    def armed(self):
+        armed = self.shm.get(plant_shm.ARMED_OFFSET, plant_shm.I64)
+        return None if armed < 0 else bool(armed)
+
+    @property
+    def mode_mask(self):
+        return self.shm.get(plant_shm.MODE_MASK_OFFSET)
+
+    @property
+    def modes(self):
+        mask = self.mode_mask
+        return [b for b in range(64) if mask >> b & 1]
+
+
+class PlantProcess:
+    """--plant-process: MotorFeed stand-in that owns the plant child.
+
+    The child (this script with --plant) runs an ordinary MotorFeed and
+    FdmFeed against <leg>/plant.shm and publishes motor frames, model state
+    and recorder samples into it; see plant_shm.py. Launched on
+    construction, like MotorFeed's port bind, so a plant that cannot start
+    fails the scenario before SITL is launched."""
+
+    def __init__(self, leg_dir, initial_yaw_deg=0.0):
+        path = os.path.join(leg_dir, "plant.shm")
+        self.shm = plant_shm.PlantShm(path, create=True)
+        self.shm.set(plant_shm.RESET_YAW_OFFSET, initial_yaw_deg, plant_shm.F64)
+        self.shm.set(plant_shm.T0_OFFSET, time.monotonic(), plant_shm.F64)
+        cmd = [sys.executable, os.path.abspath(__file__), "--plant", path,
+               "--telemetry-port", str(TELEMETRY_PORT), "--priority", PRIORITY]
+        if PLACEMENT is not None:
+            cmd += ["--cpus", format_cpus(PLACEMENT[1])]
+        if TELEMETRY_RING:
+            cmd.append("--telemetry-ring")
+        if IMPAIR_FDM:
+            cmd += ["--impair-fdm", IMPAIR_FDM]
+        if PROFILE:
+            cmd.append("--profile")
+        if VERBOSE:
+            cmd.append("-v")
+        self.tracer = LatencyTracer(self.shm.mm, plant_shm.TRACE_OFFSET)   # filled in by the child
+        self.logf = open(os.path.join(leg_dir, "plant.log"), "w")
+        self.proc = subprocess.Popen(cmd, stdout=self.logf, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + 10.0
+        while not self.shm.get(plant_shm.READY_OFFSET, plant_shm.U32):
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                self.shutdown()
+                raise RuntimeError(f"plant process did not start (see {leg_dir}/plant.log)")
+            time.sleep(0.05)
+
+    @property
+    def frames(self):
+        return self.shm.read_motors()[0]
+
+    @property
+    def motors(self):
+        return self.shm.read_motors()[1]
+
+    def start(self):
+        pass   # running since construction
+
+    def shutdown(self):
+        if self.proc.poll() is None:
+            self.shm.set(plant_shm.STOP_OFFSET, 1)
+            try:
+                self.proc.wait(timeout=3.0)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.logf.close()
+        self.shm.close()
+
+
+class RemoteFdmFeed(PlantQueries, threading.Thread):
+    """--plant-process: FdmFeed stand-in in the harness process.
+
+    Starting it starts the child's FDM stream. The thread itself only drains
+    the child's recorder samples into `history` and the registered monitors
+    at 20 Hz, and copies the StatusPoller's arm/mode state into the control
+    block for the child's telemetry. No model integration or packet I/O
+    happens here, so scenario-side work cannot stall the plant."""
+
+    def __init__(self, plant, status=None):
+        super().__init__(daemon=True)
+        self.plant = plant
+        self.shm = plant.shm
+        self.model = SharedModel(self.shm)
+        self.status = status
+        self.running = True
+        self.history = []
+        self.monitors = []
+        self.lost = 0
+        self._hist_lock = threading.Lock()
+        self._next_seq = 1
+        self.gen = 0
+        self.t0 = self.shm.get(plant_shm.T0_OFFSET, plant_shm.F64)
+
+    @property
+    def gps_valid(self):
+        return bool(self.shm.get(plant_shm.GPS_VALID_OFFSET))
+
+    @gps_valid.setter
+    def gps_valid(self, valid):
+        self.shm.set(plant_shm.GPS_VALID_OFFSET, int(bool(valid)))
+
+    def start(self):
+        self.shm.set(plant_shm.FDM_RUN_OFFSET, 1)
+        if not self.is_alive():
+            super().start()
+
+    def reset(self, initial_yaw_deg=0.0):
+        with self._hist_lock:
+            self.history.clear()
+            self.monitors = []
+            self.t0 = time.monotonic()
+            # samples tagged with an older generation are dropped on arrival
+            self.gen = self.shm.reset(initial_yaw_deg, self.t0)
+
+    def move_east(self, metres):
+        self.shm.nudge_east(metres)
+
+    def run(self):
+        while self.running:
+            if self.status is not None:
+                armed = self.status.armed
+                self.shm.set(plant_shm.ARMED_OFFSET, -1 if armed is None else int(armed), plant_shm.I64)
+                self.shm.set(plant_shm.MODE_MASK_OFFSET, self.status.mode_mask)
+            samples, self._next_seq, lost = self.shm.read_history(self._next_seq)
+            self.lost += lost
+            with self._hist_lock:
+                for gen, sample in samples:
+                    if gen == self.gen:
+                        self.history.append(sample)
+                        for mon in self.monitors:
+                            mon.feed(sample)
+            time.sleep(0.05)
+
+    def shutdown(self):
+        self.running = False
+        if self.shm.mm is not None:
+            self.shm.set(plant_shm.FDM_RUN_OFFSET, 0)
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+
+def run_plant(path):
+    """--plant: the child side of PlantProcess. Runs until the harness sets
+    the stop flag or exits."""
+    shm = plant_shm.PlantShm(path)
+    parent = os.getppid()
+    ring_path = os.path.join(os.path.dirname(path), "telemetry.ring") if TELEMETRY_RING else None
+    motors = MotorFeed()
+    motors.shared = shm
+    fdm = FdmFeed(motors, initial_yaw_deg=shm.get(plant_shm.RESET_YAW_OFFSET, plant_shm.F64),
+                  status=SharedStatus(shm), ring_path=ring_path)
+    fdm.shared = shm
+    fdm.t0 = shm.get(plant_shm.T0_OFFSET, plant_shm.F64)
+    fdm.gen = shm.get(plant_shm.RESET_GEN_OFFSET)
+    fdm.tracer = motors.tracer = LatencyTracer(shm.mm, plant_shm.TRACE_OFFSET)
+    # the harness keeps the record from the shared ring; the child's own copy
+    # only has to outlast one drain
+    fdm.history = collections.deque(maxlen=shm.capacity)
+    nudges = shm.get(plant_shm.NUDGE_SEQ_OFFSET)
+    profiler = stack_sampler.StackSampler() if PROFILE else None
+    if profiler is not None:
+        profiler.start()
+    motors.start()
+    shm.set(plant_shm.READY_OFFSET, 1, plant_shm.U32)
+    try:
+        while not shm.get(plant_shm.STOP_OFFSET) and os.getppid() == parent:
+            if shm.get(plant_shm.FDM_RUN_OFFSET) and not fdm.is_alive():
+                fdm.start()
+            fdm.gps_valid = bool(shm.get(plant_shm.GPS_VALID_OFFSET))
+            gen = shm.get(plant_shm.RESET_GEN_OFFSET)
+            if gen != fdm.gen:
+                fdm.reset(shm.get(plant_shm.RESET_YAW_OFFSET, plant_shm.F64),
+                          shm.get(plant_shm.T0_OFFSET, plant_shm.F64))
+                fdm.gen = gen
+                fdm.tracer.reset()
+            if shm.get(plant_shm.NUDGE_SEQ_OFFSET) != nudges:
+                nudges = shm.get(plant_shm.NUDGE_SEQ_OFFSET)
+                fdm.move_east(shm.get(plant_shm.NUDGE_EAST_OFFSET, plant_shm.F64))
+            time.sleep(0.01)
+    finally:
+        fdm.shutdown()
+        if fdm.is_alive():
+            fdm.join(timeout=1.0)
+        if fdm.link is not fdm.sock:
+            stats = fdm.link.stats()
+            log(f"fdm link: {stats['lost']}/{stats['sent']} lost, {stats['reordered']} reordered")
+        motors.shutdown()
+        if profiler is not None:
+            # over the child's lifetime: every leg of a chain, into the first one's directory
+            write_profile(profiler, os.path.dirname(path), "plant_")
+        shm.close()
+
+
+MSP_REPLY_GRACE_S = 1.0   # how long a timed-out MSP request still claims a late reply
+
 
-    def __init__(self, sock):
+def crc8_dvb_s2(data, crc=0):
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0xD5) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+class Msp:
+    """Pipelined MSP v1/v2 client over the SITL TCP port.
+
+    Requests go on the wire as soon as they are made and hand back a
+    Future; one reader thread parses replies and resolves the future
+    waiting on that command. Replies carry no sequence number, so each
+    command has at most one request on the wire: a second one waits for
+    the first's reply. No caller holds the connection across a round
+    trip, so the status poller and a scenario body interleave rather than
+    queue behind each other, and batch() sends requests for several
+    commands before waiting on any.
+
+    A request that times out is cancelled but keeps its command's slot for
+    MSP_REPLY_GRACE_S, so a late reply is consumed by it instead of being
+    taken as the answer to the next request; after that the slot is freed,
+    so a reply that never comes (a corrupt frame, an overrun of SITL's
+    receive buffer) costs that one request, not every later one. Frames
+    failing their checksum (v1) or CRC (v2) are discarded.
+
+    The FC keeps a single CLI paging session, so CLI commands hold
+    cli_lock from the command to its last page."""
+
+    def __init__(self, sock, capture=None):
         self.sock = sock
+        self.capture = capture
         self.buf = b""
-        # serialises request/reply pairs: the status poller thread shares this
-        # connection with scenario bodies
+        # serialises writes, so frames never interleave
         self.lock = threading.Lock()
+        # guards pending and buf
+        self.cond = threading.Condition()
+        self.cli_lock = threading.RLock()
+        self.pending = {}    # (version, cmd) -> the future of its request on the wire
+        self.error = None    # set once the connection is gone
+        self.reader = None
+        self.bad_frames = 0  # replies dropped for a checksum/CRC mismatch
 
-    def request(self, cmd, payload=b"", timeout=2.0):
+    @staticmethod
+    def frame(cmd, payload=b""):
+        """Request frame: v2 for the 16-bit MSP2_* command space, else v1."""
+        if cmd > 0xFF:
+            head = struct.pack("<BHH", 0, cmd, len(payload))
+            return b"$X<" + head + payload + bytes([crc8_dvb_s2(head + payload)])
+        frame = struct.pack("<BB", len(payload), cmd) + payload
+        checksum = 0
+        for b in frame:
+            checksum ^= b
+        return b"$M<" + frame + bytes([checksum])
+
+    def send(self, requests, timeout=2.0):
+        """Put (cmd, payload) requests for distinct commands on the wire in
+        one write, once none of those commands has a request outstanding;
+        a Future per request, resolved with the reply payload."""
+        keys = [(2 if cmd > 0xFF else 1, cmd) for cmd, _payload in requests]
+        if len(set(keys)) != len(keys):
+            raise ValueError("one request per command in a batch")
+        futures = [concurrent.futures.Future() for _ in requests]
+        out = b"".join(self.frame(cmd, payload) for cmd, payload in requests)
         with self.lock:
-            frame = struct.pack("<BB", len(payload), cmd) + payload
-            checksum = 0
-            for b in frame:
-                checksum ^= b
-            self.sock.sendall(b"$M<" + frame + bytes([checksum]))
-            deadline = time.monotonic() + timeout
-            while time.monotonic() < deadline:
-                reply = self._read_frame(cmd, deadline)
-                if reply is not None:
-                    return reply
-            raise TimeoutError(f"no MSP reply for cmd {cmd}")
-
-    def _read_frame(self, want_cmd, deadline):
-        while time.monotonic() < deadline:
-            start = self.buf.find(b"$M>")
-            if start < 0:
-                # also tolerate error frames
-                if self.buf.find(b"$M!") >= 0:
-                    raise RuntimeError(f"MSP error frame for cmd {want_cmd}")
-                self._fill(deadline)
+            if self.reader is None:
+                self.reader = threading.Thread(target=self._read_replies, daemon=True, name="MspReader")
+                self.reader.start()
+        with self.cond:
+            self._claim(keys, time.monotonic() + timeout)
+            self.pending.update(zip(keys, futures))
+        with self.lock:
+            self.sock.sendall(out)
+        if self.capture:
+            self.capture.record(CAP_MSP_TX, out)
+        return futures
+
+    def write(self, out):
+        """Put prebuilt request frames on the wire with no futures behind
+        them: their replies are dropped as unsolicited (capture replay)."""
+        with self.lock:
+            self.sock.sendall(out)
+        if self.capture:
+            self.capture.record(CAP_MSP_TX, out)
+
+    def _claim(self, keys, deadline):
+        """Wait until no request for any of `keys` is outstanding (under
+        cond): answered, or timed out and past its grace period."""
+        while True:
+            if self.error is not None:
+                raise self.error
+            now = time.monotonic()
+            waits = []
+            for key in keys:
+                fut = self.pending.get(key)
+                if fut is None:
+                    continue
+                if not fut.cancelled():
+                    waits.append(deadline - now)   # its reply notifies
+                elif now - fut.abandoned >= MSP_REPLY_GRACE_S:
+                    del self.pending[key]
+                else:
+                    waits.append(fut.abandoned + MSP_REPLY_GRACE_S - now)
+            if not waits:
+                return
+            if now >= deadline:
+                raise TimeoutError(f"MSP cmd {keys[0][1]:#x}: an earlier request is still unanswered")
+            self.cond.wait(min(min(waits), deadline - now))
+
+    def _result(self, fut, cmd, deadline):
+        try:
+            return fut.result(max(0.0, deadline - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            with self.cond:
+                fut.abandoned = time.monotonic()
+                if not fut.cancel():
+                    return fut.result()   # answered just now
+                self.cond.notify_all()    # a waiting request now only waits out the grace period
+            raise TimeoutError(f"no MSP reply for cmd {cmd:#x}") from None
+
+    def batch(self, requests, timeout=2.0):
+        """Several requests, one round trip: reply payloads in request
+        order. `requests` holds (cmd, payload) pairs or bare commands."""
+        requests = [(r, b"") if isinstance(r, int) else r for r in requests]
+        deadline = time.monotonic() + timeout
+        futures = self.send(requests, timeout)
+        return [self._result(fut, cmd, deadline) for (cmd, _payload), fut in zip(requests, futures)]
+
+    def request(self, cmd, payload=b"", timeout=2.0):
+        return self.batch([(cmd, payload)], timeout)[0]
+
+    def request_v2(self, cmd, payload=b"", timeout=2.0):
+        """MSP v2 request/reply (the 16-bit command space: MSP2_*)."""
+        return self.request(cmd, payload, timeout)
+
+    def _read_replies(self):
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
                 continue
-            if len(self.buf) < start + 5:
-                self._fill(deadline)
+            except OSError as e:
+                self._fail(ConnectionError(f"MSP connection lost: {e}"))
+                return
+            if not data:
+                self._fail(ConnectionError("MSP connection closed"))
+                return
+            with self.cond:
+                self.buf += data
+                self._parse_replies()
+
+    def _parse_replies(self):
+        """Resolve futures from every complete frame in buf (under cond)."""
+        buf = self.buf
+        while True:
+            start = buf.find(b"$")
+            if start < 0:
+                buf = b""
+                break
+            buf = buf[start:]
+            if buf.startswith(b"$M") and len(buf) >= 5:
+                version, cmd, size, head = 1, buf[4], buf[3], 5
+            elif buf.startswith(b"$X") and len(buf) >= 8:
+                (cmd, size), version, head = struct.unpack_from("<HH", buf, 4), 2, 8
+            elif len(buf) < 8 and (buf.startswith(b"$M") or buf.startswith(b"$X") or len(buf) < 2):
+                break   # header still arriving
+            else:
+                buf = buf[1:]
                 continue
-            size = self.buf[start + 3]
-            cmd = self.buf[start + 4]
-            end = start + 5 + size + 1
-            if len(self.buf) < end:
-                self._fill(deadline)
+            end = head + size + 1
+            if len(buf) < end:
+                break
+            frame = buf[:end]
+            if version == 1:
+                check = 0
+                for b in frame[3:end - 1]:
+                    check ^= b
+            else:
+                check = crc8_dvb_s2(frame[3:end - 1])
+            if check != frame[end - 1]:
+                # corrupt: its length may be too, so resync on the next '$'
+                self.bad_frames += 1
+                debug(f"MSP reply failed its {'checksum' if version == 1 else 'CRC'} (cmd {cmd:#x}); dropped")
+                buf = buf[1:]
                 continue
-            payload = self.buf[start + 5 : start + 5 + size]
-            self.buf = self.buf[end:]
-            if cmd == want_cmd:
-                return payload
+            buf = buf[end:]
+            if self.capture:
+                self.capture.record(CAP_MSP_RX, frame)
+            fut = self.pending.pop((version, cmd), None)
+            if fut is None:
+                continue   # unsolicited, or a reply to a connection-level switch
+            self.cond.notify_all()   # the command is free for its next request
+            if fut.cancelled():
+                continue   # the late answer to a request that timed out
+            if frame[2:3] == b"!":
+                fut.set_exception(RuntimeError(f"MSP error frame for cmd {cmd:#x}"))
+            else:
+                fut.set_result(frame[head:end - 1])
+        self.buf = buf
+
+    def _fail(self, error):
+        with self.cond:
+            self.error = error
+            for fut in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(error)
+            self.pending.clear()
+            self.cond.notify_all()
+
+    def _cli_text(self, line, reply, timeout):
+        """The whole output of `line` from its first reply (under cli_lock):
+        long output is paged, each further window requested by its offset
+        from the FC's paging session for this command."""
+        total, flags = struct.unpack_from("<HB", reply)
+        if flags & MSP2_CLI_COMMAND_FLAG_REFUSED:
+            raise RuntimeError(f"CLI refused {line!r}")
+        out = bytearray(reply[3:])
+        while len(reply) > 3 and len(out) < total:
+            reply = self.request_v2(MSP2_CLI_COMMAND, line.encode() + b"\0" + struct.pack("<H", len(out)), timeout)
+            page_total, flags = struct.unpack_from("<HB", reply)
+            if flags & MSP2_CLI_COMMAND_FLAG_REFUSED or page_total != total:
+                raise RuntimeError(f"CLI paging session for {line!r} lost at byte {len(out)} of {total}")
+            out += reply[3:]
+        if len(out) != total:
+            raise RuntimeError(f"CLI output of {line!r} cut short: {len(out)} of {total} bytes")
+        text = out.decode(errors="replace")
+        if "###ERROR" in text:
+            raise RuntimeError(f"CLI rejected {line!r}: {text.strip()}")
+        return text
+
+    def cli_command(self, line, timeout=5.0):
+        """Run one CLI line over MSP2_CLI_COMMAND and return its output. The
+        port stays in MSP, so this can share the connection with the status
+        poller; `save` writes eeprom.bin without rebooting."""
+        with self.cli_lock:
+            return self._cli_text(line, self.request_v2(MSP2_CLI_COMMAND, line.encode(), timeout), timeout)
+
+    def cli_commands(self, lines, timeout=5.0):
+        """cli_command for several lines, in order, with no other CLI
+        command in between."""
+        with self.cli_lock:
+            return [self.cli_command(line, timeout) for line in lines]
+
+
+_binary_hashes = {}
+
+
+def cached_binary_hash(binary):
+    """binary_hash(), computed once per binary file version."""
+    st = os.stat(binary)
+    key = (os.path.abspath(binary), st.st_size, st.st_mtime)
+    if key not in _binary_hashes:
+        _binary_hashes[key] = binary_hash(binary)
+    return _binary_hashes[key]
+
+
+def eeprom_cache_path(binary, cli_lines):
+    """Where the eeprom.bin for this binary + config is cached, or None."""
+    if EEPROM_CACHE is None:
         return None
+    h = hashlib.sha256(cached_binary_hash(binary).encode())
+    h.update("\n".join(cli_lines).encode())
+    return os.path.join(EEPROM_CACHE, h.hexdigest()[:24] + ".bin")
+
+
+# SITL start-up milestones on stdout/stderr: serial_tcp.c reports the MSP
+# port's listener, sitl.c the UDP servers and worker threads (...<ret>, 0 on
+# success).
+SITL_READY = re.compile(rf"^bind port {TCP_PORT} for UART\d+$")
+SITL_FAILED = re.compile(r"^bind port \d+ for UART\d+ failed|^\[SITL\] start UDP server.*\.\.\.-\d+$|^Create \w+ error")
+SITL_READY_TIMEOUT_S = 20.0
+# config lines the FC only acts on at boot (drivers, ports, features): a
+# chained leg that changes one needs a relaunch, not just activateConfig()
+BOOT_ONLY = re.compile(r"^(feature|serial|resource|timer|dma|beeper|"
+                       r"set (gps_provider|\w+_hardware|blackbox_device)\b)")
+
+
+class SitlLog(threading.Thread):
+    """Tees a SITL process's stdout and stderr into sitl.log.gz and watches
+    the stream for its start-up milestones: the MSP port's listener coming
+    up (ready), a failed bind or worker thread (failed), or end of stream
+    (the process exited) - each known the moment the line is written rather
+    than at the next connect attempt.
+
+    The log is a streaming gzip member per launch, written in the
+    compressor's blocks rather than a flush per line, and holds at most
+    `cap` bytes of output (0: no cap): past the cap lines are only counted,
+    and the last of them are appended under a marker when the stream ends.
+    switch() moves the rest of the stream to another file, with a cap of its
+    own, for an instance carried on into the next chained leg."""
+
+    def __init__(self, pipe, path, cap=None):
+        super().__init__(daemon=True)
+        self.pipe = pipe
+        self.path = path
+        self.cap = LOG_CAP if cap is None else cap
+        self.tail = collections.deque(maxlen=40)
+        self.cond = threading.Condition()
+        self.ready = False
+        self.failure = None
+        self.exited = False
+        self.written = 0
+        self.dropped = 0
+        self.next_path = None
+        self._dropped_tail = collections.deque(maxlen=200)
+
+    def switch(self, path):
+        """Write the output from here on to `path`."""
+        self.next_path = path
+
+    def _finish(self, log):
+        if self.dropped:
+            log.write(f"[harness] {self.dropped} bytes past the {self.cap}-byte log cap dropped; "
+                      f"the last {len(self._dropped_tail)} lines follow\n".encode())
+            log.writelines(self._dropped_tail)
+        log.close()
+        self.written = self.dropped = 0
+        self._dropped_tail.clear()
 
-    def _fill(self, deadline):
-        self.sock.settimeout(max(0.05, deadline - time.monotonic()))
-        try:
-            data = self.sock.recv(4096)
-            if data:
-                self.buf += data
-        except socket.timeout:
-            pass
+    def run(self):
+        log = gzip.open(self.path, "ab", compresslevel=1)
+        for raw in iter(self.pipe.readline, b""):
+            if self.next_path is not None:
+                self._finish(log)
+                self.path, self.next_path = self.next_path, None
+                log = gzip.open(self.path, "ab", compresslevel=1)
+            if not self.cap or self.written + len(raw) <= self.cap:
+                log.write(raw)
+                self.written += len(raw)
+            else:
+                self.dropped += len(raw)
+                self._dropped_tail.append(raw)
+            line = raw.decode(errors="replace").rstrip()
+            with self.cond:
+                self.tail.append(line)
+                if SITL_READY.match(line):
+                    self.ready = True
+                    self.cond.notify_all()
+                elif SITL_FAILED.search(line) and self.failure is None:
+                    self.failure = line
+                    self.cond.notify_all()
+        self._finish(log)
+        self.pipe.close()
+        with self.cond:
+            self.exited = True
+            self.cond.notify_all()
+
+    def wait_ready(self, timeout=SITL_READY_TIMEOUT_S):
+        """"ready", "failed", "exited", or None on timeout. A failure
+        reported before the MSP port came up outranks readiness."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.ready or self.failure or self.exited, timeout)
+            if self.failure:
+                return "failed"
+            if self.ready:
+                return "ready"
+            return "exited" if self.exited else None
 
 
 class Sitl:
-    def __init__(self, binary, workdir):
+    def __init__(self, binary, workdir, capture=None):
         self.binary = os.path.abspath(binary)
         self.workdir = workdir
+        self.capture = capture
         self.proc = None
+        self.cwd = None    # workdir the running process was launched in (where it saves eeprom.bin)
         self.sock = None
         self.msp = None
+        self.log = None    # SitlLog of the running process
         self.boxids = []
+        self.cli_lines = None   # the config the running process was given
+        self.blackbox_seen = set()   # .BFL files in cwd already claimed by a leg
 
     def provision(self, cli_lines):
         cfg = os.path.join(self.workdir, "scenario_config.txt")
@@ -510,6 +1527,31 @@ class Sitl:
         eeprom = os.path.join(self.workdir, "eeprom.bin")
         if os.path.exists(eeprom):
             os.remove(eeprom)
+        self.cli_lines = cli_lines
+        cached = eeprom_cache_path(self.binary, cli_lines)
+        if cached and os.path.exists(cached):
+            debug(f"provision: cached {os.path.basename(cached)}")
+            shutil.copyfile(cached, eeprom)
+            return
+        if PROVISION == "cli":
+            self.provision_live(cli_lines)
+        else:
+            self.provision_config(cfg)
+        if cached:
+            os.makedirs(EEPROM_CACHE, exist_ok=True)
+            # workers sharing the cache may provision the same image at once
+            fd, part = tempfile.mkstemp(dir=EEPROM_CACHE, suffix=".part")
+            os.close(fd)
+            try:
+                shutil.copyfile(eeprom, part)
+                os.replace(part, cached)
+            except OSError:
+                os.remove(part)
+                raise
+
+    def provision_config(self, cfg):
+        """One-shot `--config` run: load the file, save eeprom.bin, exit."""
+        eeprom = os.path.join(self.workdir, "eeprom.bin")
         res = subprocess.run(
             [self.binary, "--config", cfg],
             cwd=self.workdir,
@@ -523,6 +1565,61 @@ class Sitl:
         if not os.path.exists(eeprom):
             raise RuntimeError(f"provisioning produced no eeprom.bin:\n{res.stdout}\n{res.stderr}")
 
+    def provision_live(self, cli_lines):
+        """Boot on defaults and apply the config over MSP2_CLI_COMMAND, the
+        client chained legs reconfigure with: `save` writes eeprom.bin
+        without the reboot, and the following start() loads it."""
+        self.start()
+        try:
+            self.msp.cli_commands(cli_lines + ["save"])
+        finally:
+            self.stop()
+        if not os.path.exists(os.path.join(self.workdir, "eeprom.bin")):
+            raise RuntimeError("CLI save produced no eeprom.bin")
+
+    def reconfigure(self, cli_lines):
+        """Chained-leg provisioning on the running (disarmed) instance: reset
+        to defaults and apply cli_lines over MSP2_CLI_COMMAND. When the
+        config differs from the running one only in settings the FC applies
+        at run time, MSP_EEPROM_WRITE saves and re-reads it - the config is
+        activated without a reboot - and the process carries on: True.
+        Otherwise `save` and end the process - a reboot on SITL is an exit -
+        for the next start() to boot on the saved image: False. Either way
+        the saved eeprom.bin is brought into this leg's workdir."""
+        saved = os.path.join(self.cwd, "eeprom.bin")
+        with open(saved, "rb") as f:
+            previous = f.read()
+        live = self.cli_lines is not None and not any(
+            BOOT_ONLY.match(line) for line in set(self.cli_lines) ^ set(cli_lines))
+        if live:
+            self.msp.cli_commands(["defaults nosave"] + cli_lines)
+            self.msp.request(MSP_EEPROM_WRITE, timeout=5.0)
+        else:
+            self.msp.cli_commands(["defaults nosave"] + cli_lines + ["save"])
+            self.stop()
+        self.cli_lines = cli_lines
+        with open(os.path.join(self.workdir, "scenario_config.txt"), "w") as f:
+            f.write("\n".join(cli_lines) + "\n")
+        # the save lands in the directory the process runs in; keep that
+        # leg's own image there
+        os.replace(saved, os.path.join(self.workdir, "eeprom.bin"))
+        with open(saved, "wb") as f:
+            f.write(previous)
+        if live:
+            self.log.switch(os.path.join(self.workdir, "sitl.log.gz"))
+        return live
+
+    def claim_blackbox(self, leg_dir):
+        """Move the blackbox logs the process has written into its launch
+        directory since the last claim over to leg_dir: a leg carried on
+        the same process flies, and logs, in that directory."""
+        names = {e for e in os.listdir(self.cwd) if e.upper().endswith(".BFL")}
+        if leg_dir != self.cwd:
+            for name in names - self.blackbox_seen:
+                os.replace(os.path.join(self.cwd, name), os.path.join(leg_dir, name))
+            names &= self.blackbox_seen
+        self.blackbox_seen = names
+
     @staticmethod
     def wait_port_free(timeout=15.0):
         deadline = time.monotonic() + timeout
@@ -537,49 +1634,66 @@ class Sitl:
 
     def start(self):
         # The TCP listener has no SO_REUSEADDR; sockets from a previous scenario
-        # lingering in TIME_WAIT can make the bind fail silently, so retry the
-        # whole launch a few times rather than only polling for the port.
+        # lingering in TIME_WAIT make the bind fail, which SITL reports on
+        # stderr - relaunch as soon as it says so.
         for attempt in range(3):
             self.wait_port_free()
-            logf = open(os.path.join(self.workdir, "sitl.log"), "a")
-            self.proc = subprocess.Popen(["stdbuf", "-oL", self.binary], cwd=self.workdir, stdout=logf, stderr=logf)
-            deadline = time.monotonic() + 20
-            while time.monotonic() < deadline:
-                if self.proc.poll() is not None:
-                    debug(f"SITL exited early (rc={self.proc.returncode}); relaunching")
-                    break
+            self.proc = subprocess.Popen(sitl_command_prefix() + ["stdbuf", "-oL", self.binary], cwd=self.workdir,
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.log = SitlLog(self.proc.stdout, os.path.join(self.workdir, "sitl.log.gz"))
+            self.log.start()
+            self.cwd = self.workdir
+            self.blackbox_seen = set()
+            state = self.log.wait_ready()
+            if state == "ready":
                 try:
                     self.sock = socket.create_connection(("127.0.0.1", TCP_PORT), timeout=1)
-                    self.msp = Msp(self.sock)
+                    self.msp = Msp(self.sock, self.capture)
                     self.boxids = list(self.msp.request(MSP_BOXIDS))
                     debug(f"boxids: {self.boxids}")
                     return
                 except (OSError, TimeoutError, RuntimeError) as exc:
                     debug(f"MSP startup probe failed: {exc}")
-                    time.sleep(0.3)
+                    self.close_socket()
+            elif state == "failed":
+                debug(f"SITL start-up failed: {self.log.failure}")
+            elif state == "exited":
+                self.proc.wait()
+                debug(f"SITL exited early (rc={self.proc.returncode}): {' | '.join(list(self.log.tail)[-3:])}")
+            else:
+                debug(f"no MSP listener after {SITL_READY_TIMEOUT_S:.0f} s")
             debug(f"launch attempt {attempt + 1} failed; relaunching")
             self.stop()
             time.sleep(2.0)
         raise RuntimeError("SITL did not open the MSP port after 3 launches")
 
-    def status(self):
-        p = self.msp.request(MSP_STATUS)
+    def status(self, p=None):
+        """Decoded MSP_STATUS; `p` decodes a payload fetched elsewhere."""
+        if p is None:
+            p = self.msp.request(MSP_STATUS)
         mode_flags = struct.unpack_from("<I", p, 6)[0]
         extra_count = p[15]
         off = 16 + extra_count
         arming_count = p[off]
         arming_flags = struct.unpack_from("<I", p, off + 1)[0]
         active = {self.boxids[i] for i in range(min(32, len(self.boxids))) if mode_flags & (1 << i)}
-        return {"modes": active, "arming_flags": arming_flags, "arming_count": arming_count}
+        return {"modes": active, "arming_flags": arming_flags, "arming_count": arming_count,
+                "cycle_us": struct.unpack_from("<H", p, 0)[0], "load_pct": struct.unpack_from("<H", p, 11)[0] / 10.0}
 
     def modes(self):
         return self.status()["modes"]
 
-    def gps(self):
-        p = self.msp.request(MSP_RAW_GPS)
+    def gps(self, p=None):
+        if p is None:
+            p = self.msp.request(MSP_RAW_GPS)
         lat, lon = struct.unpack_from("<ii", p, 2)
         return {"lat": lat / 1e7, "lon": lon / 1e7}
 
+    def status_and_gps(self):
+        """(status(), gps()) for the price of one round trip."""
+        status, gps = self.msp.batch([MSP_STATUS, MSP_RAW_GPS])
+        return self.status(status), self.gps(gps)
+
     def distance_to_m(self, lat, lon):
         g = self.gps()
         dn = (g["lat"] - lat) * M_PER_DEG
@@ -589,12 +1703,19 @@ class Sitl:
     def acc_calibrate(self):
         self.msp.request(MSP_ACC_CALIBRATION)
 
-    def stop(self):
+    def close_socket(self):
         if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)   # wakes the MSP reader
+            except OSError:
+                pass
             try:
                 self.sock.close()
             except OSError:
                 pass
+
+    def stop(self):
+        self.close_socket()
         if self.proc:
             self.proc.terminate()
             try:
@@ -606,7 +1727,7 @@ class Sitl:
 
 class StatusPoller(threading.Thread):
     """5 Hz MSP_STATUS poll feeding true arm/mode state into the telemetry
-    fan-out. Read-only observer: errors are swallowed and the last state kept,
+    fan-out and the leg watchdog. Read-only observer: errors are swallowed and the last state kept,
     so it can never fail a scenario."""
 
     BOX_NAMES = {
@@ -624,6 +1745,17 @@ class StatusPoller(threading.Thread):
         self.running = True
         self.armed = False
         self.modes = []
+        self.mode_mask = 0   # active box IDs as a bitmask, for the telemetry ring
+        self.updated = 0.0   # monotonic time of the last successful poll
+        self.failing = False
+
+    def reset(self):
+        """Forget the last state: a chained leg starts without its
+        predecessor's arm and mode flags."""
+        self.armed = False
+        self.modes = []
+        self.mode_mask = 0
+        self.updated = 0.0
 
     def run(self):
         while self.running:
@@ -632,24 +1764,465 @@ class StatusPoller(threading.Thread):
                     modes = self.sitl.modes()
                     self.armed = BOX_ARM in modes
                     self.modes = [self.BOX_NAMES.get(b, f"BOX{b}") for b in sorted(modes) if b != BOX_ARM]
-            except (TimeoutError, RuntimeError, OSError):
-                pass
+                    self.mode_mask = sum(1 << b for b in modes if b < 64)
+                    self.updated = time.monotonic()
+                    self.failing = False
+            except (TimeoutError, RuntimeError, OSError) as e:
+                if not self.failing:   # once per streak: the watchdog judges staleness
+                    debug(f"status poll failed, keeping the last state: {e}")
+                self.failing = True
             time.sleep(0.2)
 
     def shutdown(self):
         self.running = False
 
 
+TASK_LINE = re.compile(r"^\d+ - \(\s*([^)]+?)\)\s+(.*)$")
+TASK_COLUMNS = ("rate_hz", "max_us", "avg_us", "max_load_pct", "avg_load_pct", "total_ms", "late", "runs", "reqd_us")
+
+
+def parse_tasks(text):
+    """CLI `tasks` output -> ({task name: {column: value}}, total load %).
+    Columns beyond the rate exist with task_statistics on; late/runs/reqd
+    only on builds with USE_LATE_TASK_STATISTICS."""
+    tasks = {}
+    total = None
+    for line in text.splitlines():
+        line = line.strip()
+        m = TASK_LINE.match(line)
+        if m:
+            values = [float(v.rstrip("%")) for v in m.group(2).split()]
+            tasks[m.group(1).strip()] = dict(zip(TASK_COLUMNS, values))
+        elif line.startswith("Total"):
+            total = float(line.split()[-1].rstrip("%"))
+    return tasks, total
+
+
+class TaskSampler(threading.Thread):
+    """Periodic FC scheduler statistics (CLI `tasks` over MSP2_CLI_COMMAND)
+    for one leg, appended to <leg>/tasks.jsonl on the trajectory's clock.
+
+    Each poll also resets the FC's per-task max execution time, so max_us is
+    the worst case since the previous sample. Observer only, like the
+    StatusPoller: a firmware without the command just leaves no samples.
+    The FC has one CLI paging session, so a poll runs under the client's
+    cli_lock, and is skipped while provisioning or a reconfigure holds it.
+    The file stops at LOG_CAP bytes; the summary still covers every sample."""
+
+    def __init__(self, sitl, fdm, path, interval=2.0):
+        super().__init__(daemon=True)
+        self.sitl = sitl
+        self.fdm = fdm
+        self.path = path
+        self.interval = interval
+        self.running = True
+        # (t, {task: stats}, total load %); the summary covers the last hour,
+        # tasks.jsonl keeps the samples of a --soak run up to LOG_CAP
+        self.samples = collections.deque(maxlen=1800)
+        self.written = 0
+        self.dropped = 0
+
+    def run(self):
+        with open(self.path, "w") as out:
+            while self.running:
+                try:
+                    tasks, total = self._poll()
+                    if tasks:
+                        t = self.fdm.now_t()
+                        self.samples.append((t, tasks, total))
+                        line = json.dumps({"t": round(t, 2), "total_load_pct": total, "tasks": tasks}) + "\n"
+                        if LOG_CAP and self.written + len(line) > LOG_CAP:
+                            self.dropped += 1
+                        else:
+                            out.write(line)
+                            out.flush()
+                            self.written += len(line)
+                except (TimeoutError, RuntimeError, OSError, ValueError, AttributeError):
+                    pass
+                for _ in range(int(self.interval / 0.1)):
+                    if not self.running:
+                        break
+                    time.sleep(0.1)
+
+    def _poll(self):
+        msp = self.sitl.msp
+        if not msp.cli_lock.acquire(blocking=False):
+            return {}, None   # another CLI session is paging
+        try:
+            return parse_tasks(msp.cli_command("tasks"))
+        finally:
+            msp.cli_lock.release()
+
+    def summarise(self):
+        """Leg metrics: median rate and total late count per task, mean load."""
+        rates = {}
+        for _t, tasks, _total in self.samples:
+            for name, stats in tasks.items():
+                rates.setdefault(name, []).append(stats["rate_hz"])
+        for name, values in rates.items():
+            values.sort()
+            metric(f"task_hz_{name.lower()}", values[len(values) // 2])
+        if self.samples and "late" in self.samples[-1][1].get("PID", {}):
+            metric("task_late_pid", self.samples[-1][1]["PID"]["late"])
+        loads = [total for _t, _tasks, total in self.samples if total is not None]
+        if loads:
+            metric("task_load_pct", sum(loads) / len(loads))
+
+    def shutdown(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=3.0)
+        if self.dropped:
+            log(f"tasks.jsonl: {self.dropped} samples past the {LOG_CAP}-byte cap dropped")
+        self.summarise()
+
+
+FLYAWAY_M = 450.0       # no scenario legitimately flies this far from home
+STALL_S = 40.0          # airborne under AUTOPILOT inside a STALL_RADIUS_M box; the FC aborts STALLED at 30 s
+STALL_RADIUS_M = 3.0
+AIR_DISARM_S = 1.0      # debounce for the status poll's lag behind the FC
+
+# Adaptive timeouts only ever grow, to at most 4x the tuned values: the
+# motion model and the feeds run in wall time, so a flight takes as long on
+# a fast host and its waits cannot shrink with the loop rate.
+SPEED_FACTOR_MIN = 1.0
+SPEED_FACTOR_MAX = 4.0
+SPEED_WINDOW_S = 1.0    # MSP_STATUS sampling window for measure_speed
+
+LEG = None              # the running Leg: wait_for scales by its speed factor and aborts when its watchdog trips
+SPEED_REFERENCE_HZ = None  # unloaded-host SITL PID-loop rate the wait_for timeouts are tuned for; None: fixed
+LEG_METRICS = None      # the running leg's named numbers: <leg>/metrics.json and the metrics database
+
+
+def metric(name, value):
+    """Record a named per-leg number for metrics.json and the metrics database."""
+    if LEG_METRICS is not None:
+        LEG_METRICS[name] = value
+
+
+def watchdog_distance_limit(cli_lines):
+    """Flyaway limit for a leg: twice a configured geofence, else FLYAWAY_M."""
+    for line in cli_lines:
+        parts = line.split()
+        if len(parts) == 4 and parts[:2] == ["set", "ap_max_distance_from_home"]:
+            return 2.0 * float(parts[3])
+    return FLYAWAY_M
+
+
+class Watchdog(threading.Thread):
+    """Always-on per-leg detector for terminal failure signatures.
+
+    Watches the plant's ground truth and the StatusPoller cache for outcomes
+    no scenario can recover from - SITL exited, disarmed in the air, flown
+    far past the fence, a stalled carrot - and trips at once with a
+    diagnostic, so wait_for fails the leg in seconds instead of burning its
+    full timeout."""
+
+    def __init__(self, sitl, fdm, status, distance_limit_m=FLYAWAY_M):
+        super().__init__(daemon=True)
+        self.sitl = sitl
+        self.fdm = fdm
+        self.status = status
+        self.distance_limit_m = distance_limit_m
+        self.running = True
+        self.failure = None
+        self.tripped = threading.Event()
+        self._was_armed = False
+        self._air_disarm_since = None
+        self._stall_anchor = None   # (t, east, north, up)
+
+    def trip(self, reason):
+        if self.failure is None:
+            self.failure = reason
+            log(f"watchdog: {reason}")
+            self.tripped.set()
+
+    def run(self):
+        while self.running and self.failure is None:
+            self.check(time.monotonic())
+            time.sleep(0.2)
+
+    def check(self, now):
+        proc = self.sitl.proc
+        if proc is not None and proc.poll() is not None:
+            self.trip(f"SITL exited mid-leg (rc={proc.returncode})")
+            return
+
+        model = self.fdm.model
+        dist = math.hypot(model.pos[0], model.pos[1])
+        if dist > self.distance_limit_m:
+            self.trip(f"flew {dist:.0f} m from home (limit {self.distance_limit_m:.0f} m)")
+            return
+
+        if now - self.status.updated > 1.0:
+            return  # no fresh status: the arm/mode checks would be guessing
+        armed = self.status.armed
+        self._was_armed = self._was_armed or armed
+        if self._was_armed and not armed and model.pos[2] > 2.0:
+            if self._air_disarm_since is None:
+                self._air_disarm_since = now
+            elif now - self._air_disarm_since > AIR_DISARM_S:
+                self.trip(f"disarmed in the air at {model.pos[2]:.1f} m")
+                return
+        else:
+            self._air_disarm_since = None
+
+        autopilot = armed and self.status.mode_mask >> BOX_AUTOPILOT & 1 and model.pos[2] > 1.0
+        anchor = self._stall_anchor
+        if not autopilot:
+            self._stall_anchor = None
+        elif anchor is None or math.dist(anchor[1:], model.pos) > STALL_RADIUS_M:
+            self._stall_anchor = (now, model.pos[0], model.pos[1], model.pos[2])
+        elif now - anchor[0] > STALL_S:
+            self.trip(f"carrot stalled: AUTOPILOT airborne within {STALL_RADIUS_M:.0f} m of "
+                      f"({anchor[1]:.0f}, {anchor[2]:.0f}) for {now - anchor[0]:.0f} s")
+
+    def shutdown(self):
+        self.running = False
+
+
+def measure_speed(sitl, window_s=SPEED_WINDOW_S, samples=5):
+    """Timeout scale for this leg: how much slower than the reference host
+    this SITL instance runs, never below 1.
+
+    The FC's PID-task cycle time (MSP_STATUS) stretches when the host is
+    loaded, and the LOW priority position and altitude tasks get starved in
+    proportion. Servo packets cannot stand in for the loop rate: SITL sends
+    one per received fdm_packet. Mean cycle over a short window -> loop
+    rate; reference rate / achieved rate, clamped, with the FC's load
+    recorded beside it."""
+    cycles, loads = [], []
+    for _ in range(samples):
+        status = sitl.status()
+        if status["cycle_us"]:
+            cycles.append(status["cycle_us"])
+        loads.append(status["load_pct"])
+        time.sleep(window_s / samples)
+    cycle_us = sum(cycles) / len(cycles) if cycles else 0.0
+    pid_hz = 1e6 / cycle_us if cycle_us else 0.0
+    load_pct = sum(loads) / len(loads)
+    metric("sitl_pid_hz", pid_hz)
+    metric("sitl_cycle_us", cycle_us)
+    metric("sitl_load_pct", load_pct)
+    if SPEED_REFERENCE_HZ is None or pid_hz <= 0.0:
+        factor = 1.0
+    else:
+        factor = max(SPEED_FACTOR_MIN, min(SPEED_FACTOR_MAX, SPEED_REFERENCE_HZ / pid_hz))
+    metric("speed_factor", factor)
+    log(f"SITL loop {pid_hz:.0f} Hz (cycle {cycle_us:.0f} us, load {load_pct:.0f}%): "
+        f"timeouts x{factor:.2f}")
+    return factor
+
+
 def wait_for(description, predicate, timeout=20.0, interval=0.2):
+    """Poll predicate until it returns truthy. The timeout is tuned for an
+    unloaded host and scaled by the running leg's speed factor."""
+    leg = LEG
+    dog = leg.watchdog if leg is not None else None
+    if leg is not None:
+        timeout *= leg.speed_factor
     deadline = time.monotonic() + timeout
     last = None
     while time.monotonic() < deadline:
+        if dog is not None and dog.failure:
+            break
         last = predicate()
         if last:
             log(f"ok: {description}")
             return last
-        time.sleep(interval)
-    raise AssertionError(f"timeout waiting for: {description}")
+        if dog is not None:
+            dog.tripped.wait(interval)
+        else:
+            time.sleep(interval)
+    if dog is not None and dog.failure:
+        raise AssertionError(f"watchdog: {dog.failure} (waiting for: {description})")
+    raise AssertionError(f"timeout waiting for: {description} ({timeout:.0f} s)")
+
+
+class Monitor:
+    """Streaming check over the trajectory recorder.
+
+    Registered up front with FdmFeed.monitor() and updated as each sample is
+    appended, so a result is ready the moment its window closes instead of
+    being recomputed from snapshot_history(). `when` gates samples by a
+    predicate on the history tuple, `t0`/`t1` bound a time window; done()
+    turns true on the first sample past t1.
+
+    Samples are fed on the plant thread, so an exception from `when` or a
+    value function is kept rather than let out: the monitor stops there
+    and check() - and done() - raise it in the scenario."""
+
+    def __init__(self, when=None, t0=None, t1=None):
+        self.when = when
+        self.t0 = t0
+        self.t1 = t1
+        self.count = 0
+        self.closed = False
+        self.error = None
+
+    def feed(self, s):
+        if self.error is not None:
+            return
+        if self.t1 is not None and s[0] > self.t1:
+            self.closed = True
+            return
+        try:
+            if (self.t0 is not None and s[0] < self.t0) or (self.when is not None and not self.when(s)):
+                return
+            self.count += 1
+            self.update(s)
+        except Exception as e:
+            self.error = e
+
+    def update(self, s):
+        raise NotImplementedError
+
+    def check(self):
+        if self.error is not None:
+            raise AssertionError(f"{type(self).__name__} monitor failed: {self.error!r}") from self.error
+
+    def done(self):
+        self.check()
+        return self.closed
+
+
+class Stats(Monitor):
+    """Count, mean and bounds of value(sample) over the gated samples."""
+
+    def __init__(self, value, **gate):
+        super().__init__(**gate)
+        self.value = value
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, s):
+        v = self.value(s)
+        self.total += v
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Sweep(Monitor):
+    """Azimuth swept about a centre point, in rad. Accumulates wrapped step
+    deltas, so systematic circulation grows it while hover noise cancels out."""
+
+    def __init__(self, centre_e, centre_n, **gate):
+        super().__init__(**gate)
+        self.centre = (centre_e, centre_n)
+        self.last = None
+        self.sweep = 0.0
+
+    def update(self, s):
+        a = math.atan2(s[2] - self.centre[1], s[1] - self.centre[0])
+        if self.last is not None:
+            self.sweep += (a - self.last + math.pi) % (2.0 * math.pi) - math.pi
+        self.last = a
+
+
+class Crossings(Monitor):
+    """Passes of value(sample) from beyond `away` back inside `near`."""
+
+    def __init__(self, value, away, near, **gate):
+        super().__init__(**gate)
+        self.value = value
+        self.away_limit = away
+        self.near_limit = near
+        self.away = False
+        self.crossings = 0
+
+    def update(self, s):
+        v = self.value(s)
+        if v > self.away_limit:
+            self.away = True
+        elif self.away and v < self.near_limit:
+            self.crossings += 1
+            self.away = False
+
+
+class Rollups(Monitor):
+    """Per-window trajectory rollups for --soak legs, one JSON line each in
+    `path` as every window closes.
+
+    hold_rms_m is the horizontal RMS distance from the window's mean
+    position and alt_std_m the standard deviation of altitude about its
+    mean: what a position or altitude hold loses to drift and oscillation
+    within the window. Neither knows the scenario's target, so a steady
+    offset from it shows in alt_mean_m, not here. Accumulated as running
+    sums, so memory is constant however long the leg flies."""
+
+    FIELDS = ("t0", "t1", "samples", "hold_rms_m", "alt_mean_m", "alt_std_m",
+              "speed_mean_mps", "speed_max_mps", "dist_home_max_m")
+
+    def __init__(self, path, window_s=60.0, **gate):
+        super().__init__(**gate)
+        self.path = path
+        self.window_s = window_s
+        self.window = None
+        self.rows = 0
+        self.worst = {}
+        self._clear()
+
+    def _clear(self):
+        self.n = 0
+        self.t_first = self.t_last = None
+        self.sums = [0.0] * 6   # east, north, up and their squares
+        self.speed_total = 0.0
+        self.speed_max = 0.0
+        self.dist_max = 0.0
+
+    def update(self, s):
+        window = int(s[0] // self.window_s)
+        if self.window is not None and window != self.window:
+            self.flush()
+        self.window = window
+        if self.t_first is None:
+            self.t_first = s[0]
+        self.t_last = s[0]
+        self.n += 1
+        for i, v in enumerate(s[1:4]):
+            self.sums[i] += v
+            self.sums[i + 3] += v * v
+        speed = ground_speed(s)
+        self.speed_total += speed
+        self.speed_max = max(self.speed_max, speed)
+        self.dist_max = max(self.dist_max, math.hypot(s[1], s[2]))
+
+    def flush(self):
+        """Close the current window (the leg's last one may be partial)."""
+        if not self.n:
+            return
+        n = self.n
+        var = [max(0.0, self.sums[i + 3] / n - (self.sums[i] / n) ** 2) for i in range(3)]
+        row = dict(zip(self.FIELDS, (
+            round(self.t_first, 2), round(self.t_last, 2), n, round(math.sqrt(var[0] + var[1]), 3),
+            round(self.sums[2] / n, 3), round(math.sqrt(var[2]), 3), round(self.speed_total / n, 3),
+            round(self.speed_max, 3), round(self.dist_max, 2))))
+        with open(self.path, "a") as f:
+            f.write(json.dumps(row) + "\n")
+        self.rows += 1
+        for k in ("hold_rms_m", "alt_std_m", "speed_max_mps", "dist_home_max_m"):
+            self.worst[k] = max(self.worst.get(k, 0.0), row[k])
+        self._clear()
+
+    def summarise(self):
+        """Leg metrics: the number of windows and the worst of each rollup."""
+        self.flush()
+        metric("soak_windows", self.rows)
+        for k, v in self.worst.items():
+            metric(f"soak_{k}_worst", v)
+
+
+def ground_speed(s):
+    return math.hypot(s[4], s[5])
+
+
+def distance_to(east_m, north_m):
+    return lambda s: math.hypot(s[1] - east_m, s[2] - north_m)
 
 
 WP_LAT = HOME_LAT + 300.0 / M_PER_DEG  # default waypoint 300 m north of home
@@ -737,6 +2310,7 @@ def scenario_mission_flight(sitl, rc, fdm):
     """Closed-loop flight: the mission leg is actually flown by the motion
     model under Betaflight's own controllers, ending parked at the waypoint."""
     boot_and_engage(sitl, rc, fdm)
+    t_engage = fdm.now_t()
 
     wait_for(
         "vehicle departs toward the waypoint (>15 m from home)",
@@ -748,26 +2322,27 @@ def scenario_mission_flight(sitl, rc, fdm):
     # Mid-leg cruise: sample in the plateau (past the accel ramp, before the
     # ~42 m braking taper) and check the velocity loop holds the commanded
     # 5 m/s without overshoot.
-    cruise_samples = []
-
-    def reached_or_sample():
-        d = fdm.distance_to_wp(0.0, 300.0)
-        if fdm.distance_from_home() > 50.0 and d > 100.0:
-            cruise_samples.append(math.hypot(fdm.model.vel[0], fdm.model.vel[1]))
-        return d < 8.0
+    to_wp = distance_to(0.0, 300.0)
+    cruise = fdm.monitor(Stats(ground_speed, when=lambda s: math.hypot(s[1], s[2]) > 50.0 and to_wp(s) > 100.0))
 
     wait_for(
         "waypoint reached (within 8 m, ground truth)",
-        lambda: reached_or_sample(),
+        lambda: fdm.distance_to_wp(0.0, 300.0) < 8.0,
         timeout=150,
         interval=1.0,
     )
-    assert len(cruise_samples) >= 5, f"cruise plateau too short: {len(cruise_samples)} samples"
-    cruise_avg = sum(cruise_samples) / len(cruise_samples)
-    cruise_max = max(cruise_samples)
+    cruise.check()
+    # ~10 Hz recorder: 50 samples is 5 s of plateau
+    assert cruise.count >= 50, f"cruise plateau too short: {cruise.count} samples"
+    cruise_avg = cruise.mean
+    cruise_max = cruise.max
     assert 0.8 * 5.0 <= cruise_avg <= 1.2 * 5.0, f"cruise speed off target: avg {cruise_avg:.2f} m/s"
     assert cruise_max <= 1.3 * 5.0, f"cruise overshoot: peak {cruise_max:.2f} m/s"
-    log(f"cruise avg {cruise_avg:.2f} m/s, peak {cruise_max:.2f} m/s over {len(cruise_samples)} samples")
+    log(f"cruise avg {cruise_avg:.2f} m/s, peak {cruise_max:.2f} m/s over {cruise.count} samples")
+    metric("cruise_avg_mps", cruise_avg)
+    metric("cruise_speed_err_mps", abs(cruise_avg - 5.0))
+    metric("cruise_peak_mps", cruise_max)
+    metric("time_to_wp_s", fdm.now_t() - t_engage)
     # Mission complete: executor parks in position hold at the waypoint.
     # Legs complete on radius entry; the hold-mode braking parks a short
     # distance past the point at cruise speed.
@@ -779,16 +2354,17 @@ def scenario_mission_flight(sitl, rc, fdm):
     )
     # dwell: a transit averages cruise speed, a hold oscillates about the
     # point (instantaneous peaks reach ~2 m/s with SITL's 15 Hz position loop)
-    samples = []
-    for _ in range(10):
-        time.sleep(1.0)
-        samples.append(math.hypot(fdm.model.vel[0], fdm.model.vel[1]))
+    t_dwell = fdm.now_t()
+    dwell = fdm.monitor(Stats(ground_speed, t0=t_dwell, t1=t_dwell + 10.0))
+    wait_for("10 s dwell window elapsed", dwell.done, timeout=20, interval=1.0)
     dist = fdm.distance_to_wp(0.0, 300.0)
-    avg_speed = sum(samples) / len(samples)
+    avg_speed = dwell.mean
     assert dist < 25.0, f"did not hold position near waypoint: {dist:.1f} m away"
     assert avg_speed < 1.5, f"did not settle at waypoint: averaging {avg_speed:.1f} m/s"
     assert BOX_ARM in sitl.modes(), "unexpected disarm at mission end"
     log(f"parked {dist:.1f} m from the waypoint")
+    metric("park_dist_m", dist)
+    metric("park_avg_speed_mps", avg_speed)
 
 
 def scenario_mission_yaw(sitl, rc, fdm):
@@ -821,6 +2397,7 @@ def scenario_mission_yaw(sitl, rc, fdm):
     )
     assert BOX_ARM in sitl.modes(), "unexpected disarm during yaw mission"
     log(f"leg flown nose-first, heading {fdm.heading_deg():.0f} deg at arrival")
+    metric("arrival_heading_err_deg", abs((fdm.heading_deg() - 90.0 + 180.0) % 360.0 - 180.0))
 
 
 def scenario_mission_engage_backwards(sitl, rc, fdm):
@@ -852,6 +2429,7 @@ def scenario_mission_engage_backwards(sitl, rc, fdm):
     )
     assert BOX_ARM in sitl.modes(), "unexpected disarm on the backwards-engage mission"
     log(f"rotated onto the leg from a backwards engage, heading {fdm.heading_deg():.0f} deg")
+    metric("arrival_heading_err_deg", abs((fdm.heading_deg() + 180.0) % 360.0 - 180.0))
 
 
 def scenario_mission_corner(sitl, rc, fdm):
@@ -870,24 +2448,21 @@ def scenario_mission_corner(sitl, rc, fdm):
 
     # Sample ground speed while crossing the corner: a stalled gate would drop it
     # toward zero; a working pre-turn carries it through near the corner speed.
-    corner_samples = []
-
-    def carried_through():
-        if fdm.distance_to_wp(0.0, 60.0) < 20.0:
-            corner_samples.append(math.hypot(fdm.model.vel[0], fdm.model.vel[1]))
-        return fdm.distance_to_wp(42.0, 25.0) < 10.0
+    to_corner = distance_to(0.0, 60.0)
+    corner = fdm.monitor(Stats(ground_speed, when=lambda s: to_corner(s) < 20.0))
 
     wait_for(
         "carries through the corner to the second waypoint",
-        carried_through,
+        lambda: fdm.distance_to_wp(42.0, 25.0) < 10.0,
         timeout=120,
         interval=1.0,
     )
-    assert corner_samples, "never sampled near the corner"
-    corner_min = min(corner_samples)
+    assert corner.count, "never sampled near the corner"
+    corner_min = corner.min
     assert corner_min > 0.8, f"stalled in the corner: min ground speed {corner_min:.2f} m/s"
     assert BOX_ARM in sitl.modes(), "unexpected disarm during the corner mission"
-    log(f"carried the corner, min ground speed {corner_min:.2f} m/s over {len(corner_samples)} samples")
+    log(f"carried the corner, min ground speed {corner_min:.2f} m/s over {corner.count} samples")
+    metric("corner_min_speed_mps", corner_min)
 
 
 def scenario_mission_land(sitl, rc, fdm):
@@ -924,6 +2499,7 @@ def scenario_mission_land(sitl, rc, fdm):
     dist = fdm.distance_to_wp(25.0, 40.0)
     assert dist < 10.0, f"landed {dist:.1f} m from the LAND waypoint"
     log(f"landed {dist:.1f} m from the LAND waypoint")
+    metric("landing_dist_m", dist)
 
 
 def scenario_mission_takeoff(sitl, rc, fdm):
@@ -942,12 +2518,12 @@ def scenario_mission_takeoff(sitl, rc, fdm):
 
     # Horizontal drift during the climb, relative to where the mission engaged
     # (TAKEOFF holds the current position, not home).
-    climb = [s for s in fdm.snapshot_history() if t_engage <= s[0] <= t_top]
-    assert climb, "no recorded samples during the climb"
-    e0, n0 = climb[0][1], climb[0][2]
-    drift = max(math.hypot(s[1] - e0, s[2] - n0) for s in climb)
+    climb = fdm.trajectory(t_engage, t_top)
+    assert len(climb), "no recorded samples during the climb"
+    drift = analytics.drift_envelope(climb)
     assert drift < 8.0, f"translated {drift:.1f} m during the TAKEOFF climb"
     log(f"climbed to {fdm.model.pos[2]:.1f} m with {drift:.1f} m drift")
+    metric("climb_drift_m", drift)
 
     wait_for(
         "leg to the north waypoint after the climb",
@@ -958,19 +2534,6 @@ def scenario_mission_takeoff(sitl, rc, fdm):
     assert BOX_ARM in sitl.modes(), "unexpected disarm during the takeoff mission"
 
 
-def hold_window_samples(fdm, centre_e, centre_n, t0, t1):
-    """(distances, azimuth sweep in rad) of history samples in [t0, t1],
-    measured about the hold point. Sweep accumulates wrapped step deltas, so
-    systematic circulation grows it while hover noise cancels out."""
-    pts = [s for s in fdm.snapshot_history() if t0 <= s[0] <= t1]
-    dists = [math.hypot(s[1] - centre_e, s[2] - centre_n) for s in pts]
-    azimuths = [math.atan2(s[2] - centre_n, s[1] - centre_e) for s in pts]
-    sweep = 0.0
-    for a, b in zip(azimuths, azimuths[1:]):
-        sweep += (b - a + math.pi) % (2.0 * math.pi) - math.pi
-    return dists, sweep
-
-
 def scenario_mission_orbit(sitl, rc, fdm):
     """HOLD with the ORBIT pattern: after arriving at the hold point the
     vehicle must circulate around it on the hold radius for the duration."""
@@ -986,19 +2549,25 @@ def scenario_mission_orbit(sitl, rc, fdm):
 
     # Analysis window: skip 12 s (arrival braking + pattern spin-up), observe
     # 40 s of the 60 s hold. Carrot rate 0.25 rad/s -> ~1.6 laps in the window.
-    wait_for("orbit window elapsed", lambda: fdm.now_t() > t_arrive + 52.0,
-             timeout=70, interval=2.0)
-    dists, sweep = hold_window_samples(fdm, 0.0, 40.0, t_arrive + 12.0, t_arrive + 52.0)
-    assert len(dists) > 250, f"recorder too sparse over the hold window: {len(dists)} samples"
-
-    mean_dist = sum(dists) / len(dists)
-    log(f"orbit mean radius {mean_dist:.1f} m, peak {max(dists):.1f} m, "
+    window = {"t0": t_arrive + 12.0, "t1": t_arrive + 52.0}
+    radius = fdm.monitor(Stats(distance_to(0.0, 40.0), **window))
+    circulation = fdm.monitor(Sweep(0.0, 40.0, **window))
+    wait_for("orbit window elapsed", circulation.done, timeout=70, interval=2.0)
+    assert radius.count > 250, f"recorder too sparse over the hold window: {radius.count} samples"
+
+    mean_dist = radius.mean
+    sweep = circulation.sweep
+    log(f"orbit mean radius {mean_dist:.1f} m, peak {radius.max:.1f} m, "
         f"swept {math.degrees(sweep):.0f} deg")
+    metric("hold_mean_radius_m", mean_dist)
+    metric("hold_radius_err_m", abs(mean_dist - 8.0))
+    metric("hold_peak_radius_m", radius.max)
+    metric("hold_sweep_deg", math.degrees(sweep))
     # The vehicle rides the ring with pursuit lag (a little inside) plus the
     # loop phase lag (a little outside); a hover at the hold point would sit
     # near zero and a runaway pursuit far outside.
     assert 3.0 < mean_dist < 12.0, f"orbit radius off: mean {mean_dist:.1f} m from the hold point"
-    assert max(dists) < 16.0, f"orbit excursion: {max(dists):.1f} m from the hold point"
+    assert radius.max < 16.0, f"orbit excursion: {radius.max:.1f} m from the hold point"
     assert sweep > math.radians(270.0), f"no sustained circulation: swept {math.degrees(sweep):.0f} deg"
     assert BOX_ARM in sitl.modes(), "unexpected disarm during the orbit"
 
@@ -1016,27 +2585,23 @@ def scenario_mission_figure8(sitl, rc, fdm):
     )
     t_arrive = fdm.now_t()
 
-    wait_for("figure-8 window elapsed", lambda: fdm.now_t() > t_arrive + 52.0,
-             timeout=70, interval=2.0)
-    dists, _ = hold_window_samples(fdm, 0.0, 40.0, t_arrive + 12.0, t_arrive + 52.0)
-    assert len(dists) > 250, f"recorder too sparse over the hold window: {len(dists)} samples"
-
     # Lemniscate on an 8 m radius: lobes reach the ring, the path re-crosses
     # the centre twice per cycle (~25 s), and never leaves the hold radius.
-    log(f"figure-8 peak {max(dists):.1f} m from the hold point")
-    assert max(dists) < 13.0, f"figure-8 excursion: {max(dists):.1f} m from the hold point"
-    assert max(dists) > 4.0, f"no pattern motion: peak {max(dists):.1f} m from the hold point"
-    crossings = 0
-    away = False
-    for d in dists:
-        if d > 5.0:
-            away = True
-        elif away and d < 4.0:
-            crossings += 1
-            away = False
+    window = {"t0": t_arrive + 12.0, "t1": t_arrive + 52.0}
+    radius = fdm.monitor(Stats(distance_to(0.0, 40.0), **window))
+    passes = fdm.monitor(Crossings(distance_to(0.0, 40.0), away=5.0, near=4.0, **window))
+    wait_for("figure-8 window elapsed", radius.done, timeout=70, interval=2.0)
+    assert radius.count > 250, f"recorder too sparse over the hold window: {radius.count} samples"
+
+    log(f"figure-8 peak {radius.max:.1f} m from the hold point")
+    metric("hold_peak_radius_m", radius.max)
+    assert radius.max < 13.0, f"figure-8 excursion: {radius.max:.1f} m from the hold point"
+    assert radius.max > 4.0, f"no pattern motion: peak {radius.max:.1f} m from the hold point"
+    crossings = passes.crossings
     assert crossings >= 2, f"path did not re-cross the centre: {crossings} passes"
     assert BOX_ARM in sitl.modes(), "unexpected disarm during the figure-8"
     log(f"figure-8 {crossings} centre passes")
+    metric("centre_passes", crossings)
 
 
 def scenario_rx_loss(sitl, rc, fdm, policy):
@@ -1096,6 +2661,7 @@ def scenario_geofence(sitl, rc, fdm, action):
         assert fdm.model.on_ground(), f"disarmed in the air: alt {fdm.model.pos[2]:.1f} m"
         assert dist < 10.0, f"landed {dist:.1f} m from home"
         log(f"returned and landed {dist:.1f} m from home")
+        metric("landing_dist_m", dist)
     else:  # LAND
         time.sleep(8)
         modes = sitl.modes()
@@ -1143,6 +2709,7 @@ def scenario_geofence_rth_rxloss(sitl, rc, fdm):
     dist = fdm.distance_from_home()
     assert dist < 10.0, f"landed {dist:.1f} m from home"
     log(f"landed {dist:.1f} m from home under failsafe")
+    metric("landing_dist_m", dist)
 
 
 # --- GPS rescue scenarios -------------------------------------------------
@@ -1207,21 +2774,25 @@ def rescue_engagement_asserts(sitl, variant="B"):
 
 
 def rescue_metrics(fdm, t0, kill_dist):
-    return {
+    rescue = fdm.trajectory(t0=t0)   # one recorder copy for every metric
+    m = {
         "kill_dist": kill_dist,
-        "max_alt": max((s[3] for s in fdm.snapshot_history() if s[0] >= t0), default=0.0),
-        "max_dist": fdm.max_distance_from_home(after_t=t0),
-        "time_to_home": fdm.time_to_home(radius_m=20.0, after_t=t0),
-        "touchdown": fdm.touchdown(after_t=t0),
+        "max_alt": analytics.peak(rescue.up),
+        "max_dist": analytics.peak(analytics.distance_from(rescue)),
+        "time_to_home": analytics.first_time_within(rescue, 20.0),
+        "touchdown": analytics.touchdown(rescue),
     }
+    metric("rescue_peak_alt_m", m["max_alt"])
+    metric("rescue_max_dist_m", m["max_dist"])
+    if m["time_to_home"] is not None:
+        metric("rescue_return_s", m["time_to_home"] - t0)
+    return m
 
 
 def band_descent_rate(fdm, t0, lo_alt, hi_alt):
     """Median descent rate (m/s, positive down) over an altitude band, ignoring
     the ramp-in at the top and the near-ground slowdown."""
-    s = sorted(-r[6] for r in fdm.snapshot_history()
-               if r[0] >= t0 and lo_alt <= r[3] <= hi_alt and r[6] < -0.1)
-    return s[len(s) // 2] if s else 0.0
+    return analytics.descent_rate_percentile(fdm.trajectory(t0=t0), lo_alt, hi_alt, 50.0)
 
 
 def assert_rescue_climb_rate(fdm, t0, variant):
@@ -1229,8 +2800,9 @@ def assert_rescue_climb_rate(fdm, t0, variant):
     # The altitude P-term still drives a transient above the cap, but at a much
     # lower peak (~1.8 m/s) than the ~2.6 m/s this climb reaches under the
     # alt-hold climbRate (5 m/s): the peak shows ascendRate shaping the climb.
-    peak_climb = max((s[6] for s in fdm.snapshot_history() if s[0] >= t0), default=0.0)
+    peak_climb = analytics.peak(fdm.trajectory(t0=t0).vu)
     log(f"[{variant}] climb rate: peak {peak_climb:.2f} m/s (ascendRate 1.0)")
+    metric("peak_climb_mps", peak_climb)
     assert 0.6 <= peak_climb <= 2.25, f"climb not held to ascendRate: {peak_climb:.2f} m/s"
 
 
@@ -1261,11 +2833,23 @@ def scenario_rescue_ab(sitl, rc, fdm, variant="B"):
     assert td_dist < 15.0, f"landed {td_dist:.1f} m from home"
     log(f"[{variant}] landed {td_dist:.1f} m from home, peak alt {m['max_alt']:.1f} m")
     m["td_dist"] = td_dist
+    metric("landing_dist_m", td_dist)
 
     assert_rescue_climb_rate(fdm, t0, variant)
     return m
 
 
+def compare_rescue(a, b):
+    """rescue_ab: the candidate build (B) brings the vehicle home no worse
+    than the reference (A)."""
+    assert b["td_dist"] <= a["td_dist"] + 5.0, \
+        f"B landed {b['td_dist']:.1f} m from home, A {a['td_dist']:.1f} m"
+    assert b["max_dist"] <= a["max_dist"] + 10.0, \
+        f"B strayed {b['max_dist']:.1f} m from home, A {a['max_dist']:.1f} m"
+    log(f"A/B: landing {a['td_dist']:.1f} -> {b['td_dist']:.1f} m, "
+        f"peak alt {a['max_alt']:.1f} -> {b['max_alt']:.1f} m")
+
+
 def scenario_rescue_heading(sitl, rc, fdm, variant="B"):
     """No mag, true heading east while the FC believes north: the rescue must
     recover heading via GPS course-over-ground (pitch-forward phase) before
@@ -1316,6 +2900,7 @@ def scenario_rescue_heading(sitl, rc, fdm, variant="B"):
     assert td_dist < 30.0, f"landed {td_dist:.1f} m from home"
     log(f"recovered heading and landed {td_dist:.1f} m from home")
     m["td_dist"] = td_dist
+    metric("landing_dist_m", td_dist)
     return m
 
 
@@ -1403,6 +2988,7 @@ def scenario_rescue_switch_descent(sitl, rc, fdm, variant="B"):
     assert_rescue_climb_rate(fdm, t0, variant)
     descent = band_descent_rate(fdm, t0, 2.0, 7.0)
     log(f"[{variant}] fallback descent: {descent:.2f} m/s (descendRate 0.8)")
+    metric("fallback_descent_mps", descent)
     assert 0.5 <= descent <= 1.1, f"fallback descent not held to descendRate: {descent:.2f} m/s"
     return m
 
@@ -1523,6 +3109,13 @@ SCENARIOS = {
         scenario_rescue_ab,
         RESCUE_CFG,
     ),
+    # the same flight on --binary (A) and --binary-b (B)
+    "rescue_ab": (
+        scenario_rescue_ab,
+        RESCUE_CFG,
+        # B must land significantly closer to home, not just on the mean
+        {"ab": True, "compare": compare_rescue, "expect": {"td_dist": "lower"}},
+    ),
     "rescue_heading_recovery": (
         scenario_rescue_heading,
         [*RESCUE_CFG, "set mag_hardware = NONE"],
@@ -1538,6 +3131,24 @@ SCENARIOS = {
     ),
 }
 
+# --benchmark: the reference missions and the controller-performance numbers
+# scored from them, as (scenario, metric, unit, which way is better)
+BENCHMARK = (
+    ("mission_flight", "cruise_speed_err_mps", "m/s", "lower"),
+    ("mission_flight", "cruise_peak_mps", "m/s", "lower"),
+    ("mission_flight", "time_to_wp_s", "s", "lower"),
+    ("mission_flight", "park_dist_m", "m", "lower"),
+    ("mission_flight", "park_avg_speed_mps", "m/s", "lower"),
+    ("mission_yaw", "arrival_heading_err_deg", "deg", "lower"),
+    ("mission_corner", "corner_min_speed_mps", "m/s", "higher"),
+    ("mission_land", "landing_dist_m", "m", "lower"),
+    ("mission_takeoff", "climb_drift_m", "m", "lower"),
+    ("mission_orbit", "hold_radius_err_m", "m", "lower"),
+    ("mission_orbit", "hold_peak_radius_m", "m", "lower"),
+    ("mission_orbit", "hold_sweep_deg", "deg", "higher"),
+)
+SCORECARD_SCHEMA = 1
+
 
 def decode_blackbox_logs(scenario_dir):
     """Best-effort: decode .BFL artifacts when blackbox_decode is available.
@@ -1550,34 +3161,508 @@ def decode_blackbox_logs(scenario_dir):
                            capture_output=True, check=False)
 
 
-def run_leg(name, variant, body, extra_cfg, opts, binary, leg_dir):
+LEG_RECORDS = ("metrics.json",)   # what --keep failed leaves of a passing scenario's legs
+
+
+def prune_legs(scenario_dir, chain=None):
+    """--keep failed: drop a passing scenario's leg artifacts, all but each
+    leg's metrics record (which the metrics database, --repeat and
+    --benchmark read). A kept chain instance still runs in the directory it
+    was launched in, whose eeprom.bin the next leg's reconfigure reads back."""
+    busy = chain.rig[2].cwd if chain is not None and chain.rig is not None else None
+    for leg in sorted(os.listdir(scenario_dir)):
+        leg_dir = os.path.join(scenario_dir, leg)
+        if not os.path.isdir(leg_dir):
+            continue
+        for entry in os.listdir(leg_dir):
+            if entry in LEG_RECORDS or (leg_dir == busy and entry == "eeprom.bin"):
+                continue
+            path = os.path.join(leg_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def write_leg_metrics(leg_dir, record):
+    with open(os.path.join(leg_dir, "metrics.json"), "w") as f:
+        json.dump(record, f, indent=1, sort_keys=True)
+
+
+CHAIN_DISARM_S = 90.0   # a chained leg's wait for its predecessor to land and disarm
+
+
+class Chain:
+    """--chain: one SITL instance and one set of feeds carried across
+    consecutive legs.
+
+    Between legs the instance is disarmed, reset to defaults and given the
+    next leg's config over MSP2_CLI_COMMAND, while the RC/FDM/motor feeds
+    and the status poller stay up and the plant, recorder and poller state
+    are reset in place. A config that differs only in run-time settings is
+    activated in place (Sitl.reconfigure), so such a leg starts with no
+    process teardown, wait_port_free or MSP handshake at all; one that
+    changes a boot-time setting is saved and the process restarted - reboot
+    on SITL is a process exit, so restarting is the harness's job. A leg
+    that leaves the instance unusable costs the next one a provisioning
+    launch, not the chain."""
+
+    def __init__(self):
+        self.rig = None   # (binary, leg_dir, sitl, rc, motors, fdm, poller) of the last leg
+
+    def keep(self, binary, leg_dir, sitl, rc, motors, fdm, poller):
+        self.rig = (os.path.abspath(binary), leg_dir, sitl, rc, motors, fdm, poller)
+
+    def take(self, binary, cli_lines, leg_dir, opts):
+        """The previous leg's rig, reconfigured and restarted for this one,
+        or None when this leg has to build its own."""
+        if self.rig is None:
+            return None
+        prev_binary, prev_dir, sitl, rc, motors, fdm, poller = self.rig
+        if prev_binary != os.path.abspath(binary):
+            self.close()
+            return None
+        self.rig = None
+        rig = (sitl, rc, motors, fdm, poller)
+        try:
+            rc.reset()   # AUX1 low: disarm, so the FC accepts defaults/save
+            sitl.workdir = leg_dir
+            live = False
+            try:
+                if sitl.proc is None or sitl.proc.poll() is not None:
+                    raise RuntimeError("SITL exited")
+                # a leg can end in the air; the FC may hold the disarm
+                # until its landing is done
+                wait_for("previous leg's vehicle disarmed", lambda: BOX_ARM not in sitl.modes(),
+                         timeout=CHAIN_DISARM_S, interval=0.5)
+                sitl.claim_blackbox(prev_dir)
+                live = sitl.reconfigure(cli_lines)
+            except (AssertionError, RuntimeError, TimeoutError, OSError) as e:
+                log(f"chain: cannot reconfigure the running SITL ({e}); provisioning afresh")
+                sitl.stop()
+                sitl.provision(cli_lines)
+            decode_blackbox_logs(prev_dir)
+            poller.reset()
+            fdm.reset(opts.get("initial_yaw_deg", 0.0))
+            if live:
+                debug("chain: config activated in place")
+            else:
+                sitl.start()
+        except BaseException:
+            self._teardown(prev_dir, *rig)
+            raise
+        return rig
+
+    def _teardown(self, leg_dir, sitl, rc, motors, fdm, poller):
+        for feed in (rc, fdm, motors, poller):
+            feed.shutdown()
+        sitl.stop()
+        sitl.claim_blackbox(leg_dir)
+        decode_blackbox_logs(leg_dir)
+
+    def close(self):
+        if self.rig is not None:
+            self._teardown(*self.rig[1:])
+            self.rig = None
+
+
+def report_links(rc, fdm):
+    """Leg metrics of the impaired feed links: the configured delay and
+    jitter, so a sweep's legs can be told apart, and what the link did."""
+    for name, feed in (("rc", rc), ("fdm", fdm)):
+        link = getattr(feed, "link", None)
+        if not isinstance(link, ImpairedLink):
+            continue
+        stats = link.stats(reset=True)   # a chained feed carries on into the next leg
+        metric(f"{name}_link_delay_ms", link.delay * 1000.0)
+        metric(f"{name}_link_jitter_ms", link.jitter * 1000.0)
+        metric(f"{name}_link_loss_pct", 100.0 * stats["lost"] / stats["sent"] if stats["sent"] else 0.0)
+        metric(f"{name}_link_reordered", stats["reordered"])
+        log(f"{name} link: {stats['lost']}/{stats['sent']} lost, {stats['reordered']} reordered")
+
+
+def write_profile(profiler, leg_dir, prefix=""):
+    """Collapsed stacks and the per-thread CPU summary of a StackSampler
+    into the leg directory; the busiest threads go to the log."""
+    profiler.stop()
+    profiler.write(os.path.join(leg_dir, f"{prefix}profile.folded"),
+                   os.path.join(leg_dir, f"{prefix}profile_threads.json"))
+    busiest = sorted(profiler.summary().items(), key=lambda kv: -kv[1]["cpu_s"])[:5]
+    log(f"{prefix or 'harness '}profile over {profiler.wall_s():.1f} s: "
+        + ", ".join(f"{label} {s['cpu_pct']:.1f}% cpu" for label, s in busiest))
+
+
+def write_trajectory(path, history):
+    """The leg's recorder samples as CSV, on the same clock as tasks.jsonl."""
+    with open(path, "w") as f:
+        f.write(",".join(analytics.Trajectory.FIELDS) + "\n")
+        for sample in history:
+            f.write(",".join(f"{v:.3f}" for v in sample) + "\n")
+
+
+class Leg:
+    """A running leg, as open_leg() yields it: the SITL instance, the feeds
+    and the recorder (`fdm`), plus the leg directory and its metrics record,
+    its timeout scale (measure_speed) and its Watchdog."""
+
+    def __init__(self, leg_dir, record, sitl, rc, motors, fdm, poller):
+        self.dir = leg_dir
+        self.record = record
+        self.sitl = sitl
+        self.rc = rc
+        self.motors = motors
+        self.fdm = fdm
+        self.poller = poller
+        self.speed_factor = 1.0
+        self.watchdog = None
+
+
+@contextlib.contextmanager
+def open_leg(name, variant, extra_cfg, opts, binary, leg_dir, chain=None):
+    """Bring up one leg - a provisioned SITL (or the chain's, reconfigured),
+    the feeds, the watchdog and the per-leg samplers - and yield it as a Leg.
+    The with-block is the leg's body: leaving it by an exception, or with
+    the watchdog tripped, fails the leg. Either way every artifact and
+    metrics.json is written on the way out."""
+    global LEG, LEG_METRICS
+    os.makedirs(leg_dir)
+    LEG_METRICS = {}
+    # the hash travels with the record: a worker's binary path means nothing
+    # on the coordinator that records it
+    record = {"scenario": name, "variant": variant, "binary": os.path.abspath(binary),
+              "binary_sha256": cached_binary_hash(binary),
+              "started": time.time(), "passed": False, "error": None}
+    t_start = time.monotonic()
+    capture = PacketCapture(os.path.join(leg_dir, "packets.cap")) if CAPTURE else None
+    cli_lines = base_config(extra_cfg)
+    sitl = rc = motors = fdm = poller = dog = sampler = tracer = rollups = None
+    profiler = stack_sampler.StackSampler() if PROFILE else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        rig = chain.take(binary, cli_lines, leg_dir, opts) if chain is not None else None
+        if rig is not None:
+            sitl, rc, motors, fdm, poller = rig
+        else:
+            sitl = Sitl(binary, leg_dir, capture)
+            # feed construction can fail (port 9002 bind); it must fail the
+            # scenario, not abort the suite
+            rc = RcFeed(capture)
+            poller = StatusPoller(sitl)
+            if PLANT_PROCESS:
+                motors = PlantProcess(leg_dir, opts.get("initial_yaw_deg", 0.0))
+                fdm = RemoteFdmFeed(motors, status=poller)
+            else:
+                motors = MotorFeed(capture)
+                fdm = FdmFeed(motors, initial_yaw_deg=opts.get("initial_yaw_deg", 0.0), status=poller,
+                              capture=capture,
+                              ring_path=os.path.join(leg_dir, "telemetry.ring") if TELEMETRY_RING else None)
+            sitl.provision(cli_lines)
+            sitl.start()
+            motors.start()
+            poller.start()
+        if SOAK:
+            with fdm._hist_lock:
+                fdm.history = soak_history.SpillHistory(os.path.join(leg_dir, "history"))
+            rollups = fdm.monitor(Rollups(os.path.join(leg_dir, "rollups.jsonl")))
+        if PLANT_PROCESS:
+            tracer = motors.tracer
+        else:
+            tracer = motors.tracer = fdm.tracer = LatencyTracer()
+        leg = Leg(leg_dir, record, sitl, rc, motors, fdm, poller)
+        leg.speed_factor = measure_speed(sitl)
+        sampler = TaskSampler(sitl, fdm, os.path.join(leg_dir, "tasks.jsonl"))
+        sampler.start()
+        dog = leg.watchdog = Watchdog(sitl, fdm, poller, watchdog_distance_limit(cli_lines))
+        dog.start()
+        LEG = leg
+        yield leg
+        fdm.check_monitors()
+        if dog.failure:
+            raise AssertionError(f"watchdog: {dog.failure}")
+        record["passed"] = True
+    except Exception as e:
+        record["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        LEG = None
+        if dog is not None:
+            dog.shutdown()
+        if sampler is not None:
+            sampler.shutdown()
+        if tracer is not None:
+            report_latency(tracer)
+        report_links(rc, fdm)
+        if profiler is not None:
+            write_profile(profiler, leg_dir)
+        if rollups is not None:
+            with fdm._hist_lock:
+                rollups.summarise()
+                fdm.history.close()
+            # streamed back from the spilled chunks, one at a time
+            write_trajectory(os.path.join(leg_dir, "trajectory.csv"), fdm.history.iter_all())
+        elif fdm is not None:
+            write_trajectory(os.path.join(leg_dir, "trajectory.csv"), fdm.snapshot_history())
+        if chain is not None and poller is not None and poller.is_alive():
+            # the next leg reconfigures this instance (blackbox logs are
+            # decoded once it has exited)
+            chain.keep(binary, leg_dir, sitl, rc, motors, fdm, poller)
+        else:
+            for feed in (rc, fdm, motors, poller):
+                if feed is not None:
+                    feed.shutdown()
+            if sitl is not None:
+                sitl.stop()
+                if sitl.cwd is not None:
+                    sitl.claim_blackbox(leg_dir)
+            decode_blackbox_logs(leg_dir)
+        if capture:
+            capture.close()
+        record["wall_s"] = time.monotonic() - t_start
+        record["metrics"] = LEG_METRICS
+        LEG_METRICS = None
+        write_leg_metrics(leg_dir, record)
+
+
+def run_leg(name, variant, body, extra_cfg, opts, binary, leg_dir, chain=None):
+    with open_leg(name, variant, extra_cfg, opts, binary, leg_dir, chain) as leg:
+        result = body(leg.sitl, leg.rc, leg.fdm) if variant is None else body(leg.sitl, leg.rc, leg.fdm, variant)
+        if isinstance(result, dict):
+            # A/B bodies return their metrics; keep the numeric ones
+            for k, v in result.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    LEG_METRICS.setdefault(k, v)
+    return result
+
+
+def servo_profile(records, bucket_s=0.1):
+    """Mean motor outputs per bucket_s of capture time, keyed by bucket index
+    counted from the first RC/FDM packet: the shape a replay is compared on,
+    since individual servo frames never line up one-to-one across runs."""
+    sums = {}
+    t_first = None
+    for t, kind, payload in records:
+        if t_first is None and kind in (CAP_RC, CAP_FDM):
+            t_first = t
+        if t_first is None or kind != CAP_SERVO or len(payload) < 16:
+            continue
+        acc = sums.setdefault(int((t - t_first) / bucket_s), [0.0, 0.0, 0.0, 0.0, 0])
+        for i, v in enumerate(struct.unpack_from("<4f", payload)):
+            acc[i] += v
+        acc[4] += 1
+    return {k: [v / acc[4] for v in acc[:4]] for k, acc in sums.items()}
+
+
+REPLAY_TOLERANCE = 0.05   # --replay-tolerance: max |d| of a 100 ms motor-output bucket
+
+
+def msp_requests(data):
+    """(cmd, frame) for each request frame in a captured CAP_MSP_TX write."""
+    while data.startswith(b"$"):
+        if data.startswith(b"$X"):
+            cmd, size = struct.unpack_from("<HH", data, 4)
+            end = 8 + size + 1
+        else:
+            cmd, size = data[4], data[3]
+            end = 5 + size + 1
+        yield cmd, data[:end]
+        data = data[end:]
+
+
+def replay_capture(binary, cap_path, workdir, rate=1.0, tolerance=REPLAY_TOLERANCE):
+    """Open-loop replay: feed a captured RC/FDM stream into a fresh SITL at
+    `rate` x real time, with no motion model in the loop.
+
+    The packets go out verbatim, so their timestamp fields carry the
+    recorded sim time and SITL's simRate follows the acceleration. The
+    captured MSP requests are re-sent at their recorded times too, so the
+    replayed FC is calibrated and queried as the original was; CLI
+    commands are left out, the config having been applied already. The
+    SITL is provisioned from the scenario_config.txt next to the capture;
+    its servo output is captured into <workdir>/replay and compared against
+    the servo frames in the original recording. RuntimeError when nothing
+    came back or the outputs differ by more than `tolerance`."""
+    src_cfg = os.path.join(os.path.dirname(os.path.abspath(cap_path)), "scenario_config.txt")
+    if not os.path.exists(src_cfg):
+        raise RuntimeError(f"no scenario_config.txt beside {cap_path}")
+    with open(src_cfg) as f:
+        cli_lines = f.read().splitlines()
+
+    leg_dir = os.path.join(workdir, "replay")
+    shutil.rmtree(leg_dir, ignore_errors=True)
     os.makedirs(leg_dir)
-    sitl = Sitl(binary, leg_dir)
-    rc = motors = fdm = poller = None
+    capture = PacketCapture(os.path.join(leg_dir, "packets.cap"))
+    sitl = Sitl(binary, leg_dir, capture)
+    motors = MotorFeed(capture)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
     try:
-        # feed construction can fail (port 9002 bind); it must fail the
-        # scenario, not abort the suite
-        rc = RcFeed()
-        motors = MotorFeed()
-        poller = StatusPoller(sitl) if TELEMETRY_PORT else None
-        fdm = FdmFeed(motors, initial_yaw_deg=opts.get("initial_yaw_deg", 0.0), status=poller)
-        sitl.provision(base_config(extra_cfg))
+        sitl.provision(cli_lines)
         sitl.start()
         motors.start()
-        if poller:
-            poller.start()
-        if variant is None:
-            return body(sitl, rc, fdm)
-        return body(sitl, rc, fdm, variant)
+        t_rec = t_wall = None
+        for t, kind, payload in read_capture(cap_path):
+            if kind == CAP_MSP_TX:
+                payload = b"".join(frame for cmd, frame in msp_requests(payload) if cmd != MSP2_CLI_COMMAND)
+                if not payload:
+                    continue
+            elif kind not in (CAP_RC, CAP_FDM):
+                continue
+            if t_rec is None:
+                t_rec, t_wall = t, time.monotonic()
+            delay = t_wall + (t - t_rec) / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if kind == CAP_MSP_TX:
+                sitl.msp.write(payload)
+                continue
+            sock.sendto(payload, ("127.0.0.1", RC_PORT if kind == CAP_RC else FDM_PORT))
+            capture.record(kind, payload)
+            sent += 1
     finally:
-        for feed in (rc, fdm, motors, poller):
-            if feed is not None:
-                feed.shutdown()
+        sock.close()
+        motors.shutdown()
         sitl.stop()
-        decode_blackbox_logs(leg_dir)
-
-
-def run_scenario(name, binary, workdir, binary_b=None):
+        capture.close()
+
+    recorded = servo_profile(read_capture(cap_path), 0.1)
+    # replay buckets are in wall time; scale back to recorded time
+    replayed = servo_profile(read_capture(capture.path), 0.1 / rate)
+    common = sorted(set(recorded) & set(replayed))
+    diffs = [max(abs(a - b) for a, b in zip(recorded[k], replayed[k])) for k in common]
+    log(f"replayed {sent} packets at {rate:g}x; {motors.frames} servo frames back")
+    if not diffs:
+        raise RuntimeError("no servo output to compare with the recording")
+    log(f"motor output vs recording: mean |d| {sum(diffs) / len(diffs):.3f}, "
+        f"max |d| {max(diffs):.3f} over {len(diffs)} buckets")
+    if max(diffs) > tolerance:
+        raise RuntimeError(f"motor output differs from the recording by {max(diffs):.3f} (tolerance {tolerance:g})")
+    return {"sent": sent, "servo_frames": motors.frames, "diffs": diffs}
+
+
+def record_legs(db, suite_id, git_rev, scenario_dir):
+    """Copy every leg's metrics.json under scenario_dir into the database."""
+    for entry in sorted(os.listdir(scenario_dir)):
+        path = os.path.join(scenario_dir, entry, "metrics.json")
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            db.record_leg(suite_id, json.load(f), git_rev)
+
+
+def read_leg_metrics(leg_dir):
+    with open(os.path.join(leg_dir, "metrics.json")) as f:
+        return json.load(f)["metrics"]
+
+
+def report_repeats(name, scenario_dir, stats):
+    """Log a --repeat summary and keep it as <scenario>/repeat.json."""
+    with open(os.path.join(scenario_dir, "repeat.json"), "w") as f:
+        json.dump(stats, f, indent=1, sort_keys=True)
+    log(f"{name}: {stats['runs']} runs per leg, mean +- stdev [{sitl_stats.CONFIDENCE:.0%} CI]")
+    for k, m in stats["metrics"].items():
+        if "diff" in m:
+            a, b = m["a"], m["b"]
+            log(f"  {k}: A {a['mean']:.3f} +- {a['stdev']:.3f}, B {b['mean']:.3f} +- {b['stdev']:.3f}; "
+                f"B - A {m['diff']:+.3f} [{m['diff_lo']:+.3f}, {m['diff_hi']:+.3f}]"
+                + (" significant" if m["significant"] else ""))
+        else:
+            log(f"  {k}: {m['mean']:.3f} +- {m['stdev']:.3f} [{m['ci_lo']:.3f}, {m['ci_hi']:.3f}]")
+
+
+def summarise_repeats(name, scenario_dir, runs):
+    """--repeat for a single-binary scenario: per-metric summaries over the
+    runs' metrics."""
+    report_repeats(name, scenario_dir, {"runs": len(runs), "metrics": {
+        k: sitl_stats.summarise(v) for k, v in sitl_stats.collect(runs).items()}})
+
+
+def ab_skip_reason(opts, binary_b):
+    """Why an A/B scenario cannot run here, or None."""
+    if binary_b is None:
+        return "A/B scenario, no --binary-b"
+    if opts.get("expect") and REPEAT < 2 and PART is None:
+        return "its B - A significance check needs --repeat 2 or more"
+    return None
+
+
+def run_ab_repeated(name, body, extra_cfg, opts, binary, binary_b, scenario_dir, chain):
+    """--repeat for an A/B scenario: A and B legs alternate, so slow drift in
+    the host's load lands on both sides alike. The runs are sequential: every
+    leg binds SITL's fixed ports (--serve spreads them over workers)."""
+    runs = {"A": [], "B": []}
+    for i in range(REPEAT):
+        for variant, bin_path in (("A", binary), ("B", binary_b)):
+            leg_dir = os.path.join(scenario_dir, f"{variant}.{i + 1}")
+            run_leg(name, variant, body, extra_cfg, opts, bin_path, leg_dir, chain)
+            runs[variant].append(read_leg_metrics(leg_dir))
+    judge_ab_repeats(name, opts, scenario_dir, runs)
+
+
+def judge_ab_repeats(name, opts, scenario_dir, runs):
+    """A/B verdict over repeated runs {"A": [metrics], "B": [metrics]}:
+    `compare` sees the per-metric means; an optional opts["expect"]
+    {metric: "lower" | "higher"} further requires B's difference from A to
+    be significant in that direction."""
+    stats = sitl_stats.compare(runs["A"], runs["B"])
+    report_repeats(name, scenario_dir, {"runs": len(runs["A"]), "metrics": stats})
+    opts["compare"]({k: m["a"]["mean"] for k, m in stats.items()},
+                    {k: m["b"]["mean"] for k, m in stats.items()})
+    for k, direction in opts.get("expect", {}).items():
+        m = stats.get(k)
+        assert m is not None, f"A/B: no {k} recorded by both sides"
+        better = m["diff_hi"] < 0.0 if direction == "lower" else m["diff_lo"] > 0.0
+        assert better, (f"A/B: {k} not significantly {direction} on B "
+                        f"(B - A {m['diff']:+.3f}, CI [{m['diff_lo']:+.3f}, {m['diff_hi']:+.3f}])")
+
+
+def write_scorecard(path, binary, workdir, results, git_rev=None):
+    """--benchmark: one JSON scorecard of the BENCHMARK metrics for `binary`,
+    each the mean over the scenario's passing legs (with spread and
+    bootstrap CI under --repeat). Failed legs are left out and counted in
+    "excluded"; a metric with no passing leg scores null."""
+    scores = {}
+    for name, key, unit, better in BENCHMARK:
+        scenario_dir = os.path.join(workdir, name)
+        values = []
+        excluded = 0
+        for entry in sorted(os.listdir(scenario_dir)) if os.path.isdir(scenario_dir) else []:
+            path = os.path.join(scenario_dir, entry, "metrics.json")
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                record = json.load(f)
+            if not record.get("passed"):
+                excluded += 1   # a leg cut short scores what it reached, not the build
+                continue
+            v = record["metrics"].get(key)
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                values.append(float(v))
+        score = {"unit": unit, "better": better, "value": None, "excluded": excluded}
+        if values:
+            stats = sitl_stats.summarise(values)
+            score["value"] = stats.pop("mean")
+            score.update(stats)
+        scores[f"{name}.{key}"] = score
+    card = {"schema": SCORECARD_SCHEMA, "created": time.time(), "binary": os.path.abspath(binary),
+            "binary_hash": binary_hash(binary), "git_rev": git_rev, "host": socket.gethostname(),
+            "repeat": REPEAT, "scenarios": results, "scores": scores}
+    with open(path, "w") as f:
+        json.dump(card, f, indent=1, sort_keys=True)
+    log(f"--- scorecard ({path})")
+    for key, score in scores.items():
+        value = "n/a" if score["value"] is None else f"{score['value']:.3f} {score['unit']}"
+        note = f", {score['excluded']} failed leg(s) excluded" if score["excluded"] else ""
+        log(f"{key:<45} {value:>16}  ({score['better']} is better{note})")
+    return card
+
+
+def run_scenario(name, binary, workdir, binary_b=None, db=None, chain=None):
+    """Run one scenario; `db` is an optional (MetricsDb, suite id, git rev)
+    its legs are recorded into, `chain` an optional Chain its legs run on."""
     spec = SCENARIOS[name]
     body, extra_cfg = spec[0], spec[1]
     opts = spec[2] if len(spec) > 2 else {}
@@ -1586,44 +3671,357 @@ def run_scenario(name, binary, workdir, binary_b=None):
     os.makedirs(scenario_dir)
 
     log(f"=== scenario: {name}")
+    t_start = time.monotonic()
+    ok = False
     try:
         if opts.get("ab"):
-            if binary_b is None:
-                log(f"=== SKIP: {name} (A/B scenario, no --binary-b)")
+            reason = ab_skip_reason(opts, binary_b)
+            if reason is not None:
+                log(f"=== SKIP: {name} ({reason})")
+                ok = None
                 return None
-            metrics_a = run_leg(name, "A", body, extra_cfg, opts, binary, os.path.join(scenario_dir, "A"))
-            metrics_b = run_leg(name, "B", body, extra_cfg, opts, binary_b, os.path.join(scenario_dir, "B"))
-            opts["compare"](metrics_a, metrics_b)
+            if REPEAT > 1:
+                run_ab_repeated(name, body, extra_cfg, opts, binary, binary_b, scenario_dir, chain)
+            else:
+                metrics_a = run_leg(name, "A", body, extra_cfg, opts, binary, os.path.join(scenario_dir, "A"), chain)
+                metrics_b = run_leg(name, "B", body, extra_cfg, opts, binary_b, os.path.join(scenario_dir, "B"), chain)
+                if PART is None:   # a part's single pair is judged with the others
+                    opts["compare"](metrics_a, metrics_b)
+        elif REPEAT > 1:
+            runs = []
+            for i in range(REPEAT):
+                leg_dir = os.path.join(scenario_dir, f"run.{i + 1}")
+                run_leg(name, None, body, extra_cfg, opts, binary, leg_dir, chain)
+                runs.append(read_leg_metrics(leg_dir))
+            summarise_repeats(name, scenario_dir, runs)
         else:
-            run_leg(name, None, body, extra_cfg, opts, binary, os.path.join(scenario_dir, "run"))
+            run_leg(name, None, body, extra_cfg, opts, binary, os.path.join(scenario_dir, "run"), chain)
         log(f"=== PASS: {name}")
+        ok = True
         return True
     except (AssertionError, RuntimeError, TimeoutError, OSError) as e:
         log(f"=== FAIL: {name}: {e}")
         return False
+    finally:
+        if db is not None:
+            record_legs(db[0], db[1], db[2], scenario_dir)
+            if ok is not None:
+                db[0].record_scenario(db[1], name, time.monotonic() - t_start, ok, REPEAT)
+        if ok and KEEP == "failed":
+            prune_legs(scenario_dir, chain)
+
+
+def run_distributed(names, args, db=None):
+    """Run `names` through a Coordinator on --serve, optionally with
+    --local-workers worker processes on this host; {scenario: ok}."""
+    flags = [flag for flag, on in (("--capture", args.capture), ("--telemetry-ring", args.telemetry_ring),
+                                   ("--plant-process", args.plant_process), ("--soak", args.soak),
+                                   ("--profile", args.profile),
+                                   ("-v", args.verbose)) if on]
+    flags += ["--provision", args.provision, "--speed-reference", str(SPEED_REFERENCE_HZ or 0),
+              "--priority", PRIORITY, "--log-cap", str(LOG_CAP / (1 << 20)),
+              "--keep", KEEP]
+    for flag, spec in (("--impair-rc", IMPAIR_RC), ("--impair-fdm", IMPAIR_FDM)):
+        if spec:
+            flags += [flag, spec]
+    results = {}
+    jobs = []
+    for name in names:
+        spec = SCENARIOS[name]
+        ab = len(spec) > 2 and spec[2].get("ab")
+        reason = ab_skip_reason(spec[2], args.binary_b) if ab else None
+        if reason is not None:
+            log(f"=== SKIP: {name} ({reason})")
+            results[name] = None
+            continue
+        job = {"scenario": name, "binary": args.binary, "binary_b": args.binary_b if ab else None, "flags": flags}
+        if REPEAT == 1:
+            jobs.append(job)
+            continue
+        # --repeat: one job per run, so the runs spread over the workers; the
+        # parts come back into <scenario>/part.<n> and are merged below
+        shutil.rmtree(os.path.join(args.workdir, name), ignore_errors=True)
+        jobs += [dict(job, part=i + 1, flags=flags + ["--part", str(i + 1)]) for i in range(REPEAT)]
+
+    # longest first, from the scenarios' recorded wall times
+    estimates = db[0].scenario_durations() if db is not None else {}
+    jobs = lpt_order(jobs, estimates)
+    known = [job for job in jobs if job["scenario"] in estimates]
+    if known:
+        log(f"LPT order from {len(known)}/{len(jobs)} recorded durations: "
+            + ", ".join(job["scenario"] for job in jobs))
+        if args.local_workers:
+            default = max(estimates.values())
+            est = lpt_makespan([estimates.get(job["scenario"], default) for job in jobs], args.local_workers)
+            log(f"estimated makespan on {args.local_workers} workers: {est:.0f} s")
+
+    part_walls = collections.defaultdict(float)
+
+    def on_result(job, ok, scenario_dir):
+        part = job.get("part")
+        log(f"=== {'PASS' if ok else 'FAIL'}: {job['scenario']}" + (f" (run {part}/{REPEAT})" if part else ""))
+        if db is not None:
+            record_legs(db[0], db[1], db[2], scenario_dir)
+            if part:
+                part_walls[job["scenario"]] += job["wall_s"] or 0.0
+            elif job["wall_s"] is not None:
+                db[0].record_scenario(db[1], job["scenario"], job["wall_s"], ok)
+
+    coord = Coordinator(jobs, args.workdir, args.serve, on_result, args.serve_host, args.token)
+    coord.start()
+    workers = []
+    # local workers split the cpus between them unless told otherwise, so a
+    # leg's timing does not depend on which neighbours it happened to share with
+    slices = [None] * args.local_workers
+    if args.local_workers and args.cpus != "none":
+        pool = parse_cpus(args.cpus) if args.cpus not in (None, "auto") else sorted(os.sched_getaffinity(0))
+        slices = cpu_slices(pool, args.local_workers)
+        if len(pool) < args.local_workers:
+            log(f"{len(pool)} cpus for {args.local_workers} workers: some workers share a cpu")
+    for i in range(args.local_workers):
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", f"127.0.0.1:{coord.port}",
+               "--workdir", os.path.join(args.workdir, "workers", str(i)), "--isolate", args.isolate]
+        if slices[i] is not None:
+            cmd += ["--cpus", format_cpus(slices[i])]
+        # the token goes through the environment, out of the process list
+        workers.append(subprocess.Popen(cmd, env=dict(os.environ, **{TOKEN_ENV: coord.token})))
+    try:
+        done = coord.wait()
+    finally:
+        for proc in workers:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    results.update(done)
+    if REPEAT > 1:
+        for name in done:
+            results[name] = merge_parts(name, os.path.join(args.workdir, name), done[name])
+            if db is not None:
+                db[0].record_scenario(db[1], name, part_walls[name], results[name], REPEAT)
+    return {name: results[name] for name in names}
+
+
+def merge_parts(name, scenario_dir, ok):
+    """Fold a distributed --repeat scenario's part.<n> results into the
+    directory a local run leaves (run.<n>, or A.<n> and B.<n>) and judge
+    them together; the scenario passes only if every part did."""
+    opts = SCENARIOS[name][2] if len(SCENARIOS[name]) > 2 else {}
+    variants = ("A", "B") if opts.get("ab") else ("run",)
+    runs = {variant: [] for variant in variants}
+    parts = sorted(int(entry.split(".")[1]) for entry in os.listdir(scenario_dir) if entry.startswith("part."))
+    for n in parts:
+        part_dir = os.path.join(scenario_dir, f"part.{n}")
+        for entry in os.listdir(part_dir):
+            stem, ext = os.path.splitext(entry)
+            dest = f"{entry}.{n}" if entry in variants else f"{stem}.{n}{ext}"   # harness.log -> harness.<n>.log
+            os.replace(os.path.join(part_dir, entry), os.path.join(scenario_dir, dest))
+            if entry in variants and ok:
+                runs[entry].append(read_leg_metrics(os.path.join(scenario_dir, dest)))
+        os.rmdir(part_dir)
+    if not ok:
+        return False
+    try:
+        if opts.get("ab"):
+            judge_ab_repeats(name, opts, scenario_dir, runs)
+        else:
+            summarise_repeats(name, scenario_dir, runs["run"])
+    except (AssertionError, OSError) as e:
+        log(f"=== FAIL: {name}: {e}")
+        return False
+    log(f"=== PASS: {name} ({len(parts)} runs)")
+    return True
 
 
 def main():
-    global VERBOSE, TELEMETRY_PORT
+    global VERBOSE, TELEMETRY_PORT, CAPTURE, TELEMETRY_RING, PROVISION, EEPROM_CACHE, SPEED_REFERENCE_HZ, \
+        PLACEMENT, PRIORITY, PLANT_PROCESS, SOAK, REPEAT, IMPAIR_RC, IMPAIR_FDM, LOG_CAP, KEEP, PROFILE, PART
     ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
-    ap.add_argument("--binary", required=True, help="path to betaflight_SITL.elf (built with USE_FLIGHT_PLAN)")
-    ap.add_argument("--binary-b", help="rescue-plan binary (-DENABLE_RESCUE_PLAN=1) for A/B scenarios")
+    ap.add_argument("--binary", help="path to betaflight_SITL.elf (built with USE_FLIGHT_PLAN)")
+    ap.add_argument("--binary-b", help="candidate binary flown as B against --binary (A) in A/B scenarios "
+                    "(rescue_ab, which also needs --repeat for its significance check)")
     ap.add_argument("--scenario", default="all", choices=["all"] + list(SCENARIOS))
     ap.add_argument("--workdir", default="/tmp/sitl_harness")
     ap.add_argument("--telemetry-port", type=int, default=TELEMETRY_PORT,
                     help="UDP port for ground-truth JSON telemetry (0 disables)")
+    ap.add_argument("--telemetry-ring", action="store_true",
+                    help="also publish ground truth into <leg>/telemetry.ring for local readers (telemetry_ring.py)")
+    ap.add_argument("--capture", action="store_true",
+                    help="log every RC/FDM/servo packet and MSP frame to <leg>/packets.cap")
+    ap.add_argument("--replay", metavar="CAPFILE",
+                    help="open-loop replay of a captured RC/FDM stream into --binary (no motion model)")
+    ap.add_argument("--replay-rate", type=float, default=1.0, help="replay speed multiplier")
+    ap.add_argument("--replay-tolerance", type=float, default=REPLAY_TOLERANCE,
+                    help="largest motor-output difference from the recording (per 100 ms bucket) a replay passes with")
+    ap.add_argument("--provision", choices=["config", "cli"], default=PROVISION,
+                    help="write eeprom.bin with a one-shot --config run, or over a live CLI session on the MSP port")
+    ap.add_argument("--eeprom-cache", help="directory caching provisioned eeprom.bin per binary + config "
+                    "(default <workdir>/eeprom_cache, empty string disables)")
+    ap.add_argument("--chain", action="store_true",
+                    help="run consecutive legs on one SITL instance, reconfigured over MSP between legs")
+    ap.add_argument("--speed-reference", type=float, metavar="HZ",
+                    help="SITL PID-loop rate the timeouts are tuned for; each leg scales its timeouts by this over "
+                    "its measured rate (default: 90th percentile of this host's recorded rates, 0 disables)")
+    ap.add_argument("--metrics-db", help="SQLite file legs and their metrics are recorded into "
+                    "(default <workdir>/metrics.sqlite, empty string disables)")
+    ap.add_argument("--serve", type=int, metavar="PORT",
+                    help="coordinate: hand scenarios to --worker processes on this TCP port (0 picks one)")
+    ap.add_argument("--serve-host", default="127.0.0.1", metavar="ADDR",
+                    help="address the coordinator listens on (default loopback only; 0.0.0.0 exposes it to "
+                    "other hosts and needs --token)")
+    ap.add_argument("--local-workers", type=int, default=0, metavar="N",
+                    help="with --serve, also start N worker processes on this host")
+    ap.add_argument("--worker", metavar="HOST:PORT", help="run scenarios handed out by a --serve coordinator")
+    ap.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                    help="shared secret workers present to the coordinator (default $%s; a coordinator on "
+                    "loopback without one makes up its own for --local-workers)" % TOKEN_ENV)
+    ap.add_argument("--isolate", choices=["auto", "netns", "none"], default="auto",
+                    help="worker leg isolation: private network namespace, or none (legs serialised per host)")
+    ap.add_argument("--cpus", metavar="LIST",
+                    help="pin SITL and the feed threads to these cpus (taskset list, 'auto' for all this process "
+                    "may use, 'none' to leave unpinned); SITL gets the first half, the feeds the rest. "
+                    "Local workers split the cpus between them by default")
+    ap.add_argument("--priority", choices=["normal", "high", "realtime"], default=PRIORITY,
+                    help="raise SITL and the feed threads to nice %d (high) or SCHED_FIFO (realtime), where "
+                    "permitted" % NICE_HIGH)
+    ap.add_argument("--plant-process", action="store_true",
+                    help="run the motion model and the FDM/motor I/O in a child process sharing state through "
+                    "<leg>/plant.shm, so scenario-side work cannot stall the plant")
+    ap.add_argument("--soak", action="store_true",
+                    help="bounded-memory recording for long legs: recent samples in memory, the rest spilled to "
+                    "<leg>/history in compressed chunks, per-minute rollups in <leg>/rollups.jsonl")
+    ap.add_argument("--repeat", type=int, default=REPEAT, metavar="N",
+                    help="fly every leg N times (A/B legs alternating) and report each metric's mean, spread and "
+                    "bootstrap confidence interval in <scenario>/repeat.json; with --serve each run is a job of its own")
+    ap.add_argument("--impair-rc", metavar="SPEC",
+                    help="send rc_packets through an emulated link: comma-separated delay=MS, jitter=MS, loss=P, "
+                    "burst=P, burst_len=N, reorder=0|1, seed=N (see link_impair.py)")
+    ap.add_argument("--impair-fdm", metavar="SPEC", help="the same for fdm_packets")
+    ap.add_argument("--log-cap", type=float, default=LOG_CAP / (1 << 20), metavar="MB",
+                    help="size cap for each log a leg streams to disk: SITL output per launch in sitl.log.gz "
+                    "(the head, then the last lines), packets.cap and tasks.jsonl (the head); 0 keeps everything. "
+                    "The telemetry ring is a fixed-size ring and needs no cap")
+    ap.add_argument("--keep", choices=["all", "failed"], default=KEEP,
+                    help="keep every leg's artifacts, or only failed legs' (passing legs keep metrics.json)")
+    ap.add_argument("--profile", action="store_true",
+                    help="sample every harness thread's stack at %.0f Hz per leg: collapsed stacks in "
+                    "<leg>/profile.folded (flamegraph tools), per-thread CPU time in <leg>/profile_threads.json"
+                    % stack_sampler.DEFAULT_HZ)
+    ap.add_argument("--benchmark", metavar="JSON",
+                    help="fly the reference missions instead of --scenario and write a controller-performance "
+                    "scorecard for --binary to this file")
+    ap.add_argument("--plant", metavar="SHM", help=argparse.SUPPRESS)   # the --plant-process child
+    ap.add_argument("--part", type=int, help=argparse.SUPPRESS)         # a distributed --repeat's run
     ap.add_argument("-v", "--verbose", action="store_true")
     args = ap.parse_args()
+    if args.worker is None and args.plant is None and args.binary is None:
+        ap.error("--binary is required")
+    if args.chain and (args.capture or args.telemetry_ring or args.serve is not None):
+        ap.error("--chain shares feeds across legs: it runs sequentially, without per-leg --capture/--telemetry-ring")
+    if args.plant_process and args.capture:
+        ap.error("--capture records packets in the harness process: it cannot be combined with --plant-process")
+    if args.serve is not None and not args.token and args.serve_host not in ("127.0.0.1", "localhost"):
+        ap.error(f"--serve-host {args.serve_host} accepts workers from other hosts: set --token (or ${TOKEN_ENV})")
+    if args.replay_tolerance < 0:
+        ap.error("--replay-tolerance cannot be negative")
+    if args.log_cap < 0:
+        ap.error("--log-cap cannot be negative")
     VERBOSE = args.verbose
     TELEMETRY_PORT = args.telemetry_port
+    CAPTURE = args.capture
+    TELEMETRY_RING = args.telemetry_ring
+    PROVISION = args.provision
+    cache = os.path.join(args.workdir, "eeprom_cache") if args.eeprom_cache is None else args.eeprom_cache
+    EEPROM_CACHE = os.path.abspath(cache) if cache else None
+    if args.cpus not in (None, "none"):
+        try:
+            cpus = sorted(os.sched_getaffinity(0)) if args.cpus == "auto" else parse_cpus(args.cpus)
+        except ValueError:
+            ap.error(f"--cpus: not a cpu list: {args.cpus}")
+        # the plant child is handed the feed cpus only
+        PLACEMENT = (cpus, cpus) if args.plant else split_placement(cpus)
+        if args.serve is None and args.worker is None and args.plant is None:
+            log(f"SITL on cpus {format_cpus(PLACEMENT[0])}, feeds on cpus {format_cpus(PLACEMENT[1])}")
+    PRIORITY = args.priority
+    if PRIORITY == "realtime" and not realtime_permitted():
+        log("SCHED_FIFO not permitted here: falling back to --priority high")
+        PRIORITY = "high"
+
+    PLANT_PROCESS = args.plant_process
+    SOAK = args.soak
+    PROFILE = args.profile
+    PART = args.part
+    LOG_CAP = int(args.log_cap * (1 << 20))
+    KEEP = args.keep
+    for flag, spec in (("--impair-rc", args.impair_rc), ("--impair-fdm", args.impair_fdm)):
+        try:
+            parse_spec(spec or "")
+        except ValueError as e:
+            ap.error(f"{flag}: {e}")
+    IMPAIR_RC = args.impair_rc or None
+    IMPAIR_FDM = args.impair_fdm or None
+    if args.repeat < 1:
+        ap.error("--repeat must be at least 1")
+    REPEAT = args.repeat
+    if args.plant:
+        run_plant(args.plant)
+        sys.exit(0)
 
     os.makedirs(args.workdir, exist_ok=True)
-    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
-    results = {name: run_scenario(name, args.binary, args.workdir, args.binary_b) for name in names}
+    if args.worker:
+        try:
+            cpus = format_cpus(sorted(set(PLACEMENT[0] + PLACEMENT[1]))) if PLACEMENT is not None else None
+            Worker(args.worker, args.workdir, os.path.abspath(__file__), args.isolate, cpus, args.token).run()
+        except OSError as e:
+            log(f"worker failed: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    if args.replay:
+        try:
+            replay_capture(args.binary, args.replay, args.workdir, args.replay_rate, args.replay_tolerance)
+        except (RuntimeError, TimeoutError, OSError) as e:
+            log(f"replay failed: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    if args.benchmark:
+        names = list(dict.fromkeys(name for name, *_ in BENCHMARK))
+    else:
+        names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    db_path = os.path.join(args.workdir, "metrics.sqlite") if args.metrics_db is None else args.metrics_db
+    db = None
+    if db_path:
+        git_rev = git_revision()
+        metrics_db = MetricsDb(db_path)
+        db = (metrics_db, metrics_db.begin_suite(git_rev), git_rev)
+    if args.speed_reference is not None:
+        SPEED_REFERENCE_HZ = args.speed_reference or None
+    elif db is not None:
+        SPEED_REFERENCE_HZ = db[0].reference_value("sitl_pid_hz")
+    if SPEED_REFERENCE_HZ:
+        log(f"timeouts tuned for a {SPEED_REFERENCE_HZ:.0f} Hz SITL loop")
+    t_suite = time.monotonic()
+    if args.serve is not None:
+        results = run_distributed(names, args, db)
+    else:
+        chain = Chain() if args.chain else None
+        try:
+            results = {name: run_scenario(name, args.binary, args.workdir, args.binary_b, db, chain)
+                       for name in names}
+        finally:
+            if chain is not None:
+                chain.close()
+    wall_s = time.monotonic() - t_suite
 
     log("--- summary")
     for name, ok in results.items():
         log(f"{'PASS' if ok else 'SKIP' if ok is None else 'FAIL'}  {name}")
+    log(f"suite wall time {wall_s:.1f} s")
+    if args.benchmark:
+        write_scorecard(args.benchmark, args.binary, args.workdir, results, db[2] if db is not None else git_revision())
+    if db is not None:
+        outcomes = list(results.values())
+        db[0].finish_suite(db[1], wall_s, outcomes.count(True), outcomes.count(False), outcomes.count(None))
+        db[0].close()
     sys.exit(0 if all(ok is not False for ok in results.values()) else 1)
 
 
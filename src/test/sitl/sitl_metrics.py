@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Cross-run SITL metrics database and trend queries.
+
+sitl_harness.py records every suite run, every leg (pass/fail, wall time)
+and each leg's named metrics (cruise average, corner minimum speed, landing
+distance, climb peak, ...) into a local SQLite file, keyed by firmware
+binary hash, git revision and scenario. This script queries it, so drift in
+the flight-plan controllers - or in the harness's own speed - shows up as
+numbers across builds rather than in old logs.
+
+Usage:
+  sitl_metrics.py --db /tmp/sitl_harness/metrics.sqlite builds
+  sitl_metrics.py --db ... trend mission_flight cruise_avg_mps
+  sitl_metrics.py --db ... drift --threshold 0.15    # exits 1 on drift
+"""
+
+import argparse
+import hashlib
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suites (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    git_rev TEXT,
+    host TEXT,
+    wall_s REAL,
+    passed INTEGER,
+    failed INTEGER,
+    skipped INTEGER
+);
+CREATE TABLE IF NOT EXISTS legs (
+    id INTEGER PRIMARY KEY,
+    suite_id INTEGER REFERENCES suites(id),
+    scenario TEXT NOT NULL,
+    variant TEXT,
+    binary_hash TEXT,
+    git_rev TEXT,
+    started REAL,
+    wall_s REAL,
+    passed INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    leg_id INTEGER REFERENCES legs(id),
+    name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    suite_id INTEGER REFERENCES suites(id),
+    scenario TEXT NOT NULL,
+    finished REAL NOT NULL,
+    wall_s REAL NOT NULL,
+    passed INTEGER
+);
+CREATE INDEX IF NOT EXISTS legs_by_scenario ON legs(scenario, binary_hash);
+CREATE INDEX IF NOT EXISTS metrics_by_leg ON metrics(leg_id);
+"""
+
+
+def binary_hash(path):
+    """sha256 of a firmware binary: the build identity legs are keyed by."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def git_revision(path=None):
+    """`git describe --always --dirty` of the tree holding `path`, or None."""
+    cwd = os.path.dirname(os.path.abspath(path or __file__))
+    try:
+        res = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=cwd,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if res.returncode != 0:
+        return None
+    return res.stdout.strip() or None
+
+
+class MetricsDb:
+    """Writer and query side of the metrics database."""
+
+    def __init__(self, path):
+        self.path = path
+        # a distributed run records legs from the coordinator's connection
+        # threads; it serialises those calls, so one connection can be shared
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._hashes = {}
+
+    def close(self):
+        self.conn.close()
+
+    def hash_of(self, binary):
+        key = os.path.abspath(binary)
+        if key not in self._hashes:
+            self._hashes[key] = binary_hash(key)
+        return self._hashes[key]
+
+    def begin_suite(self, git_rev=None):
+        with self.conn:
+            cur = self.conn.execute("INSERT INTO suites (started, git_rev, host) VALUES (?, ?, ?)",
+                                    (time.time(), git_rev, socket.gethostname()))
+        return cur.lastrowid
+
+    def finish_suite(self, suite_id, wall_s, passed, failed, skipped):
+        with self.conn:
+            self.conn.execute("UPDATE suites SET wall_s = ?, passed = ?, failed = ?, skipped = ? WHERE id = ?",
+                              (wall_s, passed, failed, skipped, suite_id))
+
+    def record_leg(self, suite_id, leg, git_rev=None):
+        """Store one leg's metrics.json record (see sitl_harness.run_leg),
+        keyed by the binary_sha256 it carries; only records without one
+        fall back to hashing the binary path."""
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO legs (suite_id, scenario, variant, binary_hash, git_rev, started, wall_s, passed, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (suite_id, leg["scenario"], leg.get("variant"),
+                 leg.get("binary_sha256") or self.hash_of(leg["binary"]), git_rev, leg.get("started"), leg.get("wall_s"), int(bool(leg.get("passed"))), leg.get("error")))
+            self.conn.executemany(
+                "INSERT INTO metrics (leg_id, name, value) VALUES (?, ?, ?)",
+                [(cur.lastrowid, k, float(v)) for k, v in leg.get("metrics", {}).items()
+                 if isinstance(v, (int, float)) and v == v])
+        return cur.lastrowid
+
+    def record_scenario(self, suite_id, scenario, wall_s, passed, runs=1):
+        """Scenario wall time (all legs, launches included) per run: what the
+        distributed runner schedules on, a --repeat run being one job. A
+        `wall_s` covering `runs` repeats is stored divided by them."""
+        with self.conn:
+            self.conn.execute("INSERT INTO scenarios (suite_id, scenario, finished, wall_s, passed) VALUES (?, ?, ?, ?, ?)",
+                              (suite_id, scenario, time.time(), wall_s / runs, int(bool(passed))))
+
+    # --- queries ---------------------------------------------------------
+
+    def scenario_durations(self, recent=5):
+        """{scenario: mean wall time of its last `recent` passing runs}.
+        Failed runs are left out: they stop early or run into a timeout, and
+        neither says how long the scenario takes."""
+        runs = {}
+        for scenario, wall_s in self.conn.execute(
+                "SELECT scenario, wall_s FROM scenarios WHERE passed = 1 ORDER BY finished DESC"):
+            walls = runs.setdefault(scenario, [])
+            if len(walls) < recent:
+                walls.append(wall_s)
+        return {scenario: sum(walls) / len(walls) for scenario, walls in runs.items()}
+
+    def builds(self, limit=20):
+        """(binary_hash, git_rev, first seen, legs, passed) per build, newest first."""
+        return self.conn.execute(
+            "SELECT binary_hash, git_rev, MIN(started), COUNT(*), SUM(passed) FROM legs"
+            " GROUP BY binary_hash ORDER BY MAX(started) DESC LIMIT ?", (limit,)).fetchall()
+
+    def trend(self, scenario, name, limit=20):
+        """Per-build mean, min, max and count of one metric over the passing
+        legs, oldest first: a failed leg stops early, so its partial metrics
+        and short wall time would read as drift. `wall_s` is the leg wall
+        time rather than a recorded metric."""
+        if name == "wall_s":
+            sql = ("SELECT binary_hash, git_rev, MIN(started), AVG(wall_s), MIN(wall_s), MAX(wall_s), COUNT(*)"
+                   " FROM legs WHERE scenario = ? AND passed = 1 AND wall_s IS NOT NULL")
+            args = (scenario,)
+        else:
+            sql = ("SELECT l.binary_hash, l.git_rev, MIN(l.started), AVG(m.value), MIN(m.value), MAX(m.value),"
+                   " COUNT(*) FROM legs l JOIN metrics m ON m.leg_id = l.id"
+                   " WHERE l.scenario = ? AND l.passed = 1 AND m.name = ?")
+            args = (scenario, name)
+        rows = self.conn.execute(sql + " GROUP BY binary_hash ORDER BY MIN(started) DESC LIMIT ?",
+                                 args + (limit,)).fetchall()
+        return rows[::-1]
+
+    def reference_value(self, name, host=None, q=0.9, recent=200):
+        """q-quantile of a metric over this host's `recent` latest legs, or
+        None without history: a "how fast does this machine go unloaded"
+        reference for rates such as sitl_pid_hz."""
+        rows = self.conn.execute(
+            "SELECT m.value FROM metrics m JOIN legs l ON m.leg_id = l.id JOIN suites s ON l.suite_id = s.id"
+            " WHERE m.name = ? AND s.host = ? ORDER BY l.started DESC LIMIT ?",
+            (name, host or socket.gethostname(), recent)).fetchall()
+        if not rows:
+            return None
+        values = sorted(v for (v,) in rows)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def series(self):
+        """Every (scenario, metric) pair with data, wall time included."""
+        named = self.conn.execute(
+            "SELECT DISTINCT l.scenario, m.name FROM legs l JOIN metrics m ON m.leg_id = l.id").fetchall()
+        walls = self.conn.execute("SELECT DISTINCT scenario, 'wall_s' FROM legs WHERE wall_s IS NOT NULL").fetchall()
+        return sorted(set(named) | set(walls))
+
+    def drift(self, threshold=0.15, baseline_builds=5):
+        """(scenario, metric, baseline mean, latest, relative change) for every
+        series whose newest build moved more than `threshold` (fractional)
+        from the mean of up to `baseline_builds` builds before it."""
+        out = []
+        for scenario, name in self.series():
+            rows = self.trend(scenario, name, limit=baseline_builds + 1)
+            if len(rows) < 2:
+                continue
+            latest = rows[-1][3]
+            baseline = sum(r[3] for r in rows[:-1]) / (len(rows) - 1)
+            if baseline == 0.0:
+                continue
+            change = (latest - baseline) / abs(baseline)
+            if abs(change) > threshold:
+                out.append((scenario, name, baseline, latest, change))
+        return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default="/tmp/sitl_harness/metrics.sqlite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("builds", help="builds seen, newest first")
+    tr = sub.add_parser("trend", help="one metric across builds")
+    tr.add_argument("scenario")
+    tr.add_argument("metric", help="a recorded metric name, or wall_s for leg wall time")
+    tr.add_argument("--limit", type=int, default=20)
+    dr = sub.add_parser("drift", help="series whose newest build moved beyond a threshold")
+    dr.add_argument("--threshold", type=float, default=0.15, help="fractional change from the baseline mean")
+    dr.add_argument("--baseline", type=int, default=5, help="builds averaged into the baseline")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"no metrics database at {args.db}")
+    db = MetricsDb(args.db)
+    try:
+        if args.cmd == "builds":
+            for h, rev, started, legs, passed in db.builds():
+                print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(started))}  {h[:12]}  "
+                      f"{rev or '-':<24} {passed}/{legs} legs passed")
+        elif args.cmd == "trend":
+            for h, rev, started, mean, lo, hi, n in db.trend(args.scenario, args.metric, args.limit):
+                print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(started))}  {h[:12]}  "
+                      f"{rev or '-':<24} mean {mean:9.3f}  [{lo:.3f}, {hi:.3f}]  n={n}")
+        else:
+            drifted = db.drift(args.threshold, args.baseline)
+            for scenario, name, baseline, latest, change in drifted:
+                print(f"DRIFT {scenario}.{name}: {baseline:.3f} -> {latest:.3f} ({change:+.0%})")
+            if drifted:
+                sys.exit(1)
+            print("no drift beyond threshold")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Repeat statistics for SITL legs (--repeat).
+
+A leg's metrics move from run to run: the feeds are paced by the wall clock,
+so scheduling noise shifts when the FC sees each packet. sitl_harness.py
+--repeat N flies every leg N times and reduces each metric to a mean, a
+spread and a percentile-bootstrap confidence interval; A/B scenarios also
+get a bootstrap interval on the B - A difference of means, and a difference
+whose interval excludes zero is reported as significant.
+
+The resampling is seeded, so the same samples always give the same
+intervals.
+"""
+
+import math
+import random
+
+BOOTSTRAP_ROUNDS = 2000
+CONFIDENCE = 0.95
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+def stdev(values):
+    """Sample standard deviation; 0.0 for fewer than two values."""
+    if len(values) < 2:
+        return 0.0
+    m = mean(values)
+    return math.sqrt(sum((v - m) ** 2 for v in values) / (len(values) - 1))
+
+
+def percentile(ordered, q):
+    """q-quantile of an ascending list, linearly interpolated."""
+    pos = q * (len(ordered) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def bootstrap_ci(values, rounds=BOOTSTRAP_ROUNDS, confidence=CONFIDENCE, seed=0):
+    """(lo, hi) percentile-bootstrap interval of the mean."""
+    rng = random.Random(seed)
+    n = len(values)
+    means = sorted(sum(rng.choices(values, k=n)) / n for _ in range(rounds))
+    tail = (1.0 - confidence) / 2.0
+    return percentile(means, tail), percentile(means, 1.0 - tail)
+
+
+def bootstrap_diff_ci(a, b, rounds=BOOTSTRAP_ROUNDS, confidence=CONFIDENCE, seed=0):
+    """(lo, hi) percentile-bootstrap interval of mean(b) - mean(a), the two
+    samples resampled independently."""
+    rng = random.Random(seed)
+    diffs = sorted(sum(rng.choices(b, k=len(b))) / len(b) - sum(rng.choices(a, k=len(a))) / len(a)
+                   for _ in range(rounds))
+    tail = (1.0 - confidence) / 2.0
+    return percentile(diffs, tail), percentile(diffs, 1.0 - tail)
+
+
+def summarise(values):
+    """n, mean, stdev, min, max and the bootstrap interval of one metric."""
+    lo, hi = bootstrap_ci(values)
+    return {"n": len(values), "mean": mean(values), "stdev": stdev(values),
+            "min": min(values), "max": max(values), "ci_lo": lo, "ci_hi": hi}
+
+
+def collect(runs):
+    """{metric: [value per run]} over a list of metric dicts, keeping the
+    numeric metrics every run recorded."""
+    names = set.intersection(*(set(m) for m in runs)) if runs else set()
+    return {name: [float(m[name]) for m in runs] for name in sorted(names)
+            if all(isinstance(m[name], (int, float)) and not isinstance(m[name], bool) for m in runs)}
+
+
+def compare(runs_a, runs_b):
+    """{metric: A and B summaries plus the B - A difference, its interval and
+    whether that interval excludes zero} over the metrics both sides share."""
+    a, b = collect(runs_a), collect(runs_b)
+    out = {}
+    for name in sorted(set(a) & set(b)):
+        lo, hi = bootstrap_diff_ci(a[name], b[name])
+        out[name] = {"a": summarise(a[name]), "b": summarise(b[name]),
+                     "diff": mean(b[name]) - mean(a[name]), "diff_lo": lo, "diff_hi": hi,
+                     "significant": lo > 0.0 or hi < 0.0}
+    return out
@@ -0,0 +1,96 @@
+"""Bounded-memory trajectory recorder for soak runs.
+
+A normal leg keeps every recorder sample in FdmFeed.history, a list, which
+is fine for the minutes a scenario flies. Under --soak an hours-long flight
+would grow that list (and every snapshot_history() copy of it) without
+bound, so the harness swaps in a SpillHistory instead: the most recent
+samples stay in memory for the trajectory queries, while every sample is
+also packed into fixed-size chunks and written, zlib-compressed, under
+<leg>/history/. Memory use is constant; iter_all() streams the whole flight
+back from disk.
+
+Chunk files hold consecutive (t, east, north, up, ve, vn, vu, heading_deg)
+samples as little-endian doubles.
+"""
+
+import collections
+import glob
+import os
+import struct
+import zlib
+
+SOAK_KEEP = 6000     # in-memory window: 10 min of 10 Hz samples
+SOAK_CHUNK = 3000    # samples per spilled chunk (5 min)
+
+SAMPLE = struct.Struct("<8d")
+
+
+def read_chunk(path):
+    with open(path, "rb") as f:
+        return list(SAMPLE.iter_unpack(zlib.decompress(f.read())))
+
+
+class SpillHistory:
+    """FdmFeed.history replacement: a ring of the `keep` most recent samples
+    plus compressed on-disk chunks of all of them.
+
+    Iterating, len() and indexing see the in-memory window only, so the
+    trajectory queries answer about the recent past; streaming Monitors see
+    every sample as it is recorded."""
+
+    def __init__(self, directory, keep=SOAK_KEEP, chunk=SOAK_CHUNK):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.recent = collections.deque(maxlen=keep)
+        self.chunk = chunk
+        self.pending = bytearray()
+        self.pending_count = 0
+        self.chunks = 0
+        self.total = 0
+        self.closed = False
+
+    def append(self, sample):
+        self.recent.append(sample)
+        if self.closed:
+            return
+        self.pending += SAMPLE.pack(*sample)
+        self.pending_count += 1
+        self.total += 1
+        if self.pending_count >= self.chunk:
+            self.spill()
+
+    def spill(self):
+        """Write the pending samples as the next chunk."""
+        if not self.pending_count:
+            return
+        path = os.path.join(self.directory, f"chunk-{self.chunks:05d}.z")
+        with open(path + ".part", "wb") as f:
+            f.write(zlib.compress(bytes(self.pending), 1))
+        os.replace(path + ".part", path)
+        self.chunks += 1
+        self.pending = bytearray()
+        self.pending_count = 0
+
+    def iter_all(self):
+        """Every sample recorded, oldest first, one chunk in memory at a time."""
+        for path in sorted(glob.glob(os.path.join(self.directory, "chunk-*.z"))):
+            yield from read_chunk(path)
+        yield from SAMPLE.iter_unpack(bytes(self.pending))
+
+    def clear(self):
+        """Start over (a chained leg's plant reset): the in-memory window is
+        dropped; chunks already on disk stay with the leg that wrote them."""
+        self.recent.clear()
+
+    def close(self):
+        self.spill()
+        self.closed = True
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __getitem__(self, index):
+        return self.recent[index]
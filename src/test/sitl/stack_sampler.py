@@ -0,0 +1,127 @@
+"""Sampling profiler for the harness's own threads (--profile).
+
+A daemon thread wakes `hz` times a second, takes every other thread's
+current frame from sys._current_frames() and counts the stack, root first,
+under the thread's label: the feed class for Thread subclasses (RcFeed,
+FdmFeed, MotorFeed, StatusPoller, ...), else the thread name (MainThread
+runs the scenario body). Nothing is traced between samples, so the
+profiled threads run at full speed; the cost is one stack walk per thread
+per sample, under the GIL.
+
+Samples count wall time: a feed sleeping between ticks shows up in
+time.sleep. Each thread's CPU time, read from /proc/self/task/<tid>/stat
+(utime + stime, in clock ticks), says how much of that it actually ran. A
+thread that has exited just has no stat file, where its pthread CPU clock
+id would be a dangling handle.
+
+Outputs:
+  collapsed stacks, one "thread;outer;...;inner count" line per distinct
+  stack (flamegraph.pl, inferno, speedscope)
+  per-thread summary: samples, CPU seconds and CPU share of the wall time
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_HZ = 100.0
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def thread_label(thread):
+    if type(thread).__module__ == "threading":
+        return thread.name
+    return type(thread).__name__
+
+
+def thread_cpu_s(tid):
+    """CPU seconds (user + system) the thread `tid` of this process has run."""
+    with open(f"/proc/self/task/{tid}/stat") as f:
+        stat = f.read()
+    # comm, in parentheses, may hold spaces; utime and stime are fields 14
+    # and 15, the 12th and 13th after it
+    fields = stat[stat.rindex(")") + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, hz=DEFAULT_HZ, cpu_every=10):
+        super().__init__(daemon=True, name="StackSampler")
+        self.interval = 1.0 / hz
+        self.cpu_every = cpu_every   # samples between reads of the threads' CPU clocks
+        self.stacks = collections.Counter()
+        self.samples = collections.Counter()
+        self.cpu = {}                # native thread id -> [label, first, last] CPU seconds
+        self.running = True
+        self.t_start = self.t_stop = None
+
+    def _read_cpu(self, threads):
+        for thread in threads.values():
+            tid = thread.native_id
+            try:
+                t = thread_cpu_s(tid)
+            except (OSError, ValueError, IndexError):
+                continue   # exited meanwhile, or no /proc on this platform
+            entry = self.cpu.setdefault(tid, [thread_label(thread), t, t])
+            entry[2] = t
+
+    def run(self):
+        own = threading.get_ident()
+        self.t_start = time.monotonic()
+        tick = 0
+        while self.running:
+            threads = {t.ident: t for t in threading.enumerate() if t.ident != own}
+            for ident, frame in sys._current_frames().items():
+                thread = threads.get(ident)
+                if thread is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                label = thread_label(thread)
+                stack.append(label)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples[label] += 1
+            if tick % self.cpu_every == 0:
+                self._read_cpu(threads)
+            tick += 1
+            time.sleep(self.interval)
+        self._read_cpu({t.ident: t for t in threading.enumerate() if t.ident != own})
+        self.t_stop = time.monotonic()
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=2.0)
+
+    def wall_s(self):
+        if self.t_start is None:
+            return 0.0
+        return (self.t_stop or time.monotonic()) - self.t_start
+
+    def summary(self):
+        """{thread label: samples, cpu_s and cpu_pct of the profiled wall time}."""
+        wall = max(1e-9, self.wall_s())
+        cpu = collections.Counter()
+        for label, first, last in self.cpu.values():
+            cpu[label] += last - first
+        return {label: {"samples": self.samples[label], "cpu_s": round(cpu[label], 4),
+                        "cpu_pct": round(100.0 * cpu[label] / wall, 2)}
+                for label in sorted(set(self.samples) | set(cpu))}
+
+    def write(self, folded_path, summary_path):
+        with open(folded_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(summary_path, "w") as f:
+            json.dump({"wall_s": round(self.wall_s(), 3),
+                       "hz": round(1.0 / self.interval, 1), "threads": self.summary()},
+                      f, indent=1, sort_keys=True)
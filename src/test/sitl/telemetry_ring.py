@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Shared-memory ground-truth telemetry ring for local SITL consumers.
+
+The harness's FdmFeed writes one fixed-layout sample per plant tick into an
+mmap'd ring file (<leg>/telemetry.ring with --telemetry-ring). Any number of
+local visualisers, recorders and dashboards can map the same file and read
+the stream without parsing, without competing for a UDP port and without
+silent drops: a reader that keeps within `capacity` samples of the writer
+sees every one, and one that falls further behind is told how many it lost.
+
+Single writer, lock-free readers. Each slot carries its sample number; the
+writer invalidates the slot, fills it, then publishes the number, and a
+reader re-checks the number after unpacking, so a slot overwritten mid-read
+is reported as lost rather than returned torn.
+
+Usage (tail a live leg):
+  telemetry_ring.py /tmp/sitl_harness/mission_flight/run/telemetry.ring
+"""
+
+import collections
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+RING_MAGIC = b"SITLRING"
+RING_VERSION = 1
+RING_CAPACITY = 4096   # ~80 s of 50 Hz samples
+
+# magic, samples written so far, version, slot size, capacity, session id
+# (the UDP feed's "sid")
+HEADER = struct.Struct("<8sQIII8s")
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 8
+# Sequence words are read and written in native layout: at their 8-byte
+# aligned offsets that is a single store, where the "<" codes pack byte by
+# byte and a reader could catch a half-written number.
+SEQ = struct.Struct("Q")
+DEG = 180.0 / math.pi
+
+# sample number, t, pos ENU m, vel ENU m/s, att deg (roll, pitch nose-up,
+# heading), rates deg/s (same signs), motors, lat, lon, alt m MSL, flags, pad,
+# active box-ID bitmask (msp_box.c permanent IDs)
+SAMPLE = struct.Struct("<Qd3d3d3d3d4d3dIIQ")
+
+FLAG_GPS_VALID = 1 << 0
+FLAG_ARMED = 1 << 1
+FLAG_STATUS_KNOWN = 1 << 2   # armed/modes come from a live StatusPoller
+
+TelemetrySample = collections.namedtuple(
+    "TelemetrySample", "seq t pos vel att rates motors lat lon alt gps armed modes"
+)
+
+
+class TelemetryRing:
+    """Writer side: created by the harness, one per leg."""
+
+    def __init__(self, path, sid, capacity=RING_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * SAMPLE.size
+        with open(path, "w+b") as f:
+            f.truncate(size)
+            self.mm = mmap.mmap(f.fileno(), size)
+        HEADER.pack_into(self.mm, 0, RING_MAGIC, 0, RING_VERSION, SAMPLE.size, capacity,
+                         sid.encode()[:8].ljust(8, b"\0"))
+        self.seq = 0
+
+    def write(self, t, model, motors, lat, lon, alt, gps_valid, armed, mode_mask):
+        """Append one sample. `armed` is None while no status is known."""
+        self.seq += 1
+        off = HEADER_SIZE + ((self.seq - 1) % self.capacity) * SAMPLE.size
+        mm, pos, vel, rates = self.mm, model.pos, model.vel, model.rates
+        flags = FLAG_GPS_VALID if gps_valid else 0
+        if armed is not None:
+            flags |= FLAG_STATUS_KNOWN | (FLAG_ARMED if armed else 0)
+        SEQ.pack_into(mm, off, 0)   # invalidate while the slot is rewritten
+        # display conventions, matching the UDP JSON feed: pitch nose-up
+        # positive, heading 0-360
+        SAMPLE.pack_into(
+            mm, off,
+            0, t,
+            pos[0], pos[1], pos[2],
+            vel[0], vel[1], vel[2],
+            model.roll * DEG, -model.pitch * DEG, (model.yaw * DEG) % 360.0,
+            rates[0] * DEG, -rates[1] * DEG, rates[2] * DEG,
+            motors[0], motors[1], motors[2], motors[3],
+            lat, lon, alt,
+            flags, 0, mode_mask,
+        )
+        SEQ.pack_into(mm, off, self.seq)
+        SEQ.pack_into(mm, WRITE_SEQ_OFFSET, self.seq)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+class RingReader:
+    """Reader side: map a ring file and consume samples as they arrive.
+
+    Starts at the oldest sample still in the ring; `lost` counts samples that
+    were overwritten before this reader got to them."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, written, version, slot, capacity, sid = HEADER.unpack_from(self.mm, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or slot != SAMPLE.size:
+            self.mm.close()
+            raise ValueError(f"not a v{RING_VERSION} telemetry ring: {path}")
+        self.capacity = capacity
+        self.sid = sid.rstrip(b"\0").decode()
+        self.next_seq = max(1, written - capacity + 1)
+        self.lost = 0
+
+    def written(self):
+        return SEQ.unpack_from(self.mm, WRITE_SEQ_OFFSET)[0]
+
+    def _slot(self, seq):
+        off = HEADER_SIZE + ((seq - 1) % self.capacity) * SAMPLE.size
+        if SEQ.unpack_from(self.mm, off)[0] != seq:
+            return None
+        v = SAMPLE.unpack_from(self.mm, off)
+        if SEQ.unpack_from(self.mm, off)[0] != seq:
+            return None   # overwritten while we read it
+        flags = v[21]
+        known = bool(flags & FLAG_STATUS_KNOWN)
+        return TelemetrySample(
+            seq=seq, t=v[1], pos=v[2:5], vel=v[5:8], att=v[8:11], rates=v[11:14],
+            motors=v[14:18], lat=v[18], lon=v[19], alt=v[20],
+            gps=bool(flags & FLAG_GPS_VALID),
+            armed=bool(flags & FLAG_ARMED) if known else None,
+            modes=[b for b in range(64) if v[23] >> b & 1] if known else [],
+        )
+
+    def read_new(self):
+        """Every sample published since the last call, oldest first."""
+        written = self.written()
+        if written - self.next_seq + 1 > self.capacity:
+            skip = written - self.capacity + 1
+            self.lost += skip - self.next_seq
+            self.next_seq = skip
+        out = []
+        while self.next_seq <= written:
+            s = self._slot(self.next_seq)
+            if s is None:
+                self.lost += 1
+            else:
+                out.append(s)
+            self.next_seq += 1
+        return out
+
+    def latest(self):
+        """The newest sample, or None before the first write."""
+        written = self.written()
+        return self._slot(written) if written else None
+
+    def close(self):
+        self.mm.close()
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    while not os.path.exists(sys.argv[1]):
+        time.sleep(0.2)
+    reader = RingReader(sys.argv[1])
+    print(f"session {reader.sid}, capacity {reader.capacity}")
+    try:
+        while True:
+            for s in reader.read_new():
+                print(f"t={s.t:7.2f} pos=({s.pos[0]:7.1f},{s.pos[1]:7.1f},{s.pos[2]:6.1f}) "
+                      f"hdg={s.att[2]:5.1f} armed={s.armed} lost={reader.lost}")
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Packet capture files: written and read back without a SITL."""
+
+import struct
+
+import sitl_harness as harness
+
+
+def test_records_round_trip_past_64k(tmp_path):
+    path = str(tmp_path / "packets.cap")
+    cap = harness.PacketCapture(path, cap=0)
+    big = bytes(range(256)) * 300   # 76800 bytes: one MSP write of many frames
+    cap.record(harness.CAP_MSP_TX, big)
+    cap.record(harness.CAP_RC, b"\x01\x02")
+    cap.close()
+    assert [(kind, payload) for _t, kind, payload in harness.read_capture(path)] == \
+        [(harness.CAP_MSP_TX, big), (harness.CAP_RC, b"\x01\x02")]
+
+
+def test_v1_captures_still_read(tmp_path):
+    path = tmp_path / "old.cap"
+    path.write_bytes(b"SITLCAP\x01" + struct.pack("<dBH", 1.5, harness.CAP_FDM, 3) + b"abc")
+    assert list(harness.read_capture(str(path))) == [(1.5, harness.CAP_FDM, b"abc")]
+
+
+def test_capture_keeps_its_head_under_the_cap(tmp_path):
+    path = str(tmp_path / "packets.cap")
+    cap = harness.PacketCapture(path, cap=len(harness.CAP_MAGIC) + 3 * (harness.CAP_RECORD.size + 4))
+    for i in range(5):
+        cap.record(harness.CAP_RC, bytes([i]) * 4)
+    cap.close()
+    assert [payload[0] for _t, _kind, payload in harness.read_capture(path)] == [0, 1, 2]
+    assert cap.dropped == 2
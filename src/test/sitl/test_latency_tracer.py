@@ -0,0 +1,51 @@
+"""LatencyTracer bookkeeping, driven with made-up send and receive times."""
+
+import pytest
+
+import sitl_harness as harness
+
+
+def edge_ms(latency_us):
+    """Upper edge, in ms, of the histogram bucket holding latency_us."""
+    tracer = harness.LatencyTracer()
+    tracer.sent(1, 0.0)
+    tracer.received(latency_us / 1e6)
+    return tracer.summary()["servo_latency_p50_ms"]
+
+
+def test_drops_duplicates_latency_and_loop_ticks():
+    buf = bytearray(b"\xaa" * (harness.TRACE_SIZE + 16))
+    tracer = harness.LatencyTracer(buf, offset=8)   # a block inside plant.shm
+    tracer.received(0.0)          # SITL's start-up motor update: answers nothing
+    tracer.sent(1, 1.000)
+    tracer.received(1.001)        # 1 ms
+    tracer.received(1.002)        # a second answer to frame 1
+    tracer.tick()                 # the plant steps with frame 1's response
+    tracer.sent(2, 1.010)
+    tracer.sent(3, 1.020)         # frame 2 superseded unanswered
+    tracer.received(1.025)        # 5 ms
+    tracer.sent(4, 1.030)
+    tracer.tick()                 # frame 3's response, one frame later
+    out = tracer.summary()
+    assert {k: out[k] for k in ("fdm_frames", "servo_frames", "servo_dropped", "servo_duplicated")} == \
+        {"fdm_frames": 4, "servo_frames": 4, "servo_dropped": 1, "servo_duplicated": 1}
+    assert out["servo_latency_p50_ms"] == edge_ms(1000.0) == pytest.approx(1.0, rel=0.09)
+    assert out["servo_latency_p90_ms"] == edge_ms(5000.0) == pytest.approx(5.0, rel=0.09)
+    assert out["servo_latency_max_ms"] == pytest.approx(5.0, abs=0.002)
+    assert (out["loop_ticks_p50"], out["loop_ticks_max"]) == (1, 2)
+    assert buf[:8] == buf[-8:] == b"\xaa" * 8   # nothing written outside the block
+
+
+def test_latency_histogram_clamps_at_both_ends():
+    assert edge_ms(0.0) == edge_ms(harness.TRACE_BASE_US)
+    top = harness.TRACE_BASE_US * 2.0 ** (harness.TRACE_LAT_BUCKETS / 8.0) / 1000.0
+    assert edge_ms(10e6) == pytest.approx(top)
+
+
+def test_reset_and_empty_summary():
+    tracer = harness.LatencyTracer()
+    tracer.sent(1, 0.0)
+    tracer.received(0.001)
+    tracer.tick()
+    tracer.reset()
+    assert tracer.summary() == {"fdm_frames": 0, "servo_frames": 0, "servo_dropped": 0, "servo_duplicated": 0}
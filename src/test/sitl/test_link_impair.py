@@ -0,0 +1,62 @@
+"""ImpairedLink on a recording stand-in socket."""
+
+import time
+
+import pytest
+
+import link_impair
+
+
+class Recorder:
+    def __init__(self):
+        self.got = []
+
+    def sendto(self, payload, addr):
+        self.got.append(payload)
+
+
+def delivered(spec, count=2000):
+    sock = Recorder()
+    link = link_impair.ImpairedLink(sock, spec)
+    for i in range(count):
+        link.sendto(i.to_bytes(4, "little"), ("127.0.0.1", 9004))
+    return [int.from_bytes(p, "little") for p in sock.got], link.stats()
+
+
+def test_same_seed_drops_the_same_datagrams():
+    first, stats = delivered("loss=0.1,burst=0.01,burst_len=10,seed=7")
+    assert delivered("loss=0.1,burst=0.01,burst_len=10,seed=7")[0] == first
+    assert delivered("loss=0.1,burst=0.01,burst_len=10,seed=8")[0] != first
+    assert stats["sent"] == 2000 and stats["lost"] + stats["delivered"] == 2000
+    assert 0.1 < stats["lost"] / stats["sent"] < 0.35
+
+
+def test_bursts_lose_runs_of_datagrams():
+    got, _ = delivered("burst=0.02,burst_len=20")
+    gaps = [b - a - 1 for a, b in zip(got, got[1:]) if b - a > 1]
+    assert gaps and sum(gaps) / len(gaps) > 5
+
+
+def test_jitter_keeps_order_unless_reorder_is_set():
+    def run(spec):
+        sock = Recorder()
+        link = link_impair.ImpairedLink(sock, spec)
+        buf = bytearray(1)
+        for i in range(50):
+            buf[0] = i          # the feeds reuse one buffer
+            link.sendto(buf, None)
+        time.sleep(0.15)
+        link.close()
+        return [p[0] for p in sock.got], link.stats()
+
+    fifo, stats = run("delay=5,jitter=30")
+    assert fifo == list(range(50)) and stats["reordered"] == 0
+    mixed, stats = run("delay=5,jitter=30,reorder=1")
+    assert sorted(mixed) == list(range(50)) and mixed != fifo
+    assert stats["reordered"] > 0
+
+
+@pytest.mark.parametrize("spec", ["loss=1.5", "lag=3", "delay=-1", "burst_len=0.5", "jitter"])
+def test_bad_specs_are_refused(spec):
+    with pytest.raises(ValueError):
+        link_impair.parse_spec(spec)
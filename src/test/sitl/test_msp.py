@@ -0,0 +1,195 @@
+"""Msp client against a fake FC on a socketpair: no SITL binary needed."""
+
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import sitl_harness as harness
+
+ECHO = 200   # the fake FC answers this v1 command with the request's payload
+
+
+def reply_frame(cmd, payload, corrupt=False):
+    if cmd > 0xFF:
+        head = struct.pack("<BHH", 0, cmd, len(payload))
+        check = harness.crc8_dvb_s2(head + payload)
+        frame = b"$X>" + head + payload
+    else:
+        body = struct.pack("<BB", len(payload), cmd) + payload
+        check = 0
+        for b in body:
+            check ^= b
+        frame = b"$M>" + body
+    return frame + bytes([check ^ 0xFF if corrupt else check])
+
+
+class FakeFc(threading.Thread):
+    """Parses request frames and answers through `handler(cmd, payload)`,
+    which returns reply frames (b"" for none), or (delay_s, frames) to
+    answer late."""
+
+    def __init__(self, sock, handler):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.handler = handler
+
+    def run(self):
+        buf = b""
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buf += data
+            while True:
+                if buf[:3] == b"$M<" and len(buf) >= 6 and len(buf) >= 6 + buf[3]:
+                    cmd, payload, buf = buf[4], buf[5:5 + buf[3]], buf[6 + buf[3]:]
+                elif buf[:3] == b"$X<" and len(buf) >= 9:
+                    cmd, size = struct.unpack_from("<HH", buf, 4)
+                    if len(buf) < 9 + size:
+                        break
+                    payload, buf = buf[8:8 + size], buf[9 + size:]
+                else:
+                    break
+                out = self.handler(cmd, payload)
+                if isinstance(out, tuple):
+                    threading.Timer(out[0], self.sock.sendall, (out[1],)).start()
+                elif out:
+                    self.sock.sendall(out)
+
+
+@pytest.fixture
+def fc(monkeypatch):
+    """fc(handler) -> an Msp talking to a FakeFc running `handler`."""
+    monkeypatch.setattr(harness, "MSP_REPLY_GRACE_S", 0.3)
+    socks = []
+
+    def start(handler):
+        a, b = socket.socketpair()
+        socks.extend((a, b))
+        FakeFc(b, handler).start()
+        return harness.Msp(a)
+
+    yield start
+    for sock in socks:
+        sock.close()
+
+
+def test_lost_reply_costs_a_bounded_number_of_requests(fc):
+    seen = [0]
+
+    def handler(cmd, payload):
+        seen[0] += 1
+        return b"" if seen[0] == 1 else reply_frame(cmd, payload)
+
+    msp = fc(handler)
+    results = []
+    for i in range(15):
+        try:
+            results.append(msp.request(ECHO, bytes([i]), timeout=0.25) == bytes([i]))
+        except TimeoutError:
+            results.append(None)
+        time.sleep(0.1)
+    assert False not in results        # never another request's reply
+    assert results.count(None) <= 3    # the lost one, then the grace period
+    assert all(results[-5:])
+
+
+def test_late_reply_goes_to_the_request_that_timed_out(fc):
+    seen = [0]
+
+    def handler(cmd, payload):
+        seen[0] += 1
+        return (0.35, reply_frame(cmd, payload)) if seen[0] == 1 else reply_frame(cmd, payload)
+
+    msp = fc(handler)
+    with pytest.raises(TimeoutError):
+        msp.request(ECHO, b"\x01", timeout=0.25)
+    assert msp.request(ECHO, b"\x02", timeout=1.0) == b"\x02"
+
+
+@pytest.mark.parametrize("cmd", [ECHO, harness.MSP2_CLI_COMMAND])
+def test_corrupt_reply_is_dropped(fc, cmd):
+    seen = [0]
+
+    def handler(cmd, payload):
+        seen[0] += 1
+        return reply_frame(cmd, payload, corrupt=seen[0] == 1)
+
+    msp = fc(handler)
+    with pytest.raises(TimeoutError):
+        msp.request(cmd, b"\x07", timeout=0.2)
+    assert msp.bad_frames == 1
+    time.sleep(0.35)
+    assert msp.request(cmd, b"\x08", timeout=1.0) == b"\x08"
+
+
+def test_batch_rejects_a_repeated_command(fc):
+    msp = fc(reply_frame)
+    assert msp.batch([harness.MSP_STATUS, ECHO]) == [b"", b""]
+    with pytest.raises(ValueError):
+        msp.batch([ECHO, ECHO])
+
+
+def cli_handler(outputs, window=16):
+    """A CLI with the FC's single paging session: a page request for any
+    command but the last one run is refused."""
+    session = {}
+
+    def handler(cmd, payload):
+        line, _, offset = payload.partition(b"\0")
+        if offset:
+            off = struct.unpack("<H", offset)[0]
+            if session.get("line") != line:
+                return reply_frame(cmd, struct.pack("<HB", 0, harness.MSP2_CLI_COMMAND_FLAG_REFUSED))
+        else:
+            session["line"], off = line, 0
+        text = outputs[line.decode()]
+        return reply_frame(cmd, struct.pack("<HB", len(text), 0) + text[off:off + window])
+
+    return handler
+
+
+def test_cli_pages_are_fetched_before_the_next_command(fc):
+    outputs = {"diff all": b"set a = 1\nset b = 2\nset c = 3\n" * 4, "tasks": b"PID 8000 Hz\n" * 5}
+    msp = fc(cli_handler(outputs))
+    assert msp.cli_commands(["diff all", "tasks"]) == [v.decode() for v in outputs.values()]
+    texts = {}
+    threads = [threading.Thread(target=lambda k=k: texts.setdefault(k, msp.cli_command(k))) for k in outputs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert texts == {k: v.decode() for k, v in outputs.items()}
+
+
+def test_cli_refused_page_raises(fc):
+    handler = cli_handler({"diff all": b"x" * 40})
+
+    def refuse_pages(cmd, payload):
+        if b"\0" in payload:
+            return reply_frame(cmd, struct.pack("<HB", 40, harness.MSP2_CLI_COMMAND_FLAG_REFUSED))
+        return handler(cmd, payload)
+
+    msp = fc(refuse_pages)
+    with pytest.raises(RuntimeError, match="paging session"):
+        msp.cli_command("diff all")
+
+
+def test_task_sampler_skips_while_another_cli_session_pages(fc):
+    calls = []
+    handler = cli_handler({"tasks": b"Task list\n"})
+    msp = fc(lambda cmd, payload: calls.append(payload) or handler(cmd, payload))
+    sampler = harness.TaskSampler(type("Sitl", (), {"msp": msp})(), None, None)
+    with msp.cli_lock:
+        held = threading.Thread(target=lambda: calls.append(sampler._poll()))
+        held.start()
+        held.join()
+    assert calls == [({}, None)]   # nothing sent while the lock was held
+    sampler._poll()
+    assert calls[1:] == [b"tasks"]
@@ -0,0 +1,44 @@
+"""plant.shm readers, both sides in this process."""
+
+import pytest
+
+import plant_shm
+
+
+@pytest.fixture
+def shm(tmp_path):
+    block = plant_shm.PlantShm(str(tmp_path / "plant.shm"), create=True, capacity=4)
+    yield block
+    block.close()
+
+
+def test_motors_round_trip_and_attach(shm):
+    shm.publish_motors(7, (0.1, 0.2, 0.3, 0.4))
+    other = plant_shm.PlantShm(shm.path)
+    try:
+        assert other.read_motors() == (7, (0.1, 0.2, 0.3, 0.4))
+    finally:
+        other.close()
+
+
+def test_read_raises_when_the_writer_died_mid_update(shm, monkeypatch):
+    monkeypatch.setattr(plant_shm, "STALE_WRITE_S", 0.05)
+    shm.publish_motors(1, (0.0, 0.0, 0.0, 0.0))
+    plant_shm.U64.pack_into(shm.mm, plant_shm.MOTORS_SEQ_OFFSET, 3)   # odd: a publish that never finished
+    with pytest.raises(RuntimeError, match="mid-update"):
+        shm.read_motors()
+
+
+def test_history_ring_counts_overwritten_samples(shm):
+    for i in range(6):
+        shm.append_history((float(i),) * 8, gen=1)
+    samples, next_seq, lost = shm.read_history(1)
+    assert lost == 2 and next_seq == 7
+    assert [s[1][0] for s in samples] == [2.0, 3.0, 4.0, 5.0]
+    assert shm.read_history(next_seq) == ([], 7, 0)
+
+
+def test_wrong_version_is_refused(shm):
+    plant_shm.U32.pack_into(shm.mm, plant_shm.VERSION_OFFSET, plant_shm.PLANT_VERSION - 1)
+    with pytest.raises(ValueError):
+        plant_shm.PlantShm(shm.path)
@@ -0,0 +1,21 @@
+"""Soak rollups over synthetic recorder samples."""
+
+import json
+
+import sitl_harness as harness
+
+
+def test_alt_std_is_spread_about_the_window_mean(tmp_path, monkeypatch):
+    metrics = {}
+    monkeypatch.setattr(harness, "metric", lambda name, value: metrics.__setitem__(name, value))
+    path = tmp_path / "rollups.jsonl"
+    rollups = harness.Rollups(str(path), window_s=10.0)
+    # a steady 2 m offset from a 10 m target in the first window, +-1 m in the second
+    for i in range(20):
+        up = 12.0 if i < 10 else 10.0 + (1.0 if i % 2 else -1.0)
+        rollups.update((float(i), 3.0, 4.0, up, 0.0, 0.0, 0.0, 0.0))
+    rollups.summarise()
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["alt_mean_m"], r["alt_std_m"]) for r in rows] == [(12.0, 0.0), (10.0, 1.0)]
+    assert rows[0]["hold_rms_m"] == 0.0 and rows[0]["dist_home_max_m"] == 5.0
+    assert metrics["soak_windows"] == 2 and metrics["soak_alt_std_m_worst"] == 1.0
@@ -0,0 +1,37 @@
+"""The harness's SCENARIOS as parametrised tests; fixtures in conftest.py."""
+
+import json
+import os
+
+import pytest
+
+import sitl_harness as harness
+
+
+def leg_errors(scenario_dir):
+    """"leg: error" for each failed leg of a scenario, from its metrics.json."""
+    errors = []
+    for entry in sorted(os.listdir(scenario_dir)):
+        path = os.path.join(scenario_dir, entry, "metrics.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                record = json.load(f)
+            if not record.get("passed"):
+                errors.append(f"{entry}: {record.get('error')}")
+    return errors
+
+
+@pytest.mark.parametrize("name", list(harness.SCENARIOS))
+def test_scenario(name, sitl_binary, sitl_binary_b, sitl_workdir, sitl_chain, sitl_host_lock):
+    ok = harness.run_scenario(name, sitl_binary, sitl_workdir, sitl_binary_b, chain=sitl_chain)
+    if ok is None:
+        pytest.skip("A/B scenario without --sitl-binary-b, or without the --sitl-repeat its check needs")
+    scenario_dir = os.path.join(sitl_workdir, name)
+    assert ok, "; ".join(leg_errors(scenario_dir)) or f"failed (see {scenario_dir})"
+
+
+def test_rig_fixtures(sitl, rc, fdm):
+    """The fixtures stand in for a scenario body's arguments."""
+    harness.boot_and_engage(sitl, rc, fdm)
+    assert harness.BOX_ARM in sitl.modes()
+    assert fdm.max_altitude() > 1.0
@@ -0,0 +1,64 @@
+"""sitl_dist helpers that need neither a network nor a SITL binary."""
+
+import io
+import tarfile
+
+import pytest
+
+import sitl_dist
+
+
+def archive(tmp_path, *members):
+    """A result archive holding `members`, (name, tarfile type) pairs."""
+    path = tmp_path / "result.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        for name, kind in members:
+            info = tarfile.TarInfo(name)
+            info.type = kind
+            if kind == tarfile.SYMTYPE:
+                info.linkname = "/etc/passwd"
+            data = b"{}" if kind == tarfile.REGTYPE else b""
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_checked_members_accepts_a_leg_tree(tmp_path):
+    path = archive(tmp_path, ("run", tarfile.DIRTYPE), ("run/metrics.json", tarfile.REGTYPE))
+    with tarfile.open(path, "r:gz") as tar:
+        assert [m.name for m in sitl_dist.checked_members(tar)] == ["run", "run/metrics.json"]
+    sitl_dist.unpack_dir(path, str(tmp_path / "out"))
+    assert (tmp_path / "out" / "run" / "metrics.json").read_bytes() == b"{}"
+
+
+@pytest.mark.parametrize("name, kind", [
+    ("/etc/cron.d/x", tarfile.REGTYPE),
+    ("run/../../escape", tarfile.REGTYPE),
+    ("run\\..\\escape", tarfile.REGTYPE),
+    ("run/link", tarfile.SYMTYPE),
+    ("run/fifo", tarfile.FIFOTYPE),
+])
+def test_checked_members_refuses_unsafe_entries(tmp_path, name, kind):
+    path = archive(tmp_path, ("run/metrics.json", tarfile.REGTYPE), (name, kind))
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "kept").write_text("previous result")
+    with pytest.raises(tarfile.TarError):
+        sitl_dist.unpack_dir(path, str(out))
+    assert (out / "kept").exists()   # refused before anything was cleared
+
+
+def test_lpt_order_starts_the_longest_and_unknown_scenarios_first():
+    jobs = [{"scenario": name} for name in ("hover", "mission_flight", "new_scenario", "rth")]
+    estimates = {"hover": 30.0, "mission_flight": 240.0, "rth": 90.0}
+    assert [j["scenario"] for j in sitl_dist.lpt_order(jobs, estimates)] == \
+        ["mission_flight", "new_scenario", "rth", "hover"]
+    assert [j["scenario"] for j in sitl_dist.lpt_order(jobs, estimates, default=0.0)] == \
+        ["mission_flight", "rth", "hover", "new_scenario"]
+    assert sitl_dist.lpt_order(jobs, {}) == jobs   # no history: submission order
+
+
+def test_lpt_makespan():
+    assert sitl_dist.lpt_makespan([240.0, 90.0, 60.0, 30.0], 2) == 240.0
+    assert sitl_dist.lpt_makespan([30.0, 60.0, 90.0, 240.0], 2) == 300.0
+    assert sitl_dist.lpt_makespan([5.0, 5.0], 0) == 10.0
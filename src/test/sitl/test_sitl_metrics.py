@@ -0,0 +1,27 @@
+"""MetricsDb on an in-memory database."""
+
+import sitl_metrics
+from sitl_metrics import MetricsDb
+
+
+def test_scenario_durations_are_per_run():
+    db = MetricsDb(":memory:")
+    suite = db.begin_suite()
+    db.record_scenario(suite, "mission_flight", 100.0, True)
+    db.record_scenario(suite, "mission_flight", 330.0, True, runs=3)   # --repeat 3
+    db.record_scenario(suite, "mission_flight", 5.0, False)           # failed early: left out
+    assert db.scenario_durations() == {"mission_flight": 105.0}
+
+
+
+def test_legs_are_keyed_by_the_hash_they_carry(tmp_path):
+    db = MetricsDb(":memory:")
+    suite = db.begin_suite()
+    leg = {"scenario": "mission_flight", "binary": "/worker/only/path", "binary_sha256": "ab12",
+           "started": 1.0, "wall_s": 9.0, "passed": True, "metrics": {"max_alt_m": 12.5}}
+    db.record_leg(suite, leg)                    # the path does not exist here
+    binary = tmp_path / "sitl"
+    binary.write_bytes(b"elf")
+    db.record_leg(suite, {"scenario": "mission_flight", "binary": str(binary), "started": 2.0, "passed": True})
+    assert [row[0] for row in db.builds()] == [sitl_metrics.binary_hash(str(binary)), "ab12"]
+    assert db.trend("mission_flight", "max_alt_m")[0][0] == "ab12"
@@ -0,0 +1,53 @@
+"""Repeat statistics and the A/B verdict built on them."""
+
+import json
+
+import pytest
+
+import sitl_harness as harness
+import sitl_stats
+
+
+def test_bootstrap_ci_is_seeded_and_brackets_the_mean():
+    values = [9.8, 10.4, 10.1, 9.6, 10.3, 10.0, 9.9, 10.2]
+    lo, hi = sitl_stats.bootstrap_ci(values)
+    assert lo < sitl_stats.mean(values) < hi
+    assert (lo, hi) == sitl_stats.bootstrap_ci(values)
+    assert (lo, hi) != sitl_stats.bootstrap_ci(values, seed=1)
+    narrow = sitl_stats.bootstrap_ci(values, confidence=0.5)
+    assert lo < narrow[0] < narrow[1] < hi
+    assert sitl_stats.bootstrap_ci([3.0] * 5) == (3.0, 3.0)
+
+
+def test_summarise_and_collect():
+    s = sitl_stats.summarise([1.0, 2.0, 3.0])
+    assert (s["n"], s["mean"], s["stdev"], s["min"], s["max"]) == (3, 2.0, 1.0, 1.0, 3.0)
+    assert sitl_stats.stdev([4.0]) == 0.0
+    runs = [{"alt": 1, "ok": True, "mode": "x", "only_here": 2.0}, {"alt": 2.5, "ok": False, "mode": "y"}]
+    assert sitl_stats.collect(runs) == {"alt": [1.0, 2.5]}
+    assert sitl_stats.collect([]) == {}
+
+
+def test_compare_flags_only_a_difference_that_excludes_zero():
+    a = [{"td_dist": v, "noise": n} for v, n in zip([5.0, 5.4, 4.8, 5.1, 5.2, 4.9], [1, 3, 2, 1, 3, 2])]
+    b = [{"td_dist": v, "noise": n} for v, n in zip([2.1, 2.4, 1.9, 2.2, 2.0, 2.3], [2, 1, 3, 3, 1, 2])]
+    out = sitl_stats.compare(a, b)
+    assert set(out) == {"td_dist", "noise"}
+    td = out["td_dist"]
+    assert td["diff"] == pytest.approx(2.15 - 30.4 / 6)
+    assert td["diff_lo"] < td["diff"] < td["diff_hi"] < 0.0 and td["significant"]
+    assert out["noise"]["diff_lo"] < 0.0 < out["noise"]["diff_hi"] and not out["noise"]["significant"]
+
+
+def test_expect_fails_the_verdict_when_the_interval_includes_zero(tmp_path):
+    seen = []
+    opts = {"compare": lambda a, b: seen.append((a, b)), "expect": {"td_dist": "lower"}}
+    better = {"A": [{"td_dist": v} for v in (5.0, 5.3, 4.9, 5.1)], "B": [{"td_dist": v} for v in (2.0, 2.2, 1.9, 2.1)]}
+    harness.judge_ab_repeats("rescue_ab", opts, str(tmp_path), better)
+    assert seen[0][1]["td_dist"] == pytest.approx(2.05)
+    assert json.loads((tmp_path / "repeat.json").read_text())["runs"] == 4
+    same = {"A": better["A"], "B": [{"td_dist": v} for v in (5.2, 4.8, 5.1, 5.0)]}
+    with pytest.raises(AssertionError, match="not significantly lower"):
+        harness.judge_ab_repeats("rescue_ab", opts, str(tmp_path), same)
+    with pytest.raises(AssertionError, match="no td_dist"):
+        harness.judge_ab_repeats("rescue_ab", opts, str(tmp_path), {"A": [{"x": 1.0}] * 2, "B": [{"x": 2.0}] * 2})
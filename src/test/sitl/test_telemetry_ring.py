@@ -0,0 +1,67 @@
+"""Telemetry ring writer and reader, both in this process."""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+import telemetry_ring
+
+MODEL = SimpleNamespace(pos=(1.0, 2.0, 3.0), vel=(0.5, 0.0, -0.5), rates=(0.0, math.pi, 0.0),
+                        roll=0.0, pitch=-math.pi / 18, yaw=-math.pi / 2)
+
+
+@pytest.fixture
+def ring(tmp_path):
+    writer = telemetry_ring.TelemetryRing(str(tmp_path / "telemetry.ring"), "ab12cd34ef", capacity=4)
+    yield writer
+    writer.close()
+
+
+def write(ring, t, armed=True):
+    ring.write(t, MODEL, (0.1, 0.2, 0.3, 0.4), 47.0, 8.0, 450.0, True, armed, 1 << 0 | 1 << 27)
+
+
+def test_samples_read_back_in_display_conventions(ring):
+    reader = telemetry_ring.RingReader(ring.path)
+    assert reader.sid == "ab12cd34" and reader.latest() is None
+    write(ring, 0.02)
+    write(ring, 0.04, armed=None)
+    first, second = reader.read_new()
+    assert (first.seq, first.t, first.pos, first.motors, first.alt) == (1, 0.02, (1.0, 2.0, 3.0), (0.1, 0.2, 0.3, 0.4), 450.0)
+    assert first.att == pytest.approx((0.0, 10.0, 270.0))
+    assert first.rates == pytest.approx((0.0, -180.0, 0.0))
+    assert (first.gps, first.armed, first.modes) == (True, True, [0, 27])
+    assert (second.armed, second.modes) == (None, [])   # no status known
+    assert reader.read_new() == [] and reader.latest().seq == 2
+    reader.close()
+
+
+def test_a_reader_that_falls_behind_counts_what_it_lost(ring):
+    reader = telemetry_ring.RingReader(ring.path)
+    for i in range(7):
+        write(ring, i * 0.02)
+    assert [s.seq for s in reader.read_new()] == [4, 5, 6, 7]
+    assert reader.lost == 3
+    late = telemetry_ring.RingReader(ring.path)   # starts at the oldest sample kept
+    assert [s.seq for s in late.read_new()] == [4, 5, 6, 7] and late.lost == 0
+    reader.close()
+    late.close()
+
+
+def test_a_slot_being_rewritten_is_lost_not_torn(ring):
+    reader = telemetry_ring.RingReader(ring.path)
+    write(ring, 0.02)
+    write(ring, 0.04)
+    off = telemetry_ring.HEADER_SIZE + telemetry_ring.SAMPLE.size
+    telemetry_ring.SEQ.pack_into(ring.mm, off, 0)   # the writer's invalidate step
+    assert [s.seq for s in reader.read_new()] == [1]
+    assert reader.lost == 1
+    reader.close()
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "not.ring"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        telemetry_ring.RingReader(str(path))
@@ -0,0 +1,56 @@
+"""trajectory_analytics kernels: the NumPy and plain-Python paths agree."""
+
+import math
+
+import pytest
+
+import trajectory_analytics as analytics
+
+# t, east, north, up, ve, vn, vu, heading: climb, drift out, descend, land
+SAMPLES = [
+    (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    (1.0, 0.0, 0.0, 2.0, 0.0, 0.0, 2.0, 0.0),
+    (2.0, 3.0, 4.0, 5.0, 3.0, 4.0, 3.0, 37.0),
+    (3.0, 6.0, 8.0, 4.0, 3.0, 4.0, -1.0, 37.0),
+    (4.0, 6.0, 8.0, 2.0, 0.0, 0.0, -2.0, 37.0),
+    (5.0, 6.0, 8.0, 0.5, 0.0, 0.0, -1.5, 37.0),
+    (6.0, 6.5, 8.0, 0.0, 0.0, 0.0, -0.5, 37.0),
+    (7.0, 6.5, 8.0, 0.0, 0.0, 0.0, 0.0, 37.0),
+]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def mode(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setattr(analytics, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(analytics, "np", None)
+    return request.param
+
+
+def test_kernels(mode):
+    traj = analytics.Trajectory(SAMPLES)
+    assert len(traj) == 8
+    assert analytics.peak(traj.up) == 5.0
+    assert analytics.first_time_within(analytics.Trajectory(SAMPLES[2:]), 1.0, 6.0, 8.0) == 3.0
+    assert analytics.first_time_within(traj, 1.0, 100.0, 0.0) is None
+    assert analytics.touchdown(traj) == (6.0, 6.5, 8.0)
+    assert analytics.descent_rate_percentile(traj, 0.0, 10.0, q=50.0) == 1.5
+    assert analytics.descent_rate_percentile(traj, 0.0, 10.0, q=100.0) == 2.0
+    assert analytics.drift_envelope(traj) == pytest.approx(math.hypot(6.5, 8.0))
+    for value in (analytics.peak(traj.up), analytics.touchdown(traj)[0],
+                  analytics.descent_rate_percentile(traj, 0.0, 10.0)):
+        assert type(value) is float
+
+
+def test_window_and_empty(mode):
+    traj = analytics.Trajectory(SAMPLES)
+    window = traj.window(2.0, 4.0)
+    assert list(window.t) == [2.0, 3.0, 4.0]
+    assert list(traj.window(t0=6.0).up) == [0.0, 0.0]
+    empty = analytics.Trajectory([])
+    assert len(empty) == 0
+    assert analytics.peak(empty.up, default=-1.0) == -1.0
+    assert analytics.touchdown(empty) is None
+    assert analytics.drift_envelope(empty) == 0.0
+    assert analytics.descent_rate_percentile(traj.window(t1=1.0), 0.0, 10.0) == 0.0
@@ -0,0 +1,114 @@
+"""Columnar trajectory analytics for SITL scenario metrics.
+
+Kernels over the harness recorder's (t, east, north, up, ve, vn, vu,
+heading_deg) samples, held as one column per field. With NumPy installed
+each kernel is a vectorised pass over array views, so metric extraction
+stays cheap for long or high-rate recordings; without it the same kernels
+run as plain Python over the columns, so the harness still works on a bare
+interpreter. Every kernel returns plain Python values either way.
+
+Post-hoc scenario metrics (rescue distances and altitudes, touchdown,
+descent and climb rates, climb drift) are computed here rather than
+re-walked per scenario. Windowed checks that can be decided while the leg
+flies stay with the harness's streaming monitors.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorised when available
+    np = None
+
+
+class Trajectory:
+    """Recorder samples as columns: t, east, north, up, ve, vn, vu, heading."""
+
+    FIELDS = ("t", "east", "north", "up", "ve", "vn", "vu", "heading")
+
+    def __init__(self, samples):
+        if np is not None:
+            cols = np.asarray(samples, dtype=float).reshape(-1, len(self.FIELDS)).T
+        else:
+            cols = [list(c) for c in zip(*samples)] or [[] for _ in self.FIELDS]
+        for name, col in zip(self.FIELDS, cols):
+            setattr(self, name, col)
+
+    def __len__(self):
+        return len(self.t)
+
+    def _select(self, keep):
+        out = Trajectory.__new__(Trajectory)
+        for name in self.FIELDS:
+            col = getattr(self, name)
+            setattr(out, name, col[keep] if np is not None else [col[i] for i in keep])
+        return out
+
+    def window(self, t0=None, t1=None):
+        """Samples with t0 <= t <= t1 (either bound optional)."""
+        lo = -math.inf if t0 is None else t0
+        hi = math.inf if t1 is None else t1
+        if np is not None:
+            return self._select((self.t >= lo) & (self.t <= hi))
+        return self._select([i for i, t in enumerate(self.t) if lo <= t <= hi])
+
+
+def peak(col, default=0.0):
+    """Largest value of a column, or `default` when it is empty."""
+    if len(col) == 0:
+        return default
+    return float(np.max(col)) if np is not None else max(col)
+
+
+def distance_from(traj, east_m=0.0, north_m=0.0):
+    """Horizontal distance of every sample from a point (home by default)."""
+    if np is not None:
+        return np.hypot(traj.east - east_m, traj.north - north_m)
+    return [math.hypot(e - east_m, n - north_m) for e, n in zip(traj.east, traj.north)]
+
+
+def first_time_within(traj, radius_m, east_m=0.0, north_m=0.0):
+    """Time of the first sample within radius_m of a point, or None."""
+    dist = distance_from(traj, east_m, north_m)
+    if np is not None:
+        hits = np.flatnonzero(dist < radius_m)
+        return float(traj.t[hits[0]]) if len(hits) else None
+    return next((t for t, d in zip(traj.t, dist) if d < radius_m), None)
+
+
+def touchdown(traj, airborne_m=1.0, ground_m=0.01):
+    """(t, east, north) of the first on-ground sample following airborne flight."""
+    if np is not None:
+        airborne = np.maximum.accumulate(traj.up > airborne_m)
+        hits = np.flatnonzero(airborne & (traj.up <= ground_m))
+        if not len(hits):
+            return None
+        i = hits[0]
+        return (float(traj.t[i]), float(traj.east[i]), float(traj.north[i]))
+    airborne = False
+    for t, e, n, u in zip(traj.t, traj.east, traj.north, traj.up):
+        if u > airborne_m:
+            airborne = True
+        elif airborne and u <= ground_m:
+            return (t, e, n)
+    return None
+
+
+def descent_rate_percentile(traj, lo_alt, hi_alt, q=50.0, min_rate=0.1):
+    """q-th percentile descent rate (m/s, positive down) over an altitude band,
+    counting only samples actually descending faster than min_rate. The
+    percentile picks a recorded sample (the upper one on ties), not an
+    interpolated value."""
+    if np is not None:
+        rates = -traj.vu[(traj.up >= lo_alt) & (traj.up <= hi_alt) & (traj.vu < -min_rate)]
+        return float(np.percentile(rates, q, method="higher")) if len(rates) else 0.0
+    rates = sorted(-vu for u, vu in zip(traj.up, traj.vu) if lo_alt <= u <= hi_alt and vu < -min_rate)
+    return rates[math.ceil(q / 100.0 * (len(rates) - 1))] if rates else 0.0
+
+
+def drift_envelope(traj):
+    """Largest horizontal excursion from the first sample."""
+    if len(traj) == 0:
+        return 0.0
+    return peak(distance_from(traj, traj.east[0], traj.north[0]))
+